@@ -0,0 +1,241 @@
+"""Download archive and URL canonicalization.
+
+Completed downloads are recorded in ~/.config/feliciadl/archive/archive.db
+keyed by canonical URL (see `canonical_url`) and the tool that fetched
+them, and, where it can be derived from the URL, the yt-dlp style
+extractor ID ("youtube dQw4w9WgXcQ"). Both front ends check it before a
+process is started, so duplicates inside a bulk list and URLs finished in
+earlier runs are skipped for free. A URL fetched with one tool (video) can
+still be downloaded with another (audio).
+
+Items inside playlists and galleries are handled by the backends' own
+archives, which live next to it and are passed on every command line
+(`archive_args`): one yt-dlp --download-archive text file per tool,
+gallery-dl's --download-archive SQLite file and spotdl's --archive file.
+A tool's yt-dlp file is also consulted by `contains`, so a video fetched
+earlier as part of a playlist is not started again on its own. Only single items are
+recorded here (`single_item`); a container URL stays downloadable, so
+items added to it later are still fetched.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+CONFIG_DIR = os.path.expanduser("~/.config/feliciadl")
+ARCHIVE_DIR = os.path.join(CONFIG_DIR, "archive")
+ARCHIVE_DB_PATH = os.path.join(ARCHIVE_DIR, "archive.db")
+GALLERYDL_ARCHIVE_PATH = os.path.join(ARCHIVE_DIR, "gallery-dl.sqlite3")
+SPOTDL_ARCHIVE_PATH = os.path.join(ARCHIVE_DIR, "spotdl.txt")
+
+# query parameters that only track where a link was shared from
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "igsh",
+    "mc_cid", "mc_eid", "_hsenc", "_hsmi", "si", "feature", "pp", "ref_src", "ref_url", "spm",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+_YOUTUBE_HOSTS = {"youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_YOUTUBE_PATH_ID = re.compile(r"^/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})")
+
+# yt-dlp URLs that name a list rather than one video
+CONTAINER_URL = re.compile(
+    r"[?&]list=|/playlists?(?:[/?]|$)|/channel/|/c/|/user/|/sets/|/album/"
+    r"|/@[^/?#]+/?(?:videos|shorts|streams|featured)?/?(?:[?#]|$)"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    canonical TEXT NOT NULL,
+    tool TEXT NOT NULL DEFAULT '',
+    extractor_key TEXT,
+    url TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (canonical, tool)
+);
+CREATE INDEX IF NOT EXISTS downloads_extractor_key ON downloads(extractor_key, tool);
+"""
+
+# archives from before the tool was part of the key
+_MIGRATE = """
+INSERT OR IGNORE INTO downloads (canonical, tool, extractor_key, url, created)
+    SELECT canonical, COALESCE(tool, ''), extractor_key, url, created FROM items;
+DROP TABLE items;
+"""
+
+
+def _bare_host(host):
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+
+def _youtube_id(host, path, query):
+    if host == "youtu.be":
+        candidate = path.strip("/").split("/", 1)[0]
+    elif host in _YOUTUBE_HOSTS:
+        match = _YOUTUBE_PATH_ID.match(path)
+        params = dict(query)
+        # watch?v=..&list=.. makes yt-dlp fetch the whole playlist, so it is not the video alone
+        candidate = match.group(1) if match else params.get("v", "") if path == "/watch" and "list" not in params else ""
+    else:
+        return None
+    return candidate if _YOUTUBE_ID.match(candidate) else None
+
+
+def canonical_url(url):
+    """Normalize a URL so different spellings of the same item compare equal.
+
+    Lower-cases scheme and host, treats http as https, drops www./m., default
+    ports, fragments, trailing slashes and tracking parameters, sorts the
+    query, and rewrites youtu.be/shorts/embed links to youtube.com/watch?v=ID.
+    Strings that are not URLs (e.g. spotdl search queries) are only stripped.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return url
+    if not host or parts.scheme.lower() not in ("http", "https"):
+        return url
+
+    host = _bare_host(host)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+    path = parts.path or "/"
+
+    video_id = _youtube_id(host, path, query)
+    if video_id:
+        return f"https://youtube.com/watch?v={video_id}"
+    if host in _YOUTUBE_HOSTS and path == "/watch":
+        query = [(k, v) for k, v in query if k in ("v", "list")]
+
+    if len(path) > 1:
+        path = path.rstrip("/")
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+    return urlunsplit(("https", netloc, path, urlencode(sorted(query)), ""))
+
+
+def extractor_key(url):
+    """yt-dlp archive key ("youtube <id>") when the URL alone identifies the item, else None."""
+    try:
+        parts = urlsplit(url.strip())
+        host = _bare_host((parts.hostname or "").lower())
+    except ValueError:
+        return None
+    video_id = _youtube_id(host, parts.path or "/", parse_qsl(parts.query))
+    return f"youtube {video_id}" if video_id else None
+
+
+def single_item(backend, url):
+    """Whether a finished `url` is one item and goes into the archive.
+
+    Playlists, channels, galleries and albums are left to the backends'
+    archives: recorded here, they would be skipped for good and items
+    added to them later never fetched.
+    """
+    if backend == "yt-dlp":
+        return not CONTAINER_URL.search(url)
+    if backend == "spotdl":
+        return "/track/" in url
+    return False
+
+
+def ytdlp_archive_path(tool):
+    """The yt-dlp --download-archive file of `tool`; each tool has its own."""
+    return os.path.join(ARCHIVE_DIR, f"yt-dlp-{tool}.txt")
+
+
+def archive_args(backend, tool):
+    """Backend options that make yt-dlp, gallery-dl and spotdl keep their own archive."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    if backend == "yt-dlp":
+        return ["--download-archive", ytdlp_archive_path(tool)]
+    if backend == "gallery-dl":
+        return ["--download-archive", GALLERYDL_ARCHIVE_PATH]
+    if backend == "spotdl":
+        return ["--archive", SPOTDL_ARCHIVE_PATH]
+    return []
+
+
+class Archive:
+    """Thread-safe index of completed downloads."""
+
+    def __init__(self, path=ARCHIVE_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        if self._db.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='items'").fetchone():
+            self._db.executescript("BEGIN;" + _MIGRATE + "COMMIT;")
+        self._ytdlp_keys = {}   # archive file -> (mtime, keys)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _ytdlp_archive(self, tool):
+        # yt-dlp appends to its archive itself; reload only when the file changed
+        path = ytdlp_archive_path(tool)
+        mtime, keys = self._ytdlp_keys.get(path, (None, set()))
+        try:
+            current = os.stat(path).st_mtime_ns
+        except OSError:
+            return keys
+        if current != mtime:
+            with open(path, "r", errors="replace") as f:
+                keys = {line.strip() for line in f if line.strip()}
+            self._ytdlp_keys[path] = (current, keys)
+        return keys
+
+    def contains(self, url, tool):
+        """Whether `url` was downloaded with `tool` (the resolved tool, not Automatic)."""
+        canonical = canonical_url(url)
+        key = extractor_key(url)
+        with self._lock:
+            if key and key in self._ytdlp_archive(tool):
+                return True
+            row = self._db.execute(
+                "SELECT 1 FROM downloads WHERE tool=? AND (canonical=? OR (? IS NOT NULL AND extractor_key=?))",
+                (tool or "", canonical, key, key),
+            ).fetchone()
+        return row is not None
+
+    def add(self, url, tool):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO downloads (canonical, tool, extractor_key, url, created) VALUES (?, ?, ?, ?, ?)",
+                (canonical_url(url), tool or "", extractor_key(url), url, time.time()),
+            )
+
+    def remove(self, url, tool=None):
+        """Forget `url` for `tool`, or for every tool."""
+        with self._lock:
+            return self._db.execute("DELETE FROM downloads WHERE canonical=? AND (? IS NULL OR tool=?)",
+                                    (canonical_url(url), tool, tool)).rowcount
+
+    def filter(self, urls, tools):
+        """Split urls into (fresh, duplicates, archived), keeping the first of equal canonical URLs.
+
+        `tools` holds the resolved tool of each URL; a URL counts as archived
+        only if that tool downloaded it.
+        """
+        fresh, duplicates, archived = [], [], []
+        seen = set()
+        for url, tool in zip(urls, tools):
+            canonical = (canonical_url(url), tool)
+            if canonical in seen:
+                duplicates.append(url)
+            elif self.contains(url, tool):
+                archived.append(url)
+            else:
+                fresh.append(url)
+            seen.add(canonical)
+        return fresh, duplicates, archived
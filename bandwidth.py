@@ -0,0 +1,129 @@
+"""Global bandwidth budget shared by all running jobs.
+
+The budget (bytes per second, optionally different per time of day) is
+divided among running jobs and handed to each backend through its own
+rate-limit option (`with_rate_limit`): yt-dlp and gallery-dl get
+--limit-rate, spotdl passes it on to its yt-dlp via --yt-dlp-args.
+
+A process started with a fixed rate cannot be changed later, so a new
+job only gets what is left of the budget, and none is started while less
+than `min_rate` is left. Jobs on the in-process yt-dlp engine can be
+changed while they run; `rebalance` re-divides the budget among them
+whenever jobs start or finish.
+
+Config:
+
+    "bandwidth": {
+        "limit": "8M",
+        "schedule": [{"from": "08:00", "to": "18:00", "limit": "2M"}]
+    }
+"""
+import re
+import time
+
+DEFAULT_MIN_RATE = 64 * 1024
+
+_RATE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?(?:/s)?\s*$", re.I)
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_rate(value):
+    """'8M', '512K', '1.5MiB/s' or a number of bytes -> bytes per second (None for unlimited)."""
+    if value in (None, "", 0):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _RATE.match(str(value))
+    if not match:
+        raise ValueError(f"invalid rate: {value!r}")
+    return float(match.group(1)) * _UNITS[match.group(2).upper()]
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def with_rate_limit(cmd, rate):
+    """cmd with the backend's rate-limit option for `rate` bytes/s (unchanged if rate is None)."""
+    if rate is None or not cmd:
+        return list(cmd)
+    rate = str(int(rate))
+    if cmd[0] in ("yt-dlp", "gallery-dl"):
+        # right after the executable, so the URL stays the last argument
+        return [cmd[0], "--limit-rate", rate] + list(cmd[1:])
+    if cmd[0] == "spotdl":
+        return list(cmd) + ["--yt-dlp-args", f"--limit-rate {rate}"]
+    return list(cmd)
+
+
+class BandwidthBudget:
+    """Splits a bytes/s budget among running units (a job, or a chunk of jobs)."""
+
+    def __init__(self, limit=None, schedule=(), min_rate=DEFAULT_MIN_RATE):
+        self.limit = parse_rate(limit)
+        self.schedule = [(_minutes(s["from"]), _minutes(s["to"]), parse_rate(s.get("limit"))) for s in schedule]
+        self.min_rate = float(min_rate)
+
+    @classmethod
+    def from_config(cls, config):
+        """A budget from config["bandwidth"], or None when no limit is configured."""
+        settings = config.get("bandwidth") or {}
+        if not settings.get("limit") and not settings.get("schedule"):
+            return None
+        return cls(settings.get("limit"), settings.get("schedule") or (),
+                   parse_rate(settings.get("min_rate")) or DEFAULT_MIN_RATE)
+
+    def limit_now(self, when=None):
+        """Budget in bytes/s at `when` (a time.time() value), or None for unlimited."""
+        t = time.localtime(when)
+        now = t.tm_hour * 60 + t.tm_min
+        for start, end, limit in self.schedule:
+            inside = start <= now < end if start <= end else now >= start or now < end
+            if inside:
+                return limit
+        return self.limit
+
+    def can_start(self, units):
+        """Whether enough budget is left for one more unit next to the running `units`."""
+        limit = self.limit_now()
+        if limit is None or not units:
+            return True
+        # live units can be squeezed down to min_rate, fixed ones keep what they got
+        taken = sum(self.min_rate if _live(u) else _rate(u) for u in units)
+        return limit - taken >= self.min_rate
+
+    def assign(self, unit, units, expected):
+        """Give a starting unit its share; `units` are the running ones, `expected` how many will run."""
+        limit = self.limit_now()
+        if limit is None:
+            rate = None
+        else:
+            fair = limit / max(1, expected, len(units) + 1)
+            left = limit - sum(_rate(u) for u in units)
+            rate = max(self.min_rate, min(fair, left))
+        for job in unit:
+            job.rate_limit = rate
+
+    def rebalance(self, units):
+        """Re-divide what fixed-rate units leave over among units that can change their rate."""
+        limit = self.limit_now()
+        live = [u for u in units if _live(u)]
+        if not live:
+            return
+        if limit is None:
+            rate = None
+        else:
+            fixed = sum(_rate(u) for u in units if not _live(u))
+            rate = max(self.min_rate, (limit - fixed) / len(live))
+        for unit in live:
+            for job in unit:
+                job.rate_limit = rate
+
+
+def _rate(unit):
+    return unit[0].rate_limit or 0
+
+
+def _live(unit):
+    return unit[0].live_rate
@@ -0,0 +1,62 @@
+"""Run several same-backend URLs in one process invocation.
+
+yt-dlp reads the URLs from `--batch-file` and appends each finished URL to
+a results file via `--print-to-file`; gallery-dl reads them with `-I`,
+which comments out every line it downloaded successfully. After the run,
+those files tell which URLs of the chunk succeeded, so every job still
+gets its own result.
+
+spotdl has no per-query result reporting, so its jobs are never grouped.
+"""
+import os
+import shutil
+import tempfile
+
+DEFAULT_CHUNK_SIZE = 1
+
+_DONE_TEMPLATE = "after_video:%(original_url)s"
+
+
+def chunk_key(job):
+    """Jobs with equal non-None keys can share one process; None means run alone."""
+    if job.backend not in ("yt-dlp", "gallery-dl") or not job.cmd or job.cmd[-1] != job.url:
+        return None
+    return tuple(job.cmd[:-1])
+
+
+class Chunk:
+    """Command and result bookkeeping for a group of jobs with the same chunk_key."""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.backend = jobs[0].backend
+        self.tmpdir = tempfile.mkdtemp(prefix="feliciadl-chunk-")
+        self.url_file = os.path.join(self.tmpdir, "urls.txt")
+        self.done_file = os.path.join(self.tmpdir, "done.txt")
+        with open(self.url_file, "w") as f:
+            for job in jobs:
+                f.write(job.url.strip() + "\n")
+
+        # command() carries the chunk's bandwidth share in front of the URL
+        base = jobs[0].command()[:-1]
+        if self.backend == "yt-dlp":
+            self.cmd = base + ["--print-to-file", _DONE_TEMPLATE, self.done_file, "--batch-file", self.url_file]
+        else:
+            self.cmd = base + ["-I", self.url_file]
+
+    def results(self, returncode):
+        """Return one exit code per job: 0 for URLs the backend reported as done."""
+        done = set()
+        if self.backend == "yt-dlp":
+            if os.path.exists(self.done_file):
+                with open(self.done_file) as f:
+                    done = {line.strip() for line in f if line.strip()}
+        else:
+            with open(self.url_file) as f:
+                done = {line.lstrip("#").strip() for line in f if line.startswith("#")}
+
+        failed_code = returncode if returncode else 1
+        return [0 if job.url.strip() in done else failed_code for job in self.jobs]
+
+    def cleanup(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Bulk download benchmark with stub backends.
+
+Measures FeliciaDL's own overhead (routing, process spawning, output
+relay, scheduling, job logging) by running the CLI's bulk path against
+stub_backend.py in place of yt-dlp, gallery-dl and spotdl. The stubs fetch
+their data from a local HTTP server started here, print the progress
+output of the real tools and fail where a URL asks them to.
+
+Each scenario runs in a fresh process under a throwaway HOME, so peak RSS
+belongs to that scenario alone. Reported per scenario:
+
+    throughput      URLs/s and MB/s over the whole run
+    dispatch        gap between a worker's job ending and its next job starting (p50/p95)
+    first start     time from submitting the batch to the first backend starting
+    RSS             peak RSS of the FeliciaDL process
+    UI lag          lateness of a main-thread loop ticking at the GUI's console interval
+                    (stands in for Tk's after() queue so this runs headless), and the age
+                    of output lines when that loop drains them (p95/max)
+
+    python3 benchmarks/bench_bulk.py                       # all scenarios, compared to baselines.json
+    python3 benchmarks/bench_bulk.py bulk-100 --record     # run one and store it as the baseline
+    python3 benchmarks/bench_bulk.py --server-rate 20M     # throttle the stub downloads
+
+Exits with 1 when a metric regressed beyond --tolerance against the baseline.
+"""
+import argparse
+import bisect
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from bandwidth import parse_rate  # noqa: E402
+
+STUB_PATH = os.path.join(BENCH_DIR, "stub_backend.py")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines.json")
+UI_TICK_MS = 100    # the GUI's CONSOLE_FLUSH_MS
+
+# name -> URL count, workers and how the URLs are built (see make_urls)
+SCENARIOS = {
+    "bulk-1": {"urls": 1, "workers": 4, "size": 8 * 1024 * 1024, "mix": "yt-dlp"},
+    "bulk-100": {"urls": 100, "workers": 8, "size": 1024 * 1024, "mix": "mixed"},
+    "bulk-10k": {"urls": 10_000, "workers": 16, "size": 64 * 1024, "mix": "yt-dlp"},
+}
+
+# metric -> (True if higher is better, absolute change ignored as noise)
+METRICS = {
+    "urls_per_s": (True, 0.5),
+    "dispatch_p95_ms": (False, 5.0),
+    "first_start_ms": (False, 20.0),
+    "rss_mb": (False, 5.0),
+    "ui_lag_p95_ms": (False, 5.0),
+    "line_age_p95_ms": (False, 10.0),
+}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256    # 16 stubs connecting at once must not be refused
+    rate = None     # bytes/s per connection, None for unthrottled
+    sent = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+    block = bytes(64 * 1024)
+
+    def do_GET(self):
+        try:
+            size = int(self.path.strip("/"))
+        except ValueError:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        rate = self.server.rate
+        start = time.monotonic()
+        left = size
+        while left > 0:
+            n = min(left, len(self.block))
+            self.wfile.write(self.block[:n])
+            left -= n
+            if rate:
+                ahead = (size - left) / rate - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+        self.server.sent += size
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(rate=None):
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.rate = rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_urls(scenario):
+    """Deterministic URL list; about 2% fail with a 404 in the mixed scenario."""
+    # the mixed scenario cycles through 7 videos, 2 galleries and 1 album
+    kinds = ["yt-dlp"] * 7 + ["gallery-dl"] * 2 + ["spotdl"] if scenario["mix"] == "mixed" else [scenario["mix"]]
+    urls = []
+    size = scenario["size"]
+    for i in range(scenario["urls"]):
+        kind = kinds[i % len(kinds)]
+        fail = "&fail=404" if scenario["mix"] == "mixed" and i % 50 == 49 else ""
+        if kind == "yt-dlp":
+            urls.append(f"https://www.youtube.com/watch?v=bench{i:06d}&size={size}{fail}")
+        elif kind == "gallery-dl":
+            urls.append(f"https://behoimi.org/post/{i}?items=3&size={size // 4}{fail}")
+        else:
+            urls.append(f"https://open.spotify.com/album/bench{i}?items=2&size={size // 2}{fail}")
+    return urls
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def dispatch_gaps(spans, workers):
+    """For each start after the pool first filled up: time since the latest end before it."""
+    starts = sorted(s for s, _ in spans)
+    ends = sorted(e for _, e in spans)
+    gaps = []
+    for start in starts[workers:]:
+        i = bisect.bisect_right(ends, start)
+        if i:
+            gaps.append(start - ends[i - 1])
+    return gaps
+
+
+def prepare_home(home, workers):
+    """Throwaway HOME with a config, automatic.json and the stubs on PATH."""
+    config_dir = os.path.join(home, ".config", "feliciadl")
+    os.makedirs(config_dir)
+    shutil.copy(os.path.join(ROOT, "automatic.json"), config_dir)
+    config = {
+        "download_dir": os.path.join(home, "FeliciaDL"),
+        "workers": workers,
+        "backend_limits": {"yt-dlp": workers, "gallery-dl": workers, "spotdl": workers},
+        "domain_delay": 0,
+        "archive": False,
+        "postprocess_workers": 0,
+        "retry": {"max_attempts": 1},
+    }
+    with open(os.path.join(config_dir, "config.json"), "w") as f:
+        json.dump(config, f)
+    bin_dir = os.path.join(home, "bin")
+    os.makedirs(bin_dir)
+    for name in ("yt-dlp", "gallery-dl", "spotdl"):
+        os.symlink(STUB_PATH, os.path.join(bin_dir, name))
+    return bin_dir
+
+
+def run_scenario(name, server_rate=None):
+    """Run one scenario in this process (called in a fresh child); returns its metrics."""
+    scenario = SCENARIOS[name]
+    home = tempfile.mkdtemp(prefix="feliciadl-bench-")
+    try:
+        bin_dir = prepare_home(home, scenario["workers"])
+        os.environ["HOME"] = home
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+        server = start_server(server_rate)
+        os.environ["FELICIADL_BENCH_SERVER"] = f"http://127.0.0.1:{server.server_address[1]}"
+        # imported only now: the config paths are resolved from HOME at import time
+        import downloader
+        from core import build_command, ensure_dirs, load_config
+        from logsink import LogSink
+        from telemetry import Telemetry
+
+        config = load_config()
+        base = config["download_dir"]
+        ensure_dirs(base)
+        downloader.job_telemetry = Telemetry.from_config(config)
+
+        urls = make_urls(scenario)
+        start = time.perf_counter()
+        entries = []
+        for url in urls:
+            cmd, resolved_tool = build_command("Automatic", url, base, use_archive=False)
+            entries.append((url, "Automatic", cmd, resolved_tool, base))
+        routing_s = time.perf_counter() - start
+
+        spans = []
+        spans_lock = threading.Lock()
+        sink = LogSink()
+        execute = downloader.execute
+
+        def timed_execute(cmd, parser, on_line, on_start=None, rate=None):
+            def relay(stream, text):
+                sink.push((time.perf_counter(), text), stream)
+                on_line(stream, text)
+            began = time.perf_counter()
+            try:
+                return execute(cmd, parser, relay, on_start=on_start, rate=rate)
+            finally:
+                with spans_lock:
+                    spans.append((began, time.perf_counter()))
+
+        downloader.execute = timed_execute
+        results = []
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        saved_stderr = os.dup(2)
+        os.dup2(devnull, 2)
+        try:
+            submitted = time.perf_counter()
+            worker = threading.Thread(target=lambda: results.extend(
+                downloader.run_many(entries, config, scenario["workers"])))
+            worker.start()
+            # the GUI's console loop: drain the sink every UI_TICK_MS on the main thread
+            lags, ages = [], []
+            due = time.perf_counter() + UI_TICK_MS / 1000
+            while worker.is_alive():
+                time.sleep(max(0.0, due - time.perf_counter()))
+                now = time.perf_counter()
+                lags.append(now - due)
+                lines, _ = sink.drain()
+                ages.extend(now - stamp for (stamp, _), _ in lines)
+                due = max(due + UI_TICK_MS / 1000, now)
+            worker.join()
+            wall_s = time.perf_counter() - submitted
+            downloader.job_telemetry.close()
+        finally:
+            os.dup2(saved_stderr, 2)
+            os.close(devnull)
+            os.close(saved_stderr)
+        server.shutdown()
+
+        failed = sum(1 for r in results if r["state"] != "done")
+        return {
+            "urls": len(urls),
+            "workers": scenario["workers"],
+            "failed": failed,
+            "wall_s": round(wall_s, 3),
+            "routing_ms": round(routing_s * 1000, 2),
+            "urls_per_s": round(len(urls) / wall_s, 2),
+            "mb_per_s": round(server.sent / wall_s / 1024 / 1024, 2),
+            "dispatch_p50_ms": round(percentile(dispatch_gaps(spans, scenario["workers"]), 50) * 1000, 2),
+            "dispatch_p95_ms": round(percentile(dispatch_gaps(spans, scenario["workers"]), 95) * 1000, 2),
+            "first_start_ms": round((min(s for s, _ in spans) - submitted) * 1000, 2) if spans else None,
+            "rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "ui_lag_p95_ms": round(percentile(lags, 95) * 1000, 2),
+            "ui_lag_max_ms": round(max(lags, default=0) * 1000, 2),
+            "line_age_p95_ms": round(percentile(ages, 95) * 1000, 2),
+        }
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def run_child(name, server_rate):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", name]
+    if server_rate:
+        cmd += ["--server-rate", str(server_rate)]
+    out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def compare(name, result, baseline, tolerance):
+    """Print result against baseline; returns the names of regressed metrics."""
+    regressed = []
+    for metric, (higher_better, noise) in METRICS.items():
+        now, before = result.get(metric), (baseline or {}).get(metric)
+        if now is None:
+            continue
+        line = f"  {metric:<18}{now:>12}"
+        if before is not None:
+            change = (now - before) / before * 100 if before else 0.0
+            worse = now < before if higher_better else now > before
+            bad = worse and abs(now - before) > noise and abs(change) > tolerance * 100
+            line += f"   baseline {before:>10}  {change:+6.1f}%" + ("  ⚠️ regression" if bad else "")
+            if bad:
+                regressed.append(metric)
+        print(line)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--record", action="store_true", help="store the results as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression (default 0.25)")
+    parser.add_argument("--server-rate", type=parse_rate, help="throttle each stub download to this many bytes/s ('20M')")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.server_rate)))
+        return
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    try:
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    regressions = {}
+    for name in args.scenarios or SCENARIOS:
+        result = run_child(name, args.server_rate)
+        print(f"{name}: {result['urls']} URLs on {result['workers']} workers in {result['wall_s']} s, "
+              f"{result['mb_per_s']} MB/s, {result['failed']} failed, routing {result['routing_ms']} ms, "
+              f"UI lag max {result['ui_lag_max_ms']} ms")
+        regressed = compare(name, result, baselines.get(name), args.tolerance)
+        if regressed:
+            regressions[name] = regressed
+        if args.record:
+            baselines[name] = dict(result, machine=platform.node(), python=platform.python_version(),
+                                   recorded=time.strftime("%Y-%m-%d"))
+    if args.record:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"📌 Baselines written to {BASELINE_PATH}")
+    if regressions and not args.record:
+        print("❌ Regressions: " + "; ".join(f"{n}: {', '.join(m)}" for n, m in regressions.items()))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for Automatic routing.
+
+Compares the old linear substring scan over automatic.json with the
+compiled DomainIndex on a synthetic URL list, and checks that the index
+cost per URL stays flat as the number of configured domains grows.
+
+    python3 benchmarks/bench_routing.py [--urls 100000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from routing import DomainIndex  # noqa: E402
+
+
+def linear_match(mapping, url):
+    """The routing loop build_command used before DomainIndex."""
+    try:
+        domain = url.split("/")[2].lower()
+    except IndexError:
+        return None
+    for backend, domains in mapping.items():
+        if any(d in domain for d in domains):
+            return backend
+    return None
+
+
+def make_urls(mapping, count, seed=1):
+    rng = random.Random(seed)
+    domains = [d for ds in mapping.values() for d in ds]
+    urls = []
+    for i in range(count):
+        if i % 5 == 0:
+            host = f"unknown{i}.example.org"
+        else:
+            host = rng.choice(domains)
+            if i % 3 == 0:
+                host = "www." + host
+        urls.append(f"https://{host}/item/{i}?ref=bench")
+    return urls
+
+
+def timed(func, urls):
+    start = time.perf_counter()
+    for url in urls:
+        func(url)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--urls", type=int, default=100_000, help="number of URLs to route")
+    parser.add_argument("--mapping", default=os.path.join(ROOT, "automatic.json"))
+    args = parser.parse_args()
+
+    with open(args.mapping) as f:
+        mapping = json.load(f)
+    urls = make_urls(mapping, args.urls)
+
+    start = time.perf_counter()
+    index = DomainIndex(mapping)
+    compile_s = time.perf_counter() - start
+
+    linear_s = timed(lambda u: linear_match(mapping, u), urls)
+    index_s = timed(index.match, urls)
+
+    print(f"domains: {len(index)}  urls: {len(urls)}")
+    print(f"compile index:  {compile_s * 1e3:8.2f} ms")
+    print(f"linear scan:    {linear_s:8.3f} s  ({linear_s / len(urls) * 1e6:7.2f} us/url)")
+    print(f"domain index:   {index_s:8.3f} s  ({index_s / len(urls) * 1e6:7.2f} us/url)")
+    print(f"speedup:        {linear_s / index_s:8.1f}x")
+
+    # per-URL cost must not depend on how many domains are configured
+    print("\ncost vs. mapping size (us/url):")
+    sample = urls[:2_000]
+    for scale in (1, 10, 100):
+        big = {b: [f"s{n}{d}" for n in range(scale) for d in ds] + ds for b, ds in mapping.items()}
+        big_index = DomainIndex(big)
+        lin = timed(lambda u: linear_match(big, u), sample)
+        idx = timed(big_index.match, sample)
+        print(f"  {len(big_index):7d} domains: linear {lin / len(sample) * 1e6:9.2f}   index {idx / len(sample) * 1e6:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
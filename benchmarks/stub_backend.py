@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Stand-in for yt-dlp, gallery-dl and spotdl used by bench_bulk.py.
+
+bench_bulk.py links this file as `yt-dlp`, `gallery-dl` and `spotdl` into a
+temporary bin directory; the name it is started as picks the output it
+imitates. Each URL's query string controls the run:
+
+    size=BYTES   bytes to fetch per item from the harness's HTTP server
+    items=N      gallery images / album songs (default 1)
+    fail=CODE    exit 1 with an HTTP CODE error instead of downloading
+
+The data comes from FELICIADL_BENCH_SERVER (the harness's local HTTP
+server, which may throttle it) and is written to the backend's output
+folder, so the run goes through the same disk and progress paths as a
+real download.
+"""
+import os
+import socket
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+CHUNK = 64 * 1024
+PROGRESS_EVERY = 0.1    # seconds between yt-dlp progress lines, like --newline output
+
+
+def option(args, *names):
+    for i, arg in enumerate(args[:-1]):
+        if arg in names:
+            return args[i + 1]
+    return None
+
+
+def fetch(size, path, on_chunk=None):
+    # a plain socket: http.client's imports would dominate the stub's start-up time
+    server = urlsplit(os.environ["FELICIADL_BENCH_SERVER"])
+    done = 0
+    with socket.create_connection((server.hostname, server.port), timeout=30) as conn, open(path, "wb") as f:
+        conn.sendall(f"GET /{size} HTTP/1.0\r\n\r\n".encode())
+        head = b""
+        while b"\r\n\r\n" not in head:
+            data = conn.recv(CHUNK)
+            if not data:
+                return done
+            head += data
+        data = head.split(b"\r\n\r\n", 1)[1]
+        while True:
+            if data:
+                f.write(data)
+                done += len(data)
+                if on_chunk:
+                    on_chunk(done)
+            data = conn.recv(CHUNK)
+            if not data:
+                break
+    return done
+
+
+def ytdlp(args, url, params):
+    out = option(args, "-P", "--paths") or "."
+    size = int(params.get("size", 1024 * 1024))
+    video = params.get("v", "bench")
+    path = os.path.join(out, f"{video}.mp4")
+    print(f"[youtube] Extracting URL: {url}", flush=True)
+    print(f"[download] Destination: {path}", flush=True)
+    start = last = time.monotonic()
+
+    def progress(done):
+        nonlocal last
+        now = time.monotonic()
+        if now - last >= PROGRESS_EVERY or done == size:
+            last = now
+            speed = done / max(now - start, 1e-6)
+            print(f"[feliciadl-progress] {done} {size} NA {speed:.0f} {(size - done) / speed:.0f}", flush=True)
+
+    fetch(size, path, progress)
+    print(f"[download] 100% of {size / 1024 / 1024:.2f}MiB", flush=True)
+
+
+def gallerydl(args, url, params):
+    out = option(args, "-d", "--destination") or "."
+    size = int(params.get("size", 256 * 1024))
+    folder = os.path.join(out, "bench", urlsplit(url).path.strip("/").replace("/", "_") or "gallery")
+    os.makedirs(folder, exist_ok=True)
+    for n in range(int(params.get("items", 1))):
+        path = os.path.join(folder, f"{n:04d}.jpg")
+        fetch(size, path)
+        print(path, flush=True)
+
+
+def spotdl(args, url, params):
+    out = option(args, "--output") or "."
+    size = int(params.get("size", 512 * 1024))
+    items = int(params.get("items", 1))
+    print(f"Found {items} song{'s' if items != 1 else ''}", flush=True)
+    for n in range(items):
+        fetch(size, os.path.join(out, f"bench - track {n}.mp3"))
+        print(f'Downloaded "bench - track {n}": {url}', flush=True)
+
+
+BACKENDS = {"yt-dlp": ytdlp, "gallery-dl": gallerydl, "spotdl": spotdl}
+
+
+def main():
+    name = os.path.basename(sys.argv[0])
+    args = sys.argv[1:]
+    url = next((a for a in reversed(args) if "://" in a), "")
+    params = {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    if "fail" in params:
+        code = params["fail"]
+        reason = {"404": "Not Found", "429": "Too Many Requests", "503": "Service Unavailable"}.get(code, "Error")
+        print(f"ERROR: [generic] Unable to download webpage: HTTP Error {code}: {reason}", file=sys.stderr, flush=True)
+        sys.exit(1)
+    BACKENDS[name](args, url, params)
+
+
+if __name__ == "__main__":
+    main()
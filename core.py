@@ -0,0 +1,152 @@
+"""Config, download folders and command building shared by the CLI, GUI and daemon.
+
+Each tool ("Youtube-DL-Video", "Gallery-DL", ...) is registered once in
+TOOLS with its backend executable, its folder under downloaded/ and how
+its arguments are built, so `build_command` is the same everywhere and
+`ensure_dirs` creates exactly the folders of the registered tools.
+
+Config, automatic.json and the folders are loaded or created once per
+process. `save_config` refreshes the cached config and forgets which
+folders exist, so a changed download folder is set up on next use;
+nothing else touches the disk again for jobs that follow.
+"""
+import json
+import os
+import threading
+
+from archive import archive_args
+from progress import YTDLP_PROGRESS_ARGS
+from routing import DomainIndex, url_host
+
+CONFIG_DIR = os.path.expanduser("~/.config/feliciadl")
+CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
+YTDLP_CONFIG_PATH = os.path.join(CONFIG_DIR, "yt-dlp.conf")
+AUTOMATIC_MAP_PATH = os.path.join(CONFIG_DIR, "automatic.json")
+DEFAULT_PATH = os.path.expanduser("~/Downloads/FeliciaDL")
+AUTOMATIC = "Automatic"
+
+_lock = threading.Lock()
+_config = None
+_automatic_index = None
+_ready_dirs = set()     # download folders already created in this process
+
+
+class Tool:
+    """A selectable tool: backend executable, folder under downloaded/, argument builder.
+
+    `args(url, out_dir, archive)` returns the arguments after the backend's
+    common ones (see `build_command`); `archive` is the backend's archive
+    option or []. The URL must stay last for yt-dlp and gallery-dl, whose
+    commands are batched (see batching.py).
+    """
+
+    def __init__(self, backend, folder, args):
+        self.backend = backend
+        self.folder = folder
+        self.args = args
+
+    def out_dir(self, base):
+        return os.path.join(base, "downloaded", self.folder)
+
+
+TOOLS = {}
+
+
+def register_tool(name, backend, folder, args):
+    TOOLS[name] = Tool(backend, folder, args)
+
+
+register_tool("Youtube-DL-Video", "yt-dlp", "youtube-dl-video", lambda url, out, archive: archive + [
+    "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
+    "-o", "%(title)s.%(ext)s", "-P", out, url])
+register_tool("Youtube-DL-Audio", "yt-dlp", "youtube-dl-audio", lambda url, out, archive: archive + [
+    "-x", "--audio-format", "mp3",
+    "-o", "%(title)s.%(ext)s", "-P", out, url])
+register_tool("Gallery-DL", "gallery-dl", "gallery-dl", lambda url, out, archive: ["-d", out, *archive, url])
+register_tool("Spot-DL", "spotdl", "spotdl", lambda url, out, archive: [
+    "download", url, "--output", out + os.sep, *archive])
+register_tool("Other-Videos", "yt-dlp", "other-videos", lambda url, out, archive: archive + [
+    "-o", "%(title)s.%(ext)s", "-P", out, url])
+
+
+def tool_names():
+    """What the tool selectors offer: Automatic first, then every registered tool."""
+    return [AUTOMATIC, *TOOLS]
+
+
+def load_config():
+    """The config, read from disk on first use; a missing or broken file gives the defaults."""
+    global _config
+    with _lock:
+        if _config is None:
+            try:
+                with open(CONFIG_PATH, "r") as f:
+                    _config = json.load(f)
+            except (OSError, ValueError):
+                _config = {}
+            if not isinstance(_config, dict):
+                _config = {}
+            _config.setdefault("download_dir", DEFAULT_PATH)
+        return _config
+
+
+def save_config(config):
+    global _config
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    with open(CONFIG_PATH, "w") as f:
+        json.dump(config, f)
+    with _lock:
+        _config = config
+        _ready_dirs.clear()
+
+
+def automatic_index():
+    """automatic.json compiled into a DomainIndex on first use."""
+    global _automatic_index
+    with _lock:
+        if _automatic_index is None:
+            try:
+                with open(AUTOMATIC_MAP_PATH, "r") as f:
+                    _automatic_index = DomainIndex(json.load(f))
+            except (OSError, ValueError):
+                _automatic_index = DomainIndex({})
+        return _automatic_index
+
+
+def ensure_dirs(base):
+    """Create the download folders under `base` and the yt-dlp config, once per process."""
+    if base in _ready_dirs:
+        return
+    for path in [base, os.path.join(base, "log")] + [tool.out_dir(base) for tool in TOOLS.values()]:
+        os.makedirs(path, exist_ok=True)
+    if not os.path.exists(YTDLP_CONFIG_PATH):
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+        with open(YTDLP_CONFIG_PATH, "w") as f:
+            f.write("# yt-dlp config\n# Example: --cookies cookies.txt\n")
+    with _lock:
+        _ready_dirs.add(base)
+
+
+def resolve_tool(tool, url, index=None):
+    """The registered tool that downloads `url`; Automatic asks automatic.json. None if no tool fits."""
+    if tool != AUTOMATIC:
+        return tool if tool in TOOLS else None
+    if not url_host(url):
+        return None
+    return (index or automatic_index()).resolve_tool(url)
+
+
+def build_command(tool, url, base, index=None, use_archive=True):
+    """Return (cmd, resolved_tool); cmd is None when no registered tool fits the URL.
+
+    With `use_archive` the backend keeps its own download archive (see archive.py).
+    """
+    resolved_tool = resolve_tool(tool, url, index)
+    if resolved_tool is None:
+        return None, None
+    spec = TOOLS[resolved_tool]
+    cmd = [spec.backend]
+    if spec.backend == "yt-dlp":
+        cmd += ["--config-location", YTDLP_CONFIG_PATH] + YTDLP_PROGRESS_ARGS
+    archive = archive_args(spec.backend, resolved_tool) if use_archive else []
+    return cmd + spec.args(url, spec.out_dir(base), archive), resolved_tool
@@ -0,0 +1,472 @@
+"""Headless download daemon and its client.
+
+`feliciadl --daemon` runs one Scheduler that owns the persistent queue
+(jobs.db) and the worker pool, and listens on a Unix domain socket in the
+config directory. The CLI and the GUI check for the socket and, when a
+daemon answers, only build commands, submit them and stream status back,
+so scripts, cron jobs and several terminals share one set of workers
+instead of starting competing downloaders. With "ingest" configured it
+also queues URLs from the clipboard and a watch folder (see ingest.py).
+
+The protocol is one JSON object per line in each direction. Requests:
+
+    {"op": "submit", "jobs": [{"url", "tool", "cmd", "resolved_tool", "base"}], "watch": false,
+     "priority": "normal"}
+        -> {"ok": true, "ids": [...]}, then events for those ids if "watch"
+    {"op": "watch", "ids": [...]}     (ids null: every job)
+        -> {"ok": true}, then the current state of each id, then events
+    {"op": "status"}                  -> {"ok": true, "stats": {...}, "postprocess": {...} or null,
+                                          "running": [...], "queued": [...]}
+    {"op": "cancel", "ids": [...]}    -> {"ok": true, "cancelled": n}
+    {"op": "pause", "ids": [...]}     -> {"ok": true, "paused": n}
+    {"op": "unpause", "ids": [...]}   -> {"ok": true, "resumed": n}   (ids null: every paused job)
+    {"op": "resume"}                  -> {"ok": true, "resumed": n}   (picks up queued jobs from jobs.db)
+    {"op": "shutdown"}                -> {"ok": true}
+
+Events are {"event": "state", "id", "state", "returncode", "failure", "attempts"},
+{"event": "retry", "id", "failure", "delay", "attempts"},
+{"event": "progress", "id", "progress": {...}} and
+{"event": "line", "id", "stream", "text"}.
+"""
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import subprocess
+import threading
+
+import ytdlp_engine
+from archive import Archive, single_item
+from bandwidth import BandwidthBudget
+from batching import Chunk, DEFAULT_CHUNK_SIZE
+from ingest import Ingestor, entries_for
+from jobstore import JobStore, CONFIG_DIR, DONE, FAILED, CANCELLED
+import postprocess
+import proctree
+from procstream import iter_output
+from progress import parser_for
+from retry import RetryPolicy
+from scratch import Scratch
+from telemetry import Telemetry
+from scheduler import Scheduler, Job, Batch, DEFAULT_WORKERS, DEFAULT_DOMAIN_DELAY, NORMAL, PRIORITIES
+
+SOCKET_PATH = os.path.join(CONFIG_DIR, "daemon.sock")
+PROGRESS_INTERVAL = 0.5
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+# events queued for one slow watcher before further events are dropped
+_WATCH_BACKLOG = 10000
+
+
+class DaemonError(Exception):
+    pass
+
+
+# --- client side -------------------------------------------------------------
+
+class DaemonClient:
+    """One connection to a running daemon."""
+
+    def __init__(self, path=SOCKET_PATH, timeout=5):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self._file = self.sock.makefile("rw", encoding="utf-8", newline="\n")
+
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, op, **fields):
+        self._file.write(json.dumps(dict(fields, op=op)) + "\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise DaemonError("daemon closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise DaemonError(reply.get("error", "request failed"))
+        return reply
+
+    def submit(self, entries, watch=False, priority=NORMAL):
+        """Queue (url, tool, cmd, resolved_tool, base) entries and return their ids."""
+        jobs = [{"url": url, "tool": tool, "cmd": cmd, "resolved_tool": resolved_tool, "base": base}
+                for url, tool, cmd, resolved_tool, base in entries]
+        return self.request("submit", jobs=jobs, watch=watch, priority=priority)["ids"]
+
+    def events(self):
+        """Yield events after a watching submit or watch request, until the daemon goes away."""
+        self.sock.settimeout(None)
+        for line in self._file:
+            yield json.loads(line)
+
+
+def connect(path=SOCKET_PATH):
+    """Return a DaemonClient if a daemon is listening on `path`, else None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return DaemonClient(path)
+    except OSError:
+        return None
+
+
+def is_running(path=SOCKET_PATH):
+    client = connect(path)
+    if client is None:
+        return False
+    client.close()
+    return True
+
+
+def cancel(ids, path=SOCKET_PATH):
+    """Cancel jobs on the daemon from a fresh connection (usable while another one is watching)."""
+    # the daemon answers once the jobs' processes are gone, which can take stop_grace seconds
+    with DaemonClient(path, timeout=30) as client:
+        return client.request("cancel", ids=list(ids))["cancelled"]
+
+
+# --- daemon side -------------------------------------------------------------
+
+class _Watcher:
+    def __init__(self, ids):
+        self.ids = None if ids is None else set(ids)
+        self.events = queue.Queue(_WATCH_BACKLOG)
+
+    def wants(self, job_id):
+        return self.ids is None or job_id in self.ids
+
+
+class Daemon:
+    """Scheduler plus event fan-out; the socket server below only translates requests."""
+
+    def __init__(self, config, store=None):
+        self.store = store or JobStore()
+        self.pool = ytdlp_engine.from_config(config)
+        self.post_pool = postprocess.from_config(config)
+        self.scratch = Scratch.from_config(config)
+        self.telemetry = Telemetry.from_config(config)
+        self.archive = Archive() if config.get("archive", True) else None
+        self.base = config["download_dir"]
+        self.ingestor = Ingestor.from_config(config, self._ingest, log=lambda text: print(text, flush=True))
+        self.scheduler = Scheduler(
+            self._run_job,
+            workers=config.get("workers", DEFAULT_WORKERS),
+            backend_limits=config.get("backend_limits"),
+            domain_delay=config.get("domain_delay", DEFAULT_DOMAIN_DELAY),
+            store=self.store,
+            run_chunk=self._run_chunk,
+            chunk_size=config.get("chunk_size", DEFAULT_CHUNK_SIZE),
+            retry_policy=RetryPolicy.from_config(config),
+            on_retry=self._on_retry,
+            budget=BandwidthBudget.from_config(config),
+            adjustable=lambda job: self.pool is not None and job.backend == "yt-dlp",
+            host_limit=config.get("host_connections"),
+            remove_partial=config.get("remove_partial", True),
+            stop_grace=config.get("stop_grace", proctree.DEFAULT_GRACE),
+            on_stopped=self._on_stopped,
+        )
+        self._watchers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # --- jobs ---
+
+    def submit(self, entries, watcher=None, priority=NORMAL):
+        """Queue entries and return their ids; `watcher` (from watch()) is pointed at them first."""
+        ids = self.store.add_many(entries, priority)
+        if watcher is not None:
+            watcher.ids = set(ids)
+        self._enqueue([Job(url, tool, cmd, resolved_tool, job_id=job_id, priority=priority)
+                       for job_id, (url, tool, cmd, resolved_tool, _) in zip(ids, entries)])
+        return ids
+
+    def resume(self):
+        """Queue unfinished jobs from the store that this daemon is not already running."""
+        live = self.scheduler.job_ids()
+        rows = [r for r in self.store.unfinished() if r["id"] not in live]
+        self._enqueue([Job(r["url"], r["tool"], r["cmd"], r["resolved_tool"], job_id=r["id"], priority=r["priority"])
+                       for r in rows])
+        return len(rows)
+
+    def _ingest(self, urls):
+        """Queue a batch of URLs from the clipboard or the watch folder (see ingest.py)."""
+        entries, skipped = entries_for(urls, self.ingestor.tool, self.base, self.archive)
+        ids = self.submit(entries, priority=self.ingestor.priority) if entries else []
+        print(f"📥 Queued {len(ids)} ingested URL(s)" + (f", skipped {skipped}" if skipped else ""), flush=True)
+
+    def _enqueue(self, jobs):
+        if not jobs:
+            return
+        batch = Batch(len(jobs), on_progress=self._on_finished)
+        for job in jobs:
+            job.batch = batch
+        self.scheduler.submit(jobs)
+
+    def _on_finished(self, batch, job):
+        self.publish({"event": "state", "id": job.job_id, "state": job.state, "returncode": job.returncode,
+                      "failure": job.failure, "attempts": job.attempts})
+        if job.state == DONE and self.archive is not None and single_item(job.backend, job.url):
+            self.archive.add(job.url, job.resolved_tool)
+        # jobs stopped by a shutdown are requeued, not finished
+        if self.telemetry is not None and not self._stop.is_set():
+            row = self.store.get(job.job_id)
+            if row and row["base"]:
+                self.telemetry.record(job, row["base"])
+
+    def _on_retry(self, job, delay):
+        self.publish({"event": "retry", "id": job.job_id, "failure": job.failure, "delay": delay,
+                      "attempts": job.attempts})
+
+    def _on_stopped(self, report):
+        print(f"⛔ Cancelled: {report.summary()}", flush=True)
+
+    def _run_job(self, job):
+        if job.state == CANCELLED:
+            return -1
+        self.publish({"event": "state", "id": job.job_id, "state": "running", "returncode": None})
+        parser = parser_for(job.backend)
+        job.progress = parser.progress
+        cmd, task = postprocess.split(self.post_pool, job.command(), [job], self.scratch)
+        return postprocess.follow(self.post_pool, self._execute(cmd, parser, [job]), task, job)
+
+    def _run_chunk(self, jobs):
+        chunk = Chunk(jobs)
+        try:
+            for job in jobs:
+                self.publish({"event": "state", "id": job.job_id, "state": "running", "returncode": None})
+            parser = parser_for(chunk.backend)
+            jobs[0].progress = parser.progress
+            cmd, task = postprocess.split(self.post_pool, chunk.cmd, jobs, self.scratch)
+            codes = chunk.results(self._execute(cmd, parser, jobs))
+        finally:
+            chunk.cleanup()
+        return postprocess.follow_chunk(self.post_pool, codes, task, jobs)
+
+    def _execute(self, cmd, parser, jobs):
+        def on_start(process):
+            for job in jobs:
+                job.process = process
+
+        def on_line(stream, text):
+            for job in jobs:
+                job.note_line(stream, text)
+                self.publish({"event": "line", "id": job.job_id, "stream": stream, "text": text})
+
+        if self.pool is not None and cmd[0] == "yt-dlp":
+            return self.pool.run(cmd, parser.progress, on_line=on_line, on_start=on_start,
+                                 rate=lambda: jobs[0].rate_limit)
+
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   **proctree.SESSION)
+        on_start(process)
+        for out in iter_output(process):
+            if not parser.feed(out.text):
+                on_line(out.stream, out.text)
+        return process.wait()
+
+    # --- events ---
+
+    def watch(self, ids):
+        watcher = _Watcher(ids)
+        with self._lock:
+            self._watchers.append(watcher)
+        # late watchers still learn about jobs that already finished
+        for job_id in ids or ():
+            row = self.store.get(job_id)
+            if row:
+                watcher.events.put_nowait({"event": "state", "id": job_id, "state": row["state"],
+                                           "returncode": row["returncode"]})
+        return watcher
+
+    def unwatch(self, watcher):
+        with self._lock:
+            if watcher in self._watchers:
+                self._watchers.remove(watcher)
+
+    def publish(self, event):
+        with self._lock:
+            watchers = [w for w in self._watchers if w.wants(event["id"])]
+        for watcher in watchers:
+            try:
+                watcher.events.put_nowait(event)
+            except queue.Full:
+                pass
+
+    def _progress_loop(self):
+        last = {}
+        while not self._stop.wait(PROGRESS_INTERVAL):
+            running, _ = self.scheduler.jobs()
+            seen = {}
+            for job in running:
+                if job.progress is None:
+                    continue
+                values = job.progress.as_dict()
+                seen[job.job_id] = values
+                if last.get(job.job_id) != values:
+                    self.publish({"event": "progress", "id": job.job_id, "progress": values})
+            last = seen
+
+    # --- lifecycle ---
+
+    def status(self):
+        running, queued = self.scheduler.jobs()
+
+        def describe(job):
+            return {"id": job.job_id, "url": job.url, "tool": job.tool, "resolved_tool": job.resolved_tool,
+                    "state": job.state, "priority": job.priority, "progress": job.progress.as_dict() if job.progress else None}
+
+        return {"stats": self.scheduler.stats(),
+                "postprocess": self.post_pool.stats() if self.post_pool is not None else None,
+                "running": [describe(j) for j in running],
+                "queued": [describe(j) for j in queued]}
+
+    def start(self):
+        threading.Thread(target=self._progress_loop, daemon=True).start()
+        if self.ingestor is not None:
+            self.ingestor.start()
+
+    def stop(self):
+        """Stop workers; killed jobs are put back to queued so the next start resumes them."""
+        self._stop.set()
+        if self.ingestor is not None:
+            self.ingestor.stop()
+        running, queued = self.scheduler.jobs()
+        self.scheduler.store = None
+        # keep partial files, the jobs continue from them on the next start
+        self.scheduler.cancel(remove_partial=False)
+        for job in running + queued:
+            if job.job_id is not None:
+                self.store.mark(job.job_id, "queued")
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.post_pool is not None:
+            self.post_pool.shutdown()
+        if self.telemetry is not None:
+            self.telemetry.close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request.get("op")
+                if op == "submit":
+                    entries = [(j["url"], j["tool"], j["cmd"], j.get("resolved_tool"), j.get("base"))
+                               for j in request["jobs"]]
+                    priority = request.get("priority") or NORMAL
+                    if priority not in PRIORITIES:
+                        raise ValueError(f"unknown priority: {priority}")
+                    if request.get("watch"):
+                        # register before queueing so no event can slip past
+                        watcher = daemon.watch([])
+                        ids = daemon.submit(entries, watcher, priority)
+                        self._send({"ok": True, "ids": ids})
+                        return self._stream(watcher)
+                    self._send({"ok": True, "ids": daemon.submit(entries, priority=priority)})
+                elif op == "watch":
+                    watcher = daemon.watch(request.get("ids"))
+                    self._send({"ok": True})
+                    return self._stream(watcher)
+                elif op == "status":
+                    self._send(dict(daemon.status(), ok=True))
+                elif op == "resume":
+                    self._send({"ok": True, "resumed": daemon.resume()})
+                elif op == "cancel":
+                    self._send({"ok": True, "cancelled": daemon.scheduler.cancel_ids(request.get("ids") or [])})
+                elif op == "pause":
+                    self._send({"ok": True, "paused": daemon.scheduler.pause_ids(request.get("ids") or [])})
+                elif op == "unpause":
+                    self._send({"ok": True, "resumed": daemon.scheduler.resume_ids(request.get("ids"))})
+                elif op == "shutdown":
+                    self._send({"ok": True})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                else:
+                    self._send({"ok": False, "error": f"unknown op: {op}"})
+            except (ValueError, KeyError, TypeError) as e:
+                self._send({"ok": False, "error": str(e)})
+
+    def _send(self, message):
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream(self, watcher):
+        daemon = self.server.daemon
+        # ids is None for "every job"; otherwise stop once all watched jobs are final
+        remaining = None if watcher.ids is None else set(watcher.ids)
+        try:
+            while remaining is None or remaining:
+                try:
+                    event = watcher.events.get(timeout=1)
+                except queue.Empty:
+                    continue
+                self._send(event)
+                if remaining is not None and event["event"] == "state" and event["state"] in FINAL_STATES:
+                    remaining.discard(event["id"])
+        except OSError:
+            pass
+        finally:
+            daemon.unwatch(watcher)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(config, path=SOCKET_PATH, store=None):
+    """Run the daemon in the foreground until `shutdown`, SIGTERM or Ctrl-C.
+
+    `store` replaces jobs.db. Off the main thread (e.g. in tests) SIGTERM is left alone.
+    """
+    if os.path.exists(path):
+        if is_running(path):
+            raise DaemonError(f"a daemon is already listening on {path}")
+        os.unlink(path)  # stale socket from a daemon that did not exit cleanly
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    daemon = Daemon(config, store)
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon = daemon
+
+    def on_term(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, on_term)
+
+    resumed = daemon.resume()
+    daemon.start()
+    print(f"🛰️  FeliciaDL daemon listening on {path}" + (f" ({resumed} job(s) resumed)" if resumed else ""), flush=True)
+    try:
+        server.serve_forever(poll_interval=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        print("👋 Daemon stopped.", flush=True)
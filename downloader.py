@@ -3,46 +3,653 @@ import os
 import sys
 import subprocess
 import json
-from datetime import datetime
+import shutil
+import time
+import threading
 import argparse
+import atexit
 
-CONFIG_DIR = os.path.expanduser("~/.config/feliciadl")
-CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-YTDLP_CONFIG_PATH = os.path.join(CONFIG_DIR, "yt-dlp.conf")
-DEFAULT_PATH = os.path.expanduser("~/Downloads/FeliciaDL")
-
-def load_config():
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
-    return {"download_dir": DEFAULT_PATH}
-
-def save_config(config):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(config, f)
-
-def ensure_dirs(base):
-    folders = [
-        base,
-        os.path.join(base, "downloaded/youtube-dl-video"),
-        os.path.join(base, "downloaded/youtube-dl-audio"),
-        os.path.join(base, "downloaded/spotdl"),
-        os.path.join(base, "downloaded/gallery-dl"),
-        os.path.join(base, "downloaded/other-videos"),
-        os.path.join(base, "log")
-    ]
-    for path in folders:
-        os.makedirs(path, exist_ok=True)
-
-    if not os.path.exists(YTDLP_CONFIG_PATH):
-        with open(YTDLP_CONFIG_PATH, "w") as f:
-            f.write("# yt-dlp config\n")
-
-def log_action(base, tool, url):
-    log_path = os.path.join(base, "log", "download.log")
-    with open(log_path, "a") as f:
-        f.write(f"[{datetime.now()}] {tool}: {url}\n")
+import daemon
+from core import DEFAULT_PATH, load_config, save_config, ensure_dirs, build_command, resolve_tool
+from archive import Archive, canonical_url, single_item
+from bandwidth import BandwidthBudget
+import ytdlp_engine
+import postprocess
+import proctree
+from scratch import Scratch, NoSpace
+from telemetry import Telemetry, events_path, read_events, summarize, format_stats
+from procstream import iter_output
+from progress import Progress, parser_for, format_eta
+from expand import Expander, apply as apply_expansion, describe as describe_expansion, batch_eta
+from batching import Chunk, DEFAULT_CHUNK_SIZE
+from jobstore import JobStore, format_job, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from retry import RetryPolicy, classify, FAILURE_LABELS
+from scheduler import Scheduler, Job, Batch, DEFAULT_WORKERS, DEFAULT_DOMAIN_DELAY, NORMAL, PRIORITIES
+
+# CLI flag (argparse dest) -> tool name, as in the GUI's tool selector
+TOOL_FLAGS = {
+    "yt_dlp_video": "Youtube-DL-Video",
+    "yt_dlp_audio": "Youtube-DL-Audio",
+    "gallery_dl": "Gallery-DL",
+    "spotdl": "Spot-DL",
+    "videoother": "Other-Videos",
+    "auto": "Automatic",
+}
+
+SKIPPED = "skipped"
+
+def collect_urls(values, input_file=None):
+    """Flag values plus --input-file lines; '-' reads stdin. Blank lines and # comments are skipped."""
+    urls = []
+
+    def add_lines(lines):
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+
+    for value in values:
+        if value == "-":
+            add_lines(sys.stdin)
+        elif value.strip():
+            urls.append(value.strip())
+    if input_file == "-":
+        add_lines(sys.stdin)
+    elif input_file:
+        with open(input_file, "r") as f:
+            add_lines(f)
+    return urls
+
+
+# set from config in main(); None means every yt-dlp job is its own subprocess
+ytdlp_pool = None
+post_pool = None
+scratch_area = None
+
+class ProgressPrinter:
+    """Passes output through and keeps one live progress status line on a terminal."""
+
+    def __init__(self, progress, prefix=""):
+        self.progress = progress
+        self.prefix = prefix
+        self.tty = sys.stdout.isatty()
+        self.status_shown = False
+        self.last_summary = ""
+        self._lock = threading.Lock()
+
+    def show_status(self):
+        with self._lock:
+            self._show_status()
+
+    def _show_status(self):
+        summary = self.progress.summary()
+        if summary and summary != self.last_summary and self.tty:
+            sys.stdout.write(f"\r\033[K{self.prefix}{summary}")
+            sys.stdout.flush()
+            self.status_shown = True
+            self.last_summary = summary
+
+    def line(self, stream, text):
+        if not text.strip():
+            return
+        with self._lock:
+            self._line(stream, text)
+
+    def _line(self, stream, text):
+        if self.status_shown:
+            sys.stdout.write("\r\033[K")
+            self.status_shown = False
+            self.last_summary = ""
+        out = sys.stderr if stream == "stderr" else sys.stdout
+        out.write(text + "\n")
+        out.flush()
+        self._show_status()
+
+    def close(self):
+        if self.status_shown:
+            sys.stdout.write("\n")
+
+class MultiProgress:
+    """Compact display for many jobs: a counter line plus one line per running job.
+
+    On a terminal the block is redrawn in place; otherwise only finished jobs
+    and the jobs' stderr lines are printed. Everything goes to stderr so
+    stdout stays free for --summary -.
+    """
+
+    MAX_LINES = 10
+
+    def __init__(self, total, out=sys.stderr):
+        self.total = total
+        self.out = out
+        self.tty = out.isatty()
+        self.active = {}  # key -> [label, Progress]
+        self.done = 0
+        self.failed = 0
+        self.stages = None  # optional callable describing the queue depth per stage
+        self._drawn = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if self.tty:
+            threading.Thread(target=self._tick, daemon=True).start()
+
+    def start(self, key, label, progress=None):
+        with self._lock:
+            self.active[key] = [label, progress or Progress()]
+
+    def set_progress(self, key, progress):
+        with self._lock:
+            if key in self.active:
+                self.active[key][1] = progress
+
+    def line(self, key, stream, text):
+        if stream == "stderr" and text.strip():
+            self._print(f"[#{key}] {text.strip()}")
+
+    def finish(self, key, label, state, detail=""):
+        with self._lock:
+            self.active.pop(key, None)
+            if state == DONE:
+                self.done += 1
+            else:
+                self.failed += 1
+        icon = {DONE: "✅", CANCELLED: "⛔"}.get(state, "❌")
+        self._print(f"{icon} [#{key}] {label}" + (f"  ({detail})" if detail else ""))
+
+    def retry(self, key, label, failure, delay):
+        with self._lock:
+            self.active.pop(key, None)
+        self._print(f"🔁 [#{key}] {FAILURE_LABELS.get(failure, failure)}, retrying in {delay:.0f}s: {label}")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._clear()
+            self.out.flush()
+
+    def _tick(self):
+        while not self._stop.wait(0.5):
+            with self._lock:
+                self._clear()
+                self._draw()
+
+    def _print(self, text):
+        with self._lock:
+            self._clear()
+            self.out.write(text + "\n")
+            self._draw()
+
+    def _clear(self):
+        if self._drawn:
+            # cursor to the start of the first status line, erase to the end of the screen
+            self.out.write(f"\033[{self._drawn}F\033[J")
+            self._drawn = 0
+
+    def _draw(self):
+        if not self.tty or self._stop.is_set():
+            self.out.flush()
+            return
+        width = max(20, shutil.get_terminal_size().columns - 1)
+        stages = self.stages() if self.stages else f"{len(self.active)} running"
+        lines = [f"[{self.done + self.failed}/{self.total}] ✅ {self.done} ❌ {self.failed} · {stages}"]
+        for key, (label, progress) in list(self.active.items())[:self.MAX_LINES]:
+            lines.append(f"  #{key} {progress.summary() or 'starting'}  {label}"[:width])
+        if len(self.active) > self.MAX_LINES:
+            lines.append(f"  … {len(self.active) - self.MAX_LINES} more")
+        self.out.write("\n".join(lines) + "\n")
+        self.out.flush()
+        self._drawn = len(lines)
+
+def execute(cmd, parser, on_line, on_start=None, rate=None):
+    """Run cmd (or hand yt-dlp to the engine) and return its exit code.
+
+    Progress lines go to `parser`, all other output to on_line(stream, text).
+    `rate()` is the job's current bandwidth share, followed by engine jobs.
+    """
+    if ytdlp_pool is not None and cmd[0] == "yt-dlp":
+        return ytdlp_pool.run(cmd, parser.progress, on_line=on_line, on_start=on_start, rate=rate)
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **proctree.SESSION)
+    if on_start:
+        on_start(process)
+    for out in iter_output(process):
+        if not parser.feed(out.text):
+            on_line(out.stream, out.text)
+    return process.wait()
+
+def engine_adjustable(job):
+    """Jobs on the in-process engine follow bandwidth rebalancing while they run."""
+    return ytdlp_pool is not None and job.backend == "yt-dlp"
+
+def run_with_progress(cmd, prefix="", on_start=None, on_line=None, rate=None, parser=None):
+    """Run cmd, pass its output through and turn progress lines into one status line.
+
+    `on_line(stream, text)` additionally sees every non-progress line.
+    """
+    parser = parser or parser_for(cmd[0])
+    printer = ProgressPrinter(parser.progress, prefix)
+    stop = threading.Event()
+
+    def line(stream, text):
+        printer.line(stream, text)
+        if on_line:
+            on_line(stream, text)
+
+    def ticker():
+        while not stop.wait(0.5):
+            printer.show_status()
+
+    threading.Thread(target=ticker, daemon=True).start()
+    try:
+        return execute(cmd, parser, line, on_start=on_start, rate=rate)
+    finally:
+        stop.set()
+        printer.close()
+
+def run_queued_job(job):
+    print(f"🚀 [#{job.job_id}] {job.tool}: {job.url}")
+    def on_start(process):
+        job.process = process
+    cmd, task = postprocess.split(post_pool, job.command(), [job], scratch_area)
+    parser = parser_for(job.backend)
+    job.progress = parser.progress
+    code = run_with_progress(cmd, prefix=f"[#{job.job_id}] ", on_start=on_start, on_line=job.note_line,
+                             rate=lambda: job.rate_limit, parser=parser)
+    return postprocess.follow(post_pool, code, task, job)
+
+def run_queued_chunk(jobs):
+    ids = ", ".join(f"#{job.job_id}" for job in jobs)
+    print(f"📦 [{ids}] {jobs[0].tool}: {len(jobs)} URLs in one run")
+    chunk = Chunk(jobs)
+    def on_start(process):
+        for job in jobs:
+            job.process = process
+    def on_line(stream, text):
+        for job in jobs:
+            job.note_line(stream, text)
+    cmd, task = postprocess.split(post_pool, chunk.cmd, jobs, scratch_area)
+    try:
+        codes = chunk.results(run_with_progress(cmd, on_start=on_start, on_line=on_line,
+                                                rate=lambda: jobs[0].rate_limit))
+    finally:
+        chunk.cleanup()
+    return postprocess.follow_chunk(post_pool, codes, task, jobs)
+
+def job_result(url, tool, resolved_tool, job_id, state, returncode, reason=None, attempts=0):
+    """One entry of the --summary report; `reason` is the skip reason or the failure class."""
+    return {"url": url, "tool": tool, "resolved_tool": resolved_tool, "id": job_id,
+            "state": state, "returncode": returncode, "reason": reason, "attempts": attempts}
+
+def print_stopped(report):
+    print(f"⛔ Stopped: {report.summary()}", file=sys.stderr)
+
+def print_retry(job, delay):
+    print(f"🔁 [#{job.job_id}] {FAILURE_LABELS.get(job.failure, job.failure)}, retrying in {delay:.0f}s: {job.url}")
+
+# set from config in main(); None when --no-archive or "archive": false
+download_archive = None
+# set from config in main(); None when "telemetry": false
+job_telemetry = None
+
+def record_finished(job, base):
+    """Log the finished job's telemetry event; done single items also go into the download archive."""
+    if job_telemetry is not None:
+        job_telemetry.record(job, base)
+    if job.state == DONE and download_archive is not None and single_item(job.backend, job.url):
+        download_archive.add(job.url, job.resolved_tool)
+
+def run_single(entry, config, info=None):
+    """Download one entry in this process with passthrough output; returns its result.
+
+    Transient and rate-limited failures are retried as the retry policy allows.
+    `info` is what expansion learned about the URL (see expand.py).
+    """
+    url, tool, cmd, resolved_tool, base = entry
+    store = JobStore()
+    policy = RetryPolicy.from_config(config)
+    budget = BandwidthBudget.from_config(config)
+    job = Job(url, tool, cmd, resolved_tool, job_id=store.add(url, tool, cmd, resolved_tool, base))
+    apply_expansion(job, info)
+    print(f"🚀 Running: {' '.join(cmd)}")
+    job.started_at = time.time()
+    while True:
+        job.attempts += 1
+        job.stderr_tail.clear()
+        store.mark(job.job_id, RUNNING)
+        # alone in this process, so the job gets the whole budget
+        job.rate_limit = budget.limit_now() if budget is not None else None
+        on_start = lambda process: setattr(job, "process", process)
+        try:
+            download_cmd, task = postprocess.split(post_pool, job.command(), [job], scratch_area)
+            parser = parser_for(job.backend, job.items)
+            job.progress = parser.progress
+            returncode = run_with_progress(download_cmd, on_line=job.note_line, on_start=on_start, parser=parser)
+            if returncode == 0 and task is not None:
+                print("⚙️  Post-processing…")
+            returncode = postprocess.finish(post_pool, returncode, task, job)
+        except NoSpace as e:
+            print(f"❌ {e}")
+            job.note_line("stderr", str(e))
+            returncode = 1
+        except KeyboardInterrupt:
+            # the backend runs in its own session, so Ctrl+C only reached us
+            report = proctree.stop([job.process], config.get("stop_grace", proctree.DEFAULT_GRACE),
+                                   config.get("remove_partial", True))
+            if report.summary():
+                print_stopped(report)
+            store.mark(job.job_id, CANCELLED)
+            job.state = CANCELLED
+            record_finished(job, base)
+            return job_result(url, tool, resolved_tool, job.job_id, CANCELLED, None, attempts=job.attempts)
+        if returncode == 0:
+            break
+        job.failure = classify(job.backend, returncode, job.stderr_tail)
+        delay = policy.delay(job.failure, job.attempts)
+        if delay is None:
+            break
+        store.mark(job.job_id, QUEUED, returncode)
+        print_retry(job, delay)
+        time.sleep(delay)
+
+    state = DONE if returncode == 0 else FAILED
+    store.mark(job.job_id, state, returncode)
+    job.state, job.returncode = state, returncode
+    record_finished(job, base)
+    return job_result(url, tool, resolved_tool, job.job_id, state, returncode,
+                      job.failure if state == FAILED else None, job.attempts)
+
+def run_many(entries, config, workers, infos=None, priority=NORMAL):
+    """Download several entries on a local Scheduler with a MultiProgress display.
+
+    `infos` holds what expansion learned about each entry (see expand.py).
+    Returns one result per entry. Ctrl-C cancels whatever has not finished.
+    """
+    store = JobStore()
+    ids = store.add_many(entries, priority)
+    display = MultiProgress(len(entries))
+
+    def label(job):
+        return f"{job.resolved_tool}: {job.url}"
+
+    def run_job(job):
+        if job.state == CANCELLED:
+            return -1
+        parser = parser_for(job.backend, job.items)
+        job.progress = parser.progress
+        display.start(job.job_id, label(job), parser.progress)
+        def on_line(stream, text):
+            job.note_line(stream, text)
+            display.line(job.job_id, stream, text)
+
+        cmd, task = postprocess.split(post_pool, job.command(), [job], scratch_area)
+        code = execute(cmd, parser, on_line, on_start=lambda process: setattr(job, "process", process),
+                       rate=lambda: job.rate_limit)
+        return postprocess.follow(post_pool, code, task, job)
+
+    def run_chunk(jobs):
+        chunk = Chunk(jobs)
+        parser = parser_for(chunk.backend)
+        for job in jobs:
+            job.progress = parser.progress
+            display.start(job.job_id, label(job), parser.progress)
+
+        def on_start(process):
+            for job in jobs:
+                job.process = process
+
+        def on_line(stream, text):
+            for job in jobs:
+                job.note_line(stream, text)
+            display.line(jobs[0].job_id, stream, text)
+
+        cmd, task = postprocess.split(post_pool, chunk.cmd, jobs, scratch_area)
+        try:
+            codes = chunk.results(execute(cmd, parser, on_line, on_start=on_start, rate=lambda: jobs[0].rate_limit))
+        finally:
+            chunk.cleanup()
+        return postprocess.follow_chunk(post_pool, codes, task, jobs)
+
+    def on_progress(batch, job):
+        detail = FAILURE_LABELS.get(job.failure, "") if job.state == FAILED else ""
+        display.finish(job.job_id, label(job), job.state, detail)
+        record_finished(job, config["download_dir"])
+
+    batch = Batch(len(entries), on_progress=on_progress)
+    jobs = [Job(url, tool, cmd, resolved_tool, batch=batch, job_id=job_id, priority=priority)
+            for job_id, (url, tool, cmd, resolved_tool, _) in zip(ids, entries)]
+    for job, info in zip(jobs, infos or []):
+        apply_expansion(job, info)
+    scheduler = Scheduler(
+        run_job,
+        workers=workers,
+        backend_limits=config.get("backend_limits"),
+        domain_delay=config.get("domain_delay", DEFAULT_DOMAIN_DELAY),
+        store=store,
+        run_chunk=run_chunk,
+        chunk_size=config.get("chunk_size", DEFAULT_CHUNK_SIZE),
+        retry_policy=RetryPolicy.from_config(config),
+        on_retry=lambda job, delay: display.retry(job.job_id, label(job), job.failure, delay),
+        budget=BandwidthBudget.from_config(config),
+        adjustable=engine_adjustable,
+        host_limit=config.get("host_connections"),
+        remove_partial=config.get("remove_partial", True),
+        stop_grace=config.get("stop_grace", proctree.DEFAULT_GRACE),
+        on_stopped=print_stopped,
+    )
+
+    def stages():
+        text = postprocess.stage_summary(scheduler.stats(), post_pool.stats() if post_pool else None)
+        eta = batch_eta(jobs, sum(j.progress.speed or 0 for j in scheduler.running(batch) if j.progress))
+        return f"{text} · ETA {format_eta(eta)}" if eta is not None else text
+
+    display.stages = stages
+    scheduler.submit(jobs)
+    try:
+        while not batch.complete:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        scheduler.cancel(batch)
+        while not batch.complete:
+            time.sleep(0.1)
+    finally:
+        display.close()
+    return [job_result(j.url, j.tool, j.resolved_tool, j.job_id, j.state, j.returncode,
+                       j.failure if j.state == FAILED else None, j.attempts)
+            for j in jobs]
+
+def run_remote(client, entries, compact=False, priority=NORMAL):
+    """Submit entries to the daemon and relay their output like a local run.
+
+    A single entry is shown like a local download unless `compact`; several
+    entries always use MultiProgress.
+    Returns one result per entry. Ctrl-C cancels the submitted jobs on the daemon.
+    """
+    ids = client.submit(entries, watch=True, priority=priority)
+    labels = {job_id: f"{resolved_tool}: {url}" for job_id, (url, _, _, resolved_tool, _) in zip(ids, entries)}
+    multi = MultiProgress(len(ids)) if compact or len(ids) > 1 else None
+    printer = ProgressPrinter(Progress())
+    finals = {}
+    print("🛰️  Queued on daemon as " + ", ".join(f"#{i}" for i in ids), file=sys.stderr if multi else sys.stdout)
+    try:
+        for event in client.events():
+            job_id = event["id"]
+            if job_id not in labels:
+                continue
+            kind = event["event"]
+            final = kind == "state" and event["state"] in daemon.FINAL_STATES
+            if multi is None:
+                if kind == "retry":
+                    printer.line("stdout", f"🔁 {FAILURE_LABELS.get(event['failure'], event['failure'])}, retrying in {event['delay']:.0f}s")
+                elif kind == "line":
+                    printer.line(event["stream"], event["text"])
+                elif kind == "progress":
+                    printer.progress = Progress.from_dict(event["progress"])
+                    printer.show_status()
+            elif final:
+                detail = FAILURE_LABELS.get(event.get("failure"), "") if event["state"] == FAILED else ""
+                multi.finish(job_id, labels[job_id], event["state"], detail)
+            elif kind == "retry":
+                multi.retry(job_id, labels[job_id], event["failure"], event["delay"])
+            elif kind == "state" and event["state"] == RUNNING:
+                multi.start(job_id, labels[job_id])
+            elif kind == "line":
+                multi.line(job_id, event["stream"], event["text"])
+            elif kind == "progress":
+                multi.set_progress(job_id, Progress.from_dict(event["progress"]))
+            if final:
+                finals[job_id] = event
+                if len(finals) == len(ids):
+                    break
+    except KeyboardInterrupt:
+        daemon.cancel([i for i in ids if i not in finals])
+        print("\n⛔ Cancelled on the daemon.", file=sys.stderr)
+    finally:
+        client.close()
+        printer.close()
+        if multi is not None:
+            multi.close()
+
+    results = []
+    for job_id, (url, tool, _, resolved_tool, _) in zip(ids, entries):
+        event = finals.get(job_id, {"state": CANCELLED, "returncode": None})
+        results.append(job_result(url, tool, resolved_tool, job_id, event["state"], event["returncode"],
+                                  event.get("failure") if event["state"] == FAILED else None,
+                                  event.get("attempts", 0)))
+    return results
+
+def report(results, summary_path=None):
+    """Print the outcome and write the JSON summary; returns the process exit code.
+
+    The exit code is 0 when every URL was downloaded or already in the archive.
+    """
+    done = sum(1 for r in results if r["state"] == DONE)
+    skipped = sum(1 for r in results if r["state"] == SKIPPED)
+    failed = len(results) - done - skipped
+    # URLs skipped because they are already downloaded count as success
+    known = sum(1 for r in results if r["reason"] in ("archived", "duplicate"))
+    if len(results) == 1:
+        print("✅ Download completed!" if done else "✅ Already downloaded." if known else "❌ Download failed.")
+    else:
+        print(f"✅ {done} done, ❌ {failed} failed" + (f", ⏭️  {skipped} skipped" if skipped else "") + ".",
+              file=sys.stderr)
+
+    if summary_path:
+        summary = {"total": len(results), "done": done, "failed": failed, "skipped": skipped, "results": results}
+        if summary_path == "-":
+            json.dump(summary, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            with open(summary_path, "w") as f:
+                json.dump(summary, f, indent=2)
+    return 0 if done + known == len(results) else 1
+
+def handle_queue(args, config):
+    store = JobStore()
+
+    if args.queue_list:
+        jobs = store.list()
+        for job in jobs:
+            print(format_job(job))
+        counts = store.counts()
+        print(", ".join(f"{state}: {n}" for state, n in sorted(counts.items())) or "Queue is empty.")
+        return
+
+    if args.queue_clear:
+        print(f"🧹 Removed {store.clear()} finished job(s).")
+        return
+
+    if args.queue_retry is not None:
+        ids = [int(i) for i in args.queue_retry]
+        print(f"🔁 Requeued {store.retry(ids)} job(s).")
+
+    client = daemon.connect()
+    if client is not None:
+        with client:
+            print(f"🛰️  Daemon picked up {client.request('resume')['resumed']} job(s).")
+        return
+
+    jobs = store.unfinished()
+    if not jobs:
+        print("✔️  Nothing left in the queue.")
+        return
+
+    ensure_dirs(config["download_dir"])
+    print(f"📥 Draining {len(jobs)} job(s)...")
+    scheduler = Scheduler(
+        run_queued_job,
+        workers=config.get("workers", DEFAULT_WORKERS),
+        backend_limits=config.get("backend_limits"),
+        domain_delay=config.get("domain_delay", DEFAULT_DOMAIN_DELAY),
+        store=store,
+        run_chunk=run_queued_chunk,
+        chunk_size=config.get("chunk_size", DEFAULT_CHUNK_SIZE),
+        retry_policy=RetryPolicy.from_config(config),
+        on_retry=print_retry,
+        budget=BandwidthBudget.from_config(config),
+        adjustable=engine_adjustable,
+        host_limit=config.get("host_connections"),
+        remove_partial=config.get("remove_partial", True),
+        stop_grace=config.get("stop_grace", proctree.DEFAULT_GRACE),
+        on_stopped=print_stopped,
+    )
+    bases = {j["id"]: j["base"] or config["download_dir"] for j in jobs}
+    interrupted = threading.Event()
+    def on_progress(batch, job):
+        # jobs stopped by Ctrl+C go back to the queue, they have not finished
+        if not interrupted.is_set():
+            record_finished(job, bases[job.job_id])
+
+    batch = Batch(len(jobs), on_progress=on_progress)
+    scheduler.submit([Job(j["url"], j["tool"], j["cmd"], j["resolved_tool"], batch=batch, job_id=j["id"],
+                          priority=j["priority"]) for j in jobs])
+    try:
+        while not batch.complete:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        interrupted.set()
+        running, queued = scheduler.jobs()
+        scheduler.store = None
+        # keep partial files, the jobs continue from them on the next drain
+        scheduler.cancel(batch, remove_partial=False)
+        for job in running + queued:
+            if job.job_id is not None:
+                store.mark(job.job_id, QUEUED)
+        print("\n⛔ Drain interrupted, remaining jobs stay in the queue.")
+        return
+    print(f"✅ {batch.finished - batch.failed} done, ❌ {batch.failed} failed.")
+
+def handle_daemon(args):
+    client = daemon.connect()
+    if client is None:
+        print("💤 No daemon is running.")
+        return
+    with client:
+        if args.daemon_stop:
+            client.request("shutdown")
+            print("🛑 Daemon is shutting down.")
+            return
+        if args.daemon_pause:
+            print(f"⏸️  Paused {client.request('pause', ids=[int(i) for i in args.daemon_pause])['paused']} job(s).")
+            return
+        if args.daemon_resume is not None:
+            ids = [int(i) for i in args.daemon_resume] or None
+            print(f"▶️  Resumed {client.request('unpause', ids=ids)['resumed']} job(s).")
+            return
+        status = client.request("status")
+    paused = [job for job in status["queued"] if job["state"] == "paused"]
+    for job in status["running"] + paused:
+        summary = Progress.from_dict(job["progress"]).summary() if job["progress"] else ""
+        priority = "" if job.get("priority", NORMAL) == NORMAL else f"[{job['priority']}] "
+        print(f"#{job['id']:<5} {job['state']:<10}{priority}{job['tool']}: {job['url']}  {summary}".rstrip())
+    print(postprocess.stage_summary(status["stats"], status.get("postprocess")))
+
+def print_stats(base):
+    path = events_path(base)
+    groups = summarize(read_events(path))
+    if not groups["backend"]:
+        print(f"📊 No jobs recorded in {path} yet.")
+        return
+    print("\n".join(format_stats(groups)))
 
 def main():
     parser = argparse.ArgumentParser(
@@ -53,22 +660,71 @@ def main():
 Examples:
   feliciadl --yt-dlp-video https://youtube.com/watch?v=abc123
   feliciadl --spotdl https://open.spotify.com/track/xyz
+  feliciadl --auto -j 8 --input-file urls.txt --summary results.json
+  some-script | feliciadl --yt-dlp-audio - --summary -
+  feliciadl --queue-list
+  feliciadl --queue-retry 12 13
+  feliciadl --stats
+  feliciadl --daemon
+  feliciadl --priority high --yt-dlp-audio https://youtube.com/watch?v=abc123
 """
     )
 
     group = parser.add_mutually_exclusive_group(required=True)
-    group.add_argument("--yt-dlp-video", help="Download video using yt-dlp")
-    group.add_argument("--yt-dlp-audio", help="Download audio using yt-dlp")
-    group.add_argument("--gallery-dl", help="Download using gallery-dl")
-    group.add_argument("--spotdl", help="Download using spotdl")
-    group.add_argument("--videoother", help="Download with yt-dlp to 'other-videos' folder")
+    group.add_argument("--yt-dlp-video", nargs="*", metavar="URL", help="Download video using yt-dlp")
+    group.add_argument("--yt-dlp-audio", nargs="*", metavar="URL", help="Download audio using yt-dlp")
+    group.add_argument("--gallery-dl", nargs="*", metavar="URL", help="Download using gallery-dl")
+    group.add_argument("--spotdl", nargs="*", metavar="URL", help="Download using spotdl")
+    group.add_argument("--videoother", nargs="*", metavar="URL", help="Download with yt-dlp to 'other-videos' folder")
+    group.add_argument("--auto", nargs="*", metavar="URL", help="Pick the backend per URL from automatic.json")
+    group.add_argument("--queue-list", action="store_true", help="List the persistent job queue")
+    group.add_argument("--queue-drain", action="store_true", help="Run all unfinished jobs in the queue")
+    group.add_argument("--queue-retry", nargs="*", metavar="ID", help="Requeue failed jobs (all, or the given IDs) and drain")
+    group.add_argument("--queue-clear", action="store_true", help="Remove finished jobs from the queue")
+    group.add_argument("--daemon", action="store_true", help="Run the headless download daemon in the foreground")
+    group.add_argument("--daemon-status", action="store_true", help="Show what the daemon is running")
+    group.add_argument("--daemon-stop", action="store_true", help="Stop the daemon (unfinished jobs stay queued)")
+    group.add_argument("--daemon-pause", nargs="+", metavar="ID", help="Pause jobs on the daemon; running ones keep their partial files")
+    group.add_argument("--daemon-resume", nargs="*", metavar="ID", help="Resume paused jobs on the daemon (all, or the given IDs)")
+    group.add_argument("--stats", action="store_true", help="Summarise throughput per backend and domain from the job log")
 
     parser.add_argument("--downloadpath", help="Override download folder base path")
     parser.add_argument("--resetpath", action="store_true", help="Reset to default ~/Downloads/FeliciaDL")
+    parser.add_argument("--no-daemon", action="store_true", help="Download in this process even if a daemon is running")
+    parser.add_argument("--no-wait", action="store_true", help="With a daemon: queue the job and return immediately")
+    parser.add_argument("--input-file", metavar="FILE", help="Read URLs from FILE, one per line ('-' for stdin)")
+    parser.add_argument("-j", "--jobs", type=int, metavar="N", help="Parallel downloads for several URLs (default: workers from config)")
+    parser.add_argument("--no-archive", action="store_true", help="Download even if the URL is in the download archive")
+    parser.add_argument("--priority", choices=PRIORITIES, default=NORMAL,
+                        help="Queue priority of these downloads: high ones start first and pause running low ones")
+    parser.add_argument("--no-expand", action="store_true", help="Download playlists and galleries as one job instead of listing their items first")
+    parser.add_argument("--summary", metavar="FILE", help="Write a JSON summary of per-URL results to FILE ('-' for stdout)")
 
     args = parser.parse_args()
     config = load_config()
 
+    if args.daemon:
+        try:
+            daemon.serve(config)
+        except daemon.DaemonError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        return
+
+    if args.daemon_status or args.daemon_stop or args.daemon_pause or args.daemon_resume is not None:
+        handle_daemon(args)
+        return
+
+    global ytdlp_pool, post_pool, scratch_area, download_archive, job_telemetry
+    ytdlp_pool = ytdlp_engine.from_config(config)
+    post_pool = postprocess.from_config(config)
+    scratch_area = Scratch.from_config(config)
+    use_archive = config.get("archive", True) and not args.no_archive
+    download_archive = Archive() if use_archive else None
+    job_telemetry = Telemetry.from_config(config)
+    if job_telemetry is not None:
+        atexit.register(job_telemetry.close)
+
     if args.resetpath:
         config["download_dir"] = DEFAULT_PATH
         save_config(config)
@@ -80,71 +736,84 @@ Examples:
         save_config(config)
         print("✔️  Download path set to:", config["download_dir"])
 
+    if args.stats:
+        print_stats(config["download_dir"])
+        return
+
+    if args.queue_list or args.queue_drain or args.queue_clear or args.queue_retry is not None:
+        handle_queue(args, config)
+        return
+
+    tool_flag = next((flag for flag in TOOL_FLAGS if getattr(args, flag) is not None), None)
+    if tool_flag is None:
+        print("❌ No valid tool specified.")
+        return
+    tool = TOOL_FLAGS[tool_flag]
+    urls = collect_urls(getattr(args, tool_flag), args.input_file)
+    if not urls:
+        print("❌ No URLs given.")
+        sys.exit(2)
+
     base = config["download_dir"]
     ensure_dirs(base)
 
-    yt_dlp_base = ["yt-dlp", "--config-location", YTDLP_CONFIG_PATH]
-    cmd = []
-    url = ""
-    tool = ""
-
-    if args.yt_dlp_video:
-        tool = "Youtube-DL-Video"
-        cmd = yt_dlp_base + [
-            "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
-            "-o", "%(title)s.%(ext)s",
-            "-P", os.path.join(base, "downloaded/youtube-dl-video"),
-            args.yt_dlp_video
-        ]
-        url = args.yt_dlp_video
-
-    elif args.yt_dlp_audio:
-        tool = "Youtube-DL-Audio"
-        cmd = yt_dlp_base + [
-            "-x", "--audio-format", "mp3",
-            "-o", "%(title)s.%(ext)s",
-            "-P", os.path.join(base, "downloaded/youtube-dl-audio"),
-            args.yt_dlp_audio
-        ]
-        url = args.yt_dlp_audio
-
-    elif args.gallery_dl:
-        tool = "Gallery-DL"
-        cmd = [
-            "gallery-dl",
-            "-d", os.path.join(base, "downloaded/gallery-dl"),
-            args.gallery_dl
-        ]
-        url = args.gallery_dl
-
-    elif args.spotdl:
-        tool = "Spot-DL"
-        cmd = [
-            "spotdl", "download", args.spotdl,
-            "--output", os.path.join(base, "downloaded/spotdl/")
-        ]
-        url = args.spotdl
-
-    elif args.videoother:
-        tool = "Other-Videos"
-        cmd = yt_dlp_base + [
-            "-o", "%(title)s.%(ext)s",
-            "-P", os.path.join(base, "downloaded/other-videos"),
-            args.videoother
-        ]
-        url = args.videoother
+    expanded = [(url, None) for url in urls]
+    expander = None if args.no_expand else Expander.from_config(config)
+    if expander is not None and any(expander.wants(tool, url) for url in urls):
+        print("🔎 Listing playlists and galleries…", file=sys.stderr)
+        expanded = expander.expand(tool, urls)
+        message = describe_expansion(expanded, len(urls))
+        if message:
+            print(message, file=sys.stderr)
 
-    else:
-        print("❌ No valid tool specified.")
+    results = [None] * len(expanded)
+    entries = []
+    infos = []
+    positions = []
+    seen = set()
+    for i, (url, info) in enumerate(expanded):
+        reason = None
+        if download_archive is not None:
+            # the same URL may be wanted again with another tool (audio after video)
+            resolved = resolve_tool(info["tool"] if info else tool, url)
+            canonical = (canonical_url(url), resolved)
+            reason = "duplicate" if canonical in seen else "archived" if download_archive.contains(url, resolved) else None
+            seen.add(canonical)
+        if reason:
+            print(f"⏭️  {'Already downloaded' if reason == 'archived' else 'Duplicate'}: {url}", file=sys.stderr)
+            results[i] = job_result(url, tool, None, None, SKIPPED, None, reason)
+            continue
+        # playlist items keep the tool their playlist resolved to
+        cmd, resolved_tool = build_command(info["tool"] if info else tool, url, base, use_archive=use_archive)
+        if cmd is None:
+            print(f"⚠️  No backend in automatic.json for {url}, skipped.", file=sys.stderr)
+            results[i] = job_result(url, tool, None, None, SKIPPED, None, "unrouted")
+        else:
+            entries.append((url, tool, cmd, resolved_tool, base))
+            infos.append(info)
+            positions.append(i)
+
+    # one URL keeps the plain passthrough output unless stdout is taken by the summary
+    single = len(expanded) == 1 and args.summary != "-"
+    client = None if args.no_daemon or not entries else daemon.connect()
+    if client is not None and args.no_wait:
+        with client:
+            ids = client.submit(entries, priority=args.priority)
+        print("🛰️  Queued on daemon as " + ", ".join(f"#{i}" for i in ids))
         return
 
-    print(f"🚀 Running: {' '.join(cmd)}")
-    try:
-        subprocess.run(cmd, check=True)
-        log_action(base, tool, url)
-        print("✅ Download completed!")
-    except subprocess.CalledProcessError:
-        print("❌ Download failed.")
+    if client is not None:
+        done = run_remote(client, entries, compact=not single, priority=args.priority)
+    elif single and entries:
+        done = [run_single(entries[0], config, infos[0])]
+    elif entries:
+        done = run_many(entries, config, args.jobs or config.get("workers", DEFAULT_WORKERS), infos, args.priority)
+    else:
+        done = []
+    for i, result in zip(positions, done):
+        results[i] = result
+
+    sys.exit(report(results, args.summary))
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,5 @@
+import time
+_startup_marks = [("start", time.perf_counter())]
 import tkinter as tk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
@@ -5,22 +7,39 @@ from tkinter import filedialog, messagebox
 from ttkbootstrap import ttk
 import subprocess
 import os
-import json
 import webbrowser
 import threading
 import sys
-import time
 from tkinter import font
 import re
+from logsink import LogSink
+from procstream import iter_output
+import postprocess
+import proctree
+import core
+from core import CONFIG_DIR, DEFAULT_PATH, load_config, save_config, ensure_dirs, tool_names, resolve_tool
+from scratch import Scratch, NoSpace
+from telemetry import Telemetry
+from archive import Archive, single_item
+from bandwidth import BandwidthBudget
+import ytdlp_engine
+from progress import Progress, parser_for, format_bytes, format_eta
+from ingest import Ingestor, entries_for
+from expand import Expander, apply as apply_expansion, describe as describe_expansion, batch_eta
+from routing import url_host
+from batching import Chunk, DEFAULT_CHUNK_SIZE
+from jobview import JobView, DONE as ROW_DONE, FAILED as ROW_FAILED, STOPPED
+from jobstore import JobStore, format_job, QUEUED, RUNNING, DONE, FAILED, CANCELLED, PAUSED
+from scheduler import Scheduler, Job, Batch, DEFAULT_WORKERS, DEFAULT_DOMAIN_DELAY, NORMAL, PRIORITIES
+from retry import RetryPolicy, classify, FAILURE_LABELS
+_startup_marks.append(("imports", time.perf_counter()))
 
-CONFIG_DIR = os.path.expanduser("~/.config/feliciadl")
-CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
-YTDLP_CONFIG_PATH = os.path.join(CONFIG_DIR, "yt-dlp.conf")
-AUTOMATIC_MAP_PATH = os.path.join(CONFIG_DIR, "automatic.json")
-DEFAULT_PATH = os.path.expanduser("~/Downloads/FeliciaDL")
 APP_ICON_PATH = "/opt/feliciadl/assets/icon.png"
 APP_LOGO_PATH = "/opt/feliciadl/assets/logo.png"
 DEFAULT_THEME = "flatly"
+CONSOLE_FLUSH_MS = 100
+PROGRESS_TICK_MS = 500
+DEFAULT_CONSOLE_LINES = 2000
 
 # define custom fonts for the status lines
 status_font_main = ("TkDefaultFont", 10, "bold")
@@ -28,334 +47,348 @@ status_font_version = ("TkDefaultFont", 9, "italic")
 status_color_version = "#888888"  # grey tone
 
 
-def _run(cmd, timeout=20):
-    try:
-        p = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        return ((p.stdout or "") + (p.stderr or "")).strip()
-    except Exception as e:
-        return f"__ERR__ {e}"
-
 def _set_label(main_lbl, ver_lbl, title, version, up_to_date=True, note=None):
     color = "green" if up_to_date else "red"
     main_lbl.config(text=f"{title} {'Up-to-date' if up_to_date else 'Out-of-date'}", foreground=color)
     ver_text = f"version {version}" + (f" ({note})" if note else "")
     ver_lbl.config(text=ver_text)
 
-def _norm_ver(s: str) -> str:
-    """Normalize a version token like 'stable@2025.10.22.' -> '2025.10.22'"""
-    s = s.strip().strip(".").strip(",")
-    if "@" in s:
-        s = s.split("@", 1)[-1]
-    return s
-
-def check_ytdlp():
-    """Check YT-DLP version and update status."""
-    ver_out = _run(["yt-dlp", "--version"])
-    version = (ver_out.splitlines()[0] if ver_out else "unknown").strip()
-
-    upd_out = _run(["yt-dlp", "--update"])
-    low = upd_out.lower()
-
-    # common "up to date" phrasings (with/without hyphen)
-    if ("up to date" in low) or ("up-to-date" in low) or ("is up to date" in low) or ("is up-to-date" in low):
-        root.after(0, lambda: _set_label(yt_status_label, yt_version_label, "YT-DLP", version, True))
-        return
-
-    # parse: "Latest version: stable@2025.10.22 ..."
-    import re
-    m = re.search(r"latest version:\s*([^\s]+)", low)
-    if m:
-        latest = _norm_ver(m.group(1))
-        if latest == version or version.endswith(latest) or latest.endswith(version):
-            root.after(0, lambda: _set_label(yt_status_label, yt_version_label, "YT-DLP", version, True))
-        else:
-            root.after(0, lambda: _set_label(yt_status_label, yt_version_label, "YT-DLP", version, False, note=f"latest {latest}"))
-        return
+def show_tool_status(tool, status):
+    main_lbl, ver_lbl, title = tool_status_labels[tool]
+    note = None if status["up_to_date"] else f"latest {status['latest']}"
+    root.after(0, lambda: _set_label(main_lbl, ver_lbl, title, status["version"], status["up_to_date"], note=note))
+
+def refresh_tool_statuses_once(force=False):
+    # checks run on background threads (cached on disk) so the UI loads instantly
+    import toolstatus
+    if force:
+        for main_lbl, ver_lbl, title in tool_status_labels.values():
+            main_lbl.config(text=f"{title} Checking...", foreground="")
+    toolstatus.check_all(show_tool_status, force=force)
+
+def build_command(tool, url, base, use_archive=None):
+    """core.build_command with the configured archive default; reports URLs Automatic mode cannot route."""
+    if use_archive is None:
+        use_archive = config.get("archive", True)
+    cmd, resolved_tool = core.build_command(tool, url, base, use_archive=use_archive)
+    if cmd is None and url_host(url):
+        messagebox.showerror("Automatic Mode Error",
+            "Automatic mode not available for this URL.\nPlease use one of the supported templates.")
+    return cmd, resolved_tool
 
-    # fallback: show version without "(status unknown)"
-    root.after(0, lambda: _set_label(yt_status_label, yt_version_label, "YT-DLP", version, True))
 
-def check_gallerydl():
-    """Check Gallery-DL version and update status."""
-    ver_out = _run(["gallery-dl", "--version"])
-    version = (ver_out.splitlines()[0] if ver_out else "unknown").strip()
+def log_to_console(text, stream=None):
+    """Queue a console line; safe to call from any thread."""
+    console_sink.push(text, stream)
+
+
+def flush_console():
+    """Move buffered console lines into output_box in one insert, then trim it to the last N lines."""
+    lines, dropped = console_sink.drain()
+    if lines or dropped:
+        args = []
+        if dropped:
+            args += [f"… {dropped} lines skipped …\n", "dropped"]
+        for text, stream in lines:
+            args += [text + "\n", stream or ()]
+        at_bottom = output_box.yview()[1] >= 0.999
+        output_box.config(state=tk.NORMAL)
+        output_box.insert(tk.END, *args)
+        excess = int(output_box.index("end-1c").split(".")[0]) - 1 - console_max_lines
+        if excess > 0:
+            output_box.delete("1.0", f"{excess + 1}.0")
+        output_box.config(state=tk.DISABLED)
+        if at_bottom:
+            output_box.see(tk.END)
+    root.after(CONSOLE_FLUSH_MS, flush_console)
 
-    upd_out = _run(["gallery-dl", "--update"])
-    low = upd_out.lower()
 
-    # typical: "[update][info] gallery-dl is up to date (1.30.10)"
-    if ("up to date" in low) or ("up-to-date" in low):
-        root.after(0, lambda: _set_label(gallery_status_label, gallery_version_label, "Gallery-DL", version, True))
+active_threads = []
+single_job_ids = set()
+single_processes = set()
+live_progress = []  # Progress of running single downloads
+progress_rows = []  # status row refresh callbacks, run on every progress tick
+
+
+def execute_command(cmd, parser, on_start=None, on_line=None, rate=None):
+    """Run a backend command, relaying its output to the console and its progress to `parser`.
+
+    yt-dlp commands go to the in-process engine when it is enabled. `on_start`
+    receives the process (or engine worker) so callers can kill it;
+    `on_line(stream, text)` also sees every console line; engine jobs follow
+    `rate()`, their current bandwidth share.
+    """
+    def relay(stream, text):
+        text = text.strip()
+        if text:
+            log_to_console(text, stream)
+            if on_line:
+                on_line(stream, text)
+
+    if ytdlp_pool is not None and cmd[0] == "yt-dlp":
+        return ytdlp_pool.run(cmd, parser.progress, on_line=relay, on_start=on_start, rate=rate)
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **proctree.SESSION)
+    if on_start:
+        on_start(process)
+    for out in iter_output(process):
+        if not parser.feed(out.text):
+            relay(out.stream, out.text)
+    return process.wait()
+
+
+failure_report = []  # (job_id, tool, url, failure class, last error line)
+failure_window = None
+
+
+def report_failure(job_id, tool, url, failure, error):
+    """Add a failed download to the failure report (main thread only)."""
+    failure_report.append((job_id, tool, url, failure, error))
+    if failure_window is not None:
+        failure_window["refresh"]()
+
+
+def show_failure_report():
+    """One non-modal window listing failed downloads, instead of a dialog per failure."""
+    global failure_window
+    if failure_window is not None:
+        failure_window["refresh"]()
+        failure_window["win"].deiconify()
+        failure_window["win"].lift()
         return
-
-    # sometimes: "new version available: x.y.z" / "update available: x.y.z"
-    import re
-    m = re.search(r"(new version available|update available)[:\s]+([v]?\d[0-9a-zA-Z\.\-\+]*)", low)
-    if m:
-        latest = _norm_ver(m.group(2))
-        root.after(0, lambda: _set_label(gallery_status_label, gallery_version_label, "Gallery-DL", version, False, note=f"latest {latest}"))
+    if not failure_report:
         return
 
-    # fallback: show version without "(status unknown)"
-    root.after(0, lambda: _set_label(gallery_status_label, gallery_version_label, "Gallery-DL", version, True))
-
-def check_spotdl():
-    ver_out = _run(["spotdl", "--version"])
-    first = (ver_out.splitlines()[0] if ver_out else "").strip()
-    version = (first.split()[-1].strip(",") if "version" in first.lower() else first) or "unknown"
-
-    upd_out = _run(["spotdl", "--check-for-updates"], timeout=30)
-    avail = None
-    for ln in upd_out.splitlines():
-        if ln.lower().startswith("new version available"):
-            # e.g. "New version available: v4.4.3."
-            avail = ln.split(":", 1)[-1].strip().strip(".")
-            break
-
-    if avail:
-        root.after(0, lambda: _set_label(
-            spot_status_label, spot_version_label,
-            "SpotDL", version, False, note=f"latest {avail}"
-        ))
-    else:
-        root.after(0, lambda: _set_label(
-            spot_status_label, spot_version_label,
-            "SpotDL", version, True
-        ))
-
-
-def refresh_tool_statuses_once():
-    # run in background so UI loads instantly
-    threading.Thread(target=lambda: [check_ytdlp(), check_gallerydl(), check_spotdl()], daemon=True).start()
-
-def load_config():
+    win = tk.Toplevel(root)
+    win.title("FeliciaDL Failures")
+    win.geometry("900x300")
+    summary = ttk.Label(win, anchor="w")
+    summary.pack(fill=tk.X, padx=10, pady=(10, 5))
+    tree = ttk.Treeview(win, columns=("failure", "tool", "url", "error"), show="headings")
+    for column, title, width in (("failure", "Reason", 110), ("tool", "Tool", 130), ("url", "URL", 300), ("error", "Last error", 360)):
+        tree.heading(column, text=title)
+        tree.column(column, width=width, stretch=column in ("url", "error"))
+    tree.pack(fill=tk.BOTH, expand=True, padx=10)
+
+    def refresh():
+        tree.delete(*tree.get_children())
+        counts = {}
+        for job_id, tool, url, failure, error in failure_report:
+            tree.insert("", tk.END, values=(FAILURE_LABELS.get(failure, failure), tool, url, error))
+            counts[failure] = counts.get(failure, 0) + 1
+        summary.config(text=f"{len(failure_report)} failed: " + "   ".join(
+            f"{FAILURE_LABELS.get(f, f)}: {n}" for f, n in counts.items()))
+
+    def retry_all():
+        ids = [job_id for job_id, *_ in failure_report if job_id is not None]
+        failure_report.clear()
+        refresh()
+        if ids:
+            job_store.retry(ids)
+            resume_unfinished(ask=False)
+
+    def clear():
+        failure_report.clear()
+        refresh()
+
+    def close():
+        global failure_window
+        failure_window = None
+        win.destroy()
+
+    btns = ttk.Frame(win)
+    btns.pack(fill=tk.X, padx=10, pady=10)
+    ttk.Button(btns, text="Retry All", command=retry_all).pack(side=tk.LEFT)
+    ttk.Button(btns, text="Clear", command=clear).pack(side=tk.LEFT, padx=5)
+    ttk.Button(btns, text="Close", command=close).pack(side=tk.RIGHT)
+    win.protocol("WM_DELETE_WINDOW", close)
+
+    failure_window = {"win": win, "refresh": refresh}
+    refresh()
+
+
+def run_bulk_job(job):
+    """Scheduler callback: run one bulk job on a worker thread and return its exit code."""
+    if job.state == "cancelled":
+        return -1
     try:
-        with open(CONFIG_PATH, "r") as f:
-            return json.load(f)
-    except:
-        return {"download_dir": DEFAULT_PATH, "theme": DEFAULT_THEME}
-
+        parser = parser_for(job.backend, job.items)
+        job.progress = parser.progress
+        cmd, task = postprocess.split(post_pool, job.command(), [job], scratch_area)
+        returncode = execute_command(cmd, parser, on_start=lambda p: setattr(job, "process", p),
+                                     on_line=job.note_line, rate=lambda: job.rate_limit)
+        return postprocess.follow(post_pool, returncode, task, job)
 
-def save_config(config):
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(CONFIG_PATH, "w") as f:
-        json.dump(config, f)
+    except Exception as e:
+        job.note_line("stderr", f"Exception: {e}")
+        log_to_console(f"❌ Exception: {e}\n{job.url}")
+        return -1
 
 
-def load_automatic_mapping():
+def run_bulk_chunk(jobs):
+    """Scheduler callback: run same-backend bulk jobs in one process and return one exit code per job."""
+    chunk = Chunk(jobs)
+    task = None
     try:
-        with open(AUTOMATIC_MAP_PATH, "r") as f:
-            return json.load(f)
-    except:
-        return {}
-
-
-def ensure_ytdlp_config():
-    os.makedirs(CONFIG_DIR, exist_ok=True)
-    if not os.path.exists(YTDLP_CONFIG_PATH):
-        with open(YTDLP_CONFIG_PATH, "w") as f:
-            f.write("# yt-dlp config\n# Example: --cookies cookies.txt\n")
-
-
-def ensure_dirs(base):
-    for folder in [
-        base,
-        os.path.join(base, "downloaded/youtube-dl-video"),
-        os.path.join(base, "downloaded/youtube-dl-audio"),
-        os.path.join(base, "downloaded/spotdl"),
-        os.path.join(base, "downloaded/gallery-dl"),
-        os.path.join(base, "downloaded/other-videos"),
-        os.path.join(base, "log")
-    ]:
-        os.makedirs(folder, exist_ok=True)
-    ensure_ytdlp_config()
-
-
-def build_command(tool, url, base):
-    base_video = os.path.join(base, "downloaded/youtube-dl-video")
-    base_audio = os.path.join(base, "downloaded/youtube-dl-audio")
-    base_spot = os.path.join(base, "downloaded/spotdl")
-    base_gallery = os.path.join(base, "downloaded/gallery-dl")
-    base_other = os.path.join(base, "downloaded/other-videos")
-    yt_base = ["yt-dlp", "--config-location", YTDLP_CONFIG_PATH]
-
-    resolved_tool = tool
-    if tool == "Automatic":
-        try:
-            domain = url.split("/")[2].lower()
-        except IndexError:
-            return None, None
-        matched = False
-        for backend, domains in automatic_map.items():
-            if any(d in domain for d in domains):
-                resolved_tool = {
-                    "yt-dlp": "Youtube-DL-Video",
-                    "gallery-dl": "Gallery-DL",
-                    "spotdl": "Spot-DL"
-                }.get(backend, "Other-Videos")
-                matched = True
-                break
-        if not matched:
-            messagebox.showerror("Automatic Mode Error",
-                "Automatic mode not available for this URL.\nPlease use one of the supported templates.")
-            return None, None
-
-    cmd = {
-        "Youtube-DL-Video": yt_base + [
-            "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
-            "-o", "%(title)s.%(ext)s",
-            "-P", base_video,
-            url
-        ],
-        "Youtube-DL-Audio": yt_base + [
-            "-x", "--audio-format", "mp3",
-            "-o", "%(title)s.%(ext)s",
-            "-P", base_audio,
-            url
-        ],
-        "Gallery-DL": ["gallery-dl", "-d", base_gallery, url],
-        "Spot-DL": ["spotdl", "download", url, "--output", base_spot],
-        "Other-Videos": ["yt-dlp", "--config-location", YTDLP_CONFIG_PATH, "-o", "%(title)s.%(ext)s", "-P", base_other, url],
-    }[resolved_tool]
-
-    return cmd, resolved_tool
+        parser = parser_for(chunk.backend)
+        jobs[0].progress = parser.progress
+        cmd, task = postprocess.split(post_pool, chunk.cmd, jobs, scratch_area)
 
+        def on_start(process):
+            for job in jobs:
+                job.process = process
 
-def log_to_console(text):
-    output_box.config(state=tk.NORMAL)
-    output_box.insert(tk.END, text + "\n")
-    output_box.see(tk.END)
-    output_box.config(state=tk.DISABLED)
+        def on_line(stream, text):
+            for job in jobs:
+                job.note_line(stream, text)
 
-
-def scroll_status_to_bottom():
-    status_canvas.update_idletasks()
-    status_canvas.yview_moveto(1.0)
-
-def update_label_width(label_widget, parent_widget, reserved_right_px=180):
-    """Dynamically resize label width based on remaining space."""
-    parent_widget.update_idletasks()
-    parent_width = parent_widget.winfo_width()
-    if parent_width <= 1:
-        return
-    char_width = 8  # More realistic for ttk.Label
-    usable_width = max(100, parent_width - reserved_right_px)
-    width_chars = usable_width // char_width
-    label_widget.config(width=width_chars)
-
-
-active_threads = []
+        log_to_console(f"📦 {chunk.backend}: {len(jobs)} URLs in one run")
+        codes = chunk.results(execute_command(cmd, parser, on_start=on_start, on_line=on_line,
+                                              rate=lambda: jobs[0].rate_limit))
+    except Exception as e:
+        for job in jobs:
+            job.note_line("stderr", f"Exception: {e}")
+        log_to_console(f"❌ Exception: {e}")
+        codes = [-1] * len(jobs)
+    finally:
+        chunk.cleanup()
+    return postprocess.follow_chunk(post_pool, codes, task, jobs)
 
 
-def run_single_download(input_url, tool, sync=False, on_finish=None):
+def run_single_download(input_url, tool, sync=False, on_finish=None, force=False):
     base = download_dir.get()
-    outer_row = ttk.Frame(status_list)
-    outer_row.pack(fill=tk.X, pady=2)
-    root.after(100, scroll_status_to_bottom)
-
-    # Grid layout with fixed width label and fixed right-aligned bar+button
-    outer_row.grid_columnconfigure(0, weight=1)
-    outer_row.grid_columnconfigure(1, weight=0)
-    outer_row.grid_columnconfigure(2, weight=0)
-
-    status_label = ttk.Label(
-        outer_row,
-        text=f"⏳ {tool}: {input_url}",
-        anchor="w",
-        justify="left",
-        width=67
-    )
-    resize_callbacks.append(lambda: update_label_width(status_label, outer_row))
-    stop_button = ttk.Button(outer_row, text="Stop")
-    bar = ttk.Progressbar(outer_row, mode="indeterminate", maximum=100)
-
-    status_label.grid(row=0, column=0, sticky="w", padx=(0, 10))
-    stop_button.grid(row=0, column=1, sticky="e", padx=(5, 2))
-    bar.grid(row=0, column=2, sticky="e", padx=(2, 5))
-
-    bar.start()
+    row = job_view.add(f"⏳ {tool}: {input_url}")
 
     def thread_target(url=input_url):
-        cmd, resolved_tool = build_command(tool, url, base)
+        cmd, resolved_tool = build_command(tool, url, base, use_archive=False if force else None)
         if cmd is None:
-            root.after(0, lambda: [
-                bar.stop(),
-                stop_button.destroy(),
-                outer_row.pack_forget(),
-                root.after(100, scroll_status_to_bottom)
-            ])
+            root.after(0, lambda: job_view.remove(row))
             if on_finish:
                 root.after(0, on_finish)
             return
 
         label_text = f"⏳ {tool} ({resolved_tool}): {url}" if tool == "Automatic" else f"⏳ {tool}: {url}"
-        root.after(0, lambda: status_label.config(text=label_text))
+        row.text = label_text
+        root.after(0, job_view.refresh)
         ensure_dirs(base)
-        log_path = os.path.join(base, "log", "download.log")
+        job_id = job_store.add(url, tool, cmd, resolved_tool, base)
+        single_job_ids.add(job_id)
+        stopped = False
+        process = None
 
         try:
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
-
-            def stop_process():
-                if process.poll() is None and messagebox.askyesno("Stop Download", f"Force stop this job?\n\n{tool}\n{url}"):
-                    process.kill()
-                    log_to_console(f"⛔ Stopped: {tool} → {url}")
-                    root.after(0, lambda: status_label.config(text=f"⛔ Stopped: {tool}"))
-                    bar.stop()
-                    def preserve_button_space():
-                        placeholder = ttk.Label(outer_row, text="", width=6)
-                        placeholder.grid(row=0, column=1, sticky="e", padx=(5, 2))
-                    root.after(0, lambda: [stop_button.destroy(), preserve_button_space()])
-
-            stop_button.config(command=stop_process)
-
-            for line in process.stdout:
-                if line.strip():
-                    root.after(0, lambda l=line.strip(): log_to_console(l))
-            for line in process.stderr:
-                if line.strip():
-                    root.after(0, lambda l=line.strip(): log_to_console(l))
-
-            process.wait()
-            root.after(0, bar.stop)
-
-            def preserve_button_space():
-                placeholder = ttk.Label(outer_row, text="", width=6)
-                placeholder.grid(row=0, column=1, sticky="e", padx=(5, 2))
-
-            root.after(0, lambda: [stop_button.destroy(), preserve_button_space()])
-
-            final_status = "✅ Finished" if process.returncode == 0 else "❌ Failed"
-            log_func = messagebox.showinfo if process.returncode == 0 else messagebox.showerror
-            bar_mode = "determinate"
-            bar_value = 100 if process.returncode == 0 else 0
+            job_store.mark(job_id, RUNNING)
 
-            root.after(0, lambda: [
-                bar.stop(),
-                bar.config(mode=bar_mode, value=bar_value),
-                status_label.config(text=f"{final_status}: {tool} ({resolved_tool}): {url}"),
-                log_func("Download", f"{final_status}: {tool}\n{url}"),
-                scroll_status_to_bottom()
-            ])
+            def on_start(proc):
+                nonlocal process
+                single_processes.discard(process)
+                process = proc
+                single_processes.add(proc)
 
-            with open(log_path, "a") as f:
-                f.write(f"{tool} ({resolved_tool}): {url}\n")
+            def stop_process():
+                nonlocal stopped
+                # also stops a job that is waiting for its next retry
+                if process is not None and messagebox.askyesno("Stop Download", f"Force stop this job?\n\n{tool}\n{url}"):
+                    stopped = True
+                    log_to_console(f"⛔ Stopping: {tool} → {url}")
+                    job_view.finish(row, STOPPED, f"⛔ Stopped: {tool}")
+                    threading.Thread(target=stop_processes, args=([process],), daemon=True).start()
+
+            row.on_stop = stop_process
+            root.after(0, job_view.refresh)
+
+            parser = parser_for(cmd[0])
+            progress = parser.progress
+            live_progress.append(progress)
+
+            def show_progress():
+                if stopped:
+                    return
+                percent = progress.overall_percent()
+                if percent is not None:
+                    row.percent = percent
+                summary = progress.summary()
+                if summary:
+                    row.text = f"{label_text}  —  {summary}"
+
+            progress_rows.append(show_progress)
+
+            policy = RetryPolicy.from_config(config)
+            job = Job(url, tool, cmd, resolved_tool, job_id=job_id)
+            job.started_at = time.time()
+            unit = [job]
+            while True:
+                job.attempts += 1
+                job.stderr_tail.clear()
+                # the share comes out of the bulk scheduler's budget, so together they keep the limit
+                scheduler.hold_bandwidth(unit)
+                try:
+                    download_cmd, task = postprocess.split(post_pool, job.command(), [job], scratch_area)
+                    returncode = execute_command(download_cmd, parser, on_start=on_start, on_line=job.note_line)
+                except NoSpace as e:
+                    log_to_console(f"❌ {e}: {url}")
+                    job.note_line("stderr", str(e))
+                    task, returncode = None, 1
+                finally:
+                    scheduler.release_bandwidth(unit)
+                if returncode == 0 and task is not None and not stopped:
+                    row.text = f"{label_text}  —  ⚙ post-processing"
+                returncode = postprocess.finish(post_pool, -1 if stopped else returncode, task, job)
+                if returncode == 0 or stopped:
+                    break
+                job.failure = classify(job.backend, returncode, job.stderr_tail)
+                delay = policy.delay(job.failure, job.attempts)
+                if delay is None:
+                    break
+                job_store.mark(job_id, QUEUED, returncode)
+                log_to_console(f"🔁 {FAILURE_LABELS[job.failure]}, retrying in {delay:.0f}s: {url}")
+                row.text = f"{label_text}  —  🔁 retry in {delay:.0f}s"
+                time.sleep(delay)
+                if stopped:
+                    break
+                job_store.mark(job_id, RUNNING)
+            live_progress.remove(progress)
+            root.after(0, lambda: progress_rows.remove(show_progress))
+            job.state, job.returncode = CANCELLED if stopped else DONE if returncode == 0 else FAILED, returncode
+            job_store.mark(job_id, job.state, returncode)
+            if job_telemetry is not None:
+                job_telemetry.record(job, base)
+            if returncode == 0 and download_archive is not None and single_item(job.backend, url):
+                download_archive.add(url, resolved_tool)
+
+            final_status = "✅ Finished" if returncode == 0 else "❌ Failed"
+
+            if not stopped and returncode == 0:
+                root.after(0, lambda: [
+                    job_view.finish(row, ROW_DONE, f"{final_status}: {tool} ({resolved_tool}): {url}"),
+                    messagebox.showinfo("Download", f"{final_status}: {tool}\n{url}"),
+                ])
+            elif not stopped:
+                failure, error = job.failure, job.last_error()
+                root.after(0, lambda: [
+                    job_view.finish(row, ROW_FAILED, f"{final_status} ({FAILURE_LABELS[failure]}): {tool} ({resolved_tool}): {url}"),
+                    report_failure(job_id, tool, url, failure, error),
+                    show_failure_report(),
+                ])
 
         except Exception as e:
-            root.after(0, bar.stop)
-            root.after(0, stop_button.destroy)
-            err = f"❌ Exception: {e}\n{url}"
+            job_store.mark(job_id, FAILED)
+            error = str(e)
+            err = f"❌ Exception: {error}\n{url}"
             root.after(0, lambda: [
-                status_label.config(text="❌ Exception"),
-                messagebox.showerror("Download Error", err),
+                job_view.finish(row, ROW_FAILED, "❌ Exception"),
+                report_failure(job_id, tool, url, "permanent", error),
+                show_failure_report(),
                 log_to_console(err),
             ])
 
+        single_job_ids.discard(job_id)
+        single_processes.discard(process)
         if threading.current_thread() in active_threads:
             active_threads.remove(threading.current_thread())
         if on_finish:
             on_finish()
-        if not any(t.is_alive() for t in active_threads):
+        if not any(t.is_alive() for t in active_threads) and scheduler.idle():
             root.after(0, unlock_controls)
         
     if sync:
@@ -365,6 +398,199 @@ def run_single_download(input_url, tool, sync=False, on_finish=None):
         active_threads.append(t)
         t.start()
 
+def start_bulk(jobs, title):
+    """Show a bulk status row for `jobs` and hand them to the scheduler."""
+    base = download_dir.get()
+    row = job_view.add("")
+    status = {"text": ""}
+
+    def update_progress(batch, job):
+        status["text"] = f"⏳ [{batch.finished}/{batch.total}] {job.tool} ({job.resolved_tool}): {job.url}" if job.tool == "Automatic" else f"⏳ [{batch.finished}/{batch.total}] {job.tool}: {job.url}"
+        row.percent = int((batch.finished / batch.total) * 100)
+        row.text = status["text"]
+        job_view.refresh()
+
+    def show_progress():
+        running = scheduler.running(batch)
+        partial = sum((j.progress.overall_percent() or 0) / 100 for j in running if j.progress)
+        row.percent = int((batch.finished + partial) * 100 / max(1, batch.total))
+        speed = sum(j.progress.speed or 0 for j in running if j.progress)
+        eta = batch_eta(jobs, speed)
+        eta_text = f" · ETA {format_eta(eta)}" if eta is not None else ""
+        row.text = f"{status['text']}  —  {len(running)} active · {format_bytes(speed)}/s{eta_text}" if running else status["text"]
+
+    def on_complete(batch):
+        if show_progress in progress_rows:
+            progress_rows.remove(show_progress)
+        if batch.cancelled:
+            job_view.finish(row, STOPPED, f"⛔ Bulk job cancelled at {batch.finished - batch.skipped}/{batch.total}.")
+        elif batch.failed:
+            job_view.finish(row, ROW_FAILED, f"❌ {batch.failed} of {batch.total} downloads failed.")
+            show_failure_report()
+        else:
+            job_view.finish(row, ROW_DONE, f"✅ All {batch.total} downloads completed.")
+        if not any(t.is_alive() for t in active_threads) and scheduler.idle():
+            unlock_controls()
+        # if if if if if if if else else else else else  deze zijn speciaal voor Thomas <3
+
+    def on_progress(batch, job):
+        if job.state == "done" and download_archive is not None and single_item(job.backend, job.url):
+            download_archive.add(job.url, job.resolved_tool)
+        if job_telemetry is not None:
+            job_telemetry.record(job, base)
+        if job.state == "failed":
+            failure, error = job.failure, job.last_error()
+            root.after(0, lambda: report_failure(job.job_id, job.tool, job.url, failure, error))
+        root.after(0, lambda: update_progress(batch, job))
+        if batch.complete:
+            root.after(0, lambda: on_complete(batch))
+
+    batch = Batch(len(jobs), on_progress=on_progress)
+    for job in jobs:
+        job.batch = batch
+
+    def stop_bulk():
+        # waits for the process trees to exit, so not on the Tk thread
+        threading.Thread(target=scheduler.cancel, args=(batch,), daemon=True).start()
+        status["text"] = "⛔ Stopped (Bulk Job)"
+        row.text = status["text"]
+        job_view.refresh()
+
+    row.on_stop = stop_bulk
+
+    if not jobs:
+        on_complete(batch)
+        return
+    status["text"] = f"⏳ [0/{batch.total}] {title}: queued"
+    row.text = status["text"]
+    row.percent = 0
+    progress_rows.append(show_progress)
+    scheduler.submit(jobs)
+
+
+def start_remote(client, entries, title, priority=NORMAL):
+    """Hand entries to the daemon and mirror their progress in one status row."""
+    single = len(entries) == 1
+    label_text = f"🛰️ {entries[0][1]}: {entries[0][0]}" if single else f"🛰️ {title}"
+    row = job_view.add(f"⏳ {label_text}")
+    ids = []
+    states = {}
+    remote_progress = {}
+    urls_by_id = {}
+
+    def stop_remote():
+        if ids and messagebox.askyesno("Stop Download", "Cancel these jobs on the daemon?"):
+            try:
+                daemon.cancel(ids)
+            except OSError as e:
+                log_to_console(f"❌ Could not reach the daemon: {e}")
+
+    def show_progress():
+        running = [p for i, p in remote_progress.items() if i not in states]
+        partial = sum((p.overall_percent() or 0) / 100 for p in running)
+        row.percent = int((len(states) + partial) * 100 / len(entries))
+        summary = running[0].summary() if single and running else f"{len(running)} active" if running else ""
+        count = "" if single else f"[{len(states)}/{len(entries)}] "
+        row.text = f"⏳ {count}{label_text}  —  {summary}" if summary else f"⏳ {count}{label_text}"
+
+    def on_complete():
+        if show_progress in progress_rows:
+            progress_rows.remove(show_progress)
+        failed = sum(1 for state in states.values() if state != DONE)
+        if len(states) < len(entries):
+            job_view.finish(row, ROW_FAILED, f"❌ Lost connection to the daemon: {label_text}")
+        elif failed:
+            job_view.finish(row, ROW_FAILED, f"❌ {failed} of {len(entries)} failed: {label_text}")
+            show_failure_report()
+        else:
+            job_view.finish(row, ROW_DONE, f"✅ {label_text}")
+        if not any(t.is_alive() for t in active_threads) and scheduler.idle():
+            unlock_controls()
+
+    def watch():
+        try:
+            with client:
+                ids.extend(client.submit(entries, watch=True, priority=priority))
+                urls_by_id.update((i, (e[0], e[1])) for i, e in zip(ids, entries))
+                root.after(0, lambda: setattr(row, "on_stop", stop_remote))
+                for event in client.events():
+                    kind = event["event"]
+                    if kind == "line":
+                        log_to_console(event["text"], event["stream"])
+                    elif kind == "progress":
+                        remote_progress[event["id"]] = Progress.from_dict(event["progress"])
+                    elif kind == "retry":
+                        log_to_console(f"🔁 #{event['id']} {FAILURE_LABELS.get(event['failure'], event['failure'])}, retrying in {event['delay']:.0f}s")
+                    elif kind == "state" and event["state"] in daemon.FINAL_STATES:
+                        states[event["id"]] = event["state"]
+                        if event["state"] == FAILED:
+                            url, tool = urls_by_id.get(event["id"], ("", ""))
+                            failure = event.get("failure") or "permanent"
+                            root.after(0, lambda i=event["id"], u=url, t=tool, f=failure: report_failure(i, t, u, f, ""))
+                        if len(states) == len(ids):
+                            break
+        except (OSError, ValueError, daemon.DaemonError) as e:
+            log_to_console(f"❌ Daemon: {e}")
+        finally:
+            if threading.current_thread() in active_threads:
+                active_threads.remove(threading.current_thread())
+            root.after(0, on_complete)
+
+    progress_rows.append(show_progress)
+    t = threading.Thread(target=watch, daemon=True)
+    active_threads.append(t)
+    t.start()
+
+
+def skip_known_urls(tool, urls):
+    """Drop duplicate and already downloaded URLs; returns (urls, force).
+
+    A single archived URL is not dropped silently: the user may choose to
+    download it again (`force`, which also bypasses the backend archives).
+    """
+    if download_archive is None:
+        return urls, False
+    fresh, duplicates, archived = download_archive.filter(urls, [resolve_tool(tool, url) for url in urls])
+    if len(urls) == 1 and archived:
+        if messagebox.askyesno("Already Downloaded", f"This URL was downloaded before:\n{urls[0]}\n\nDownload it again?"):
+            return urls, True
+        return [], False
+    if duplicates or archived:
+        log_to_console(f"⏭️ Skipped {len(duplicates)} duplicate and {len(archived)} already downloaded URL(s).")
+    return fresh, False
+
+
+def skip_known_items(tool, expanded):
+    """Drop playlist items that repeat or were downloaded before; keeps (url, info) pairs in order."""
+    if download_archive is None:
+        return expanded
+    # playlist items keep the tool their playlist resolved to
+    fresh, duplicates, archived = download_archive.filter(
+        [url for url, _ in expanded], [resolve_tool(info["tool"] if info else tool, url) for url, info in expanded])
+    if duplicates or archived:
+        log_to_console(f"⏭️ Skipped {len(duplicates)} duplicate and {len(archived)} already downloaded item(s).")
+    remaining = iter(fresh)
+    wanted = next(remaining, None)
+    kept = []
+    for url, info in expanded:
+        if url == wanted:
+            kept.append((url, info))
+            wanted = next(remaining, None)
+    return kept
+
+
+def build_entries(tool, expanded, base, use_archive):
+    """Queue entries and their expansion info for the (url, info) pairs that have a backend."""
+    entries, infos = [], []
+    for url, info in expanded:
+        # playlist items keep the tool their playlist resolved to
+        cmd, resolved_tool = build_command(info["tool"] if info else tool, url, base, use_archive)
+        if cmd is not None:
+            entries.append((url, tool, cmd, resolved_tool, base))
+            infos.append(info)
+    return entries, infos
+
+
 def run_download():
     lock_controls()
     tool = tool_selector.get()
@@ -381,125 +607,208 @@ def run_download():
 
     base = download_dir.get()
     ensure_dirs(base)
-    log_path = os.path.join(base, "log", "download.log")
 
-    if bulk_mode.get():
-        row = ttk.Frame(status_list)
-        row.pack(fill=tk.X, pady=2)
-        root.after(100, scroll_status_to_bottom)
-
-        # Create widgets using grid
-        label = ttk.Label(
-            row,
-            text="",
-            anchor="w",
-            justify="left",
-            width=67  # Same clipping effect for long lines in bulk
-        )
-        
-        resize_callbacks.append(lambda: update_label_width(label, row))
-        stop_button = ttk.Button(row, text="Stop")
-        bar = ttk.Progressbar(row, mode="indeterminate", maximum=100)
+    urls, force = skip_known_urls(tool, urls if bulk_mode.get() else urls[:1])
+    if not urls:
+        unlock_controls()
+        return
+    use_archive = False if force else None
+
+    if url_expander is None or not any(url_expander.wants(tool, url) for url in urls):
+        queue_downloads(tool, [(url, None) for url in urls], base, use_archive, force)
+        return
+
+    log_to_console("🔎 Listing playlists and galleries…")
 
-        label.grid(row=0, column=0, sticky="w", padx=(0, 10))
-        stop_button.grid(row=0, column=1, sticky="e", padx=(5, 2))
-        bar.grid(row=0, column=2, sticky="e", padx=(2, 5))
+    def expand_in_background():
+        expanded = None
+        try:
+            expanded = url_expander.expand(tool, urls)
+            message = describe_expansion(expanded, len(urls))
+            if message:
+                log_to_console(message)
+            if not force:
+                expanded = skip_known_items(tool, expanded)
+        except Exception as e:
+            expanded = None
+            log_to_console(f"❌ Could not list playlists and galleries: {e}", "stderr")
+        finally:
+            active_threads.remove(threading.current_thread())
+            root.after(0, lambda: queue_expanded(expanded))
 
-        row.grid_columnconfigure(0, weight=1)
+    def queue_expanded(expanded):
+        try:
+            if expanded is not None:
+                queue_downloads(tool, expanded, base, use_archive, force)
+                return
+        except Exception as e:
+            log_to_console(f"❌ Could not queue downloads: {e}", "stderr")
+        if not any(t.is_alive() for t in active_threads) and scheduler.idle():
+            unlock_controls()
 
+    t = threading.Thread(target=expand_in_background, daemon=True)
+    active_threads.append(t)
+    t.start()
 
-        bar.start()
-        current_process = None
-        cancelled = False
 
-        def stop_bulk():
-            nonlocal cancelled
-            cancelled = True
-            if current_process and current_process.poll() is None:
-                current_process.kill()
-            root.after(0, lambda: label.config(text="⛔ Stopped (Bulk Job)"))
+def queue_downloads(tool, expanded, base, use_archive, force):
+    """Send (url, expansion info) pairs to the daemon, the bulk scheduler or a single download.
 
-        stop_button.config(command=stop_bulk)
+    A single URL that expanded into items gets a bulk row, which counts them.
+    """
+    if not expanded:
+        unlock_controls()
+        return
 
-        def bulk_worker():
-            nonlocal current_process, cancelled
-            total = len(urls)
-            completed = tk.IntVar(value=0)
+    priority = priority_selector.get()
+    client = daemon.connect()
+    if client is not None:
+        entries, _ = build_entries(tool, expanded, base, use_archive)
+        if entries:
+            start_remote(client, entries, tool, priority)
+        else:
+            client.close()
+            unlock_controls()
+        return
 
-            def update_progress():
-                percent = int((completed.get() / total) * 100)
-                bar.config(mode="determinate", value=percent)
+    if bulk_mode.get() or len(expanded) > 1 or expanded[0][1] is not None:
+        entries, infos = build_entries(tool, expanded, base, use_archive)
+        ids = job_store.add_many(entries, priority)
+        jobs = [Job(url, t, cmd, resolved, job_id=job_id, priority=priority)
+                for job_id, (url, t, cmd, resolved, _) in zip(ids, entries)]
+        for job, info in zip(jobs, infos):
+            apply_expansion(job, info)
+        start_bulk(jobs, tool)
 
-            for i, url in enumerate(urls, start=1):
-                if cancelled:
-                    break
+    else:
+        def check_unlock():
+            if not any(t.is_alive() for t in active_threads) and scheduler.idle():
+                unlock_controls()
 
-                cmd, resolved_tool = build_command(tool, url, base)
-                if cmd is None:
-                    continue
+        run_single_download(expanded[0][0], tool, on_finish=check_unlock, force=force)
 
 
-                label_text = f"⏳ [{i}/{total}] {tool} ({resolved_tool}): {url}" if tool == "Automatic" else f"⏳ [{i}/{total}] {tool}: {url}"
-                root.after(0, lambda text=label_text: label.config(text=text))
+def queue_ingested(urls):
+    """Queue a batch of URLs from the clipboard or the watch folder as one bulk row."""
+    entries, skipped = entries_for(urls, url_ingestor.tool, download_dir.get(), download_archive)
+    log_to_console(f"📥 {len(entries)} ingested URL(s) queued" + (f", skipped {skipped}" if skipped else ""))
+    if not entries:
+        return
+    ids = job_store.add_many(entries, url_ingestor.priority)
+    lock_controls()
+    start_bulk([Job(url, t, cmd, resolved, job_id=job_id, priority=url_ingestor.priority)
+                for job_id, (url, t, cmd, resolved, _) in zip(ids, entries)], "📥 Ingested")
 
-                try:
-                    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
-                    current_process = process
-
-                    for line in process.stdout:
-                        if line.strip():
-                            root.after(0, lambda l=line.strip(): log_to_console(l))
-                    for line in process.stderr:
-                        if line.strip():
-                            root.after(0, lambda l=line.strip(): log_to_console(l))
-
-                    process.wait()
-
-                    with open(log_path, "a") as f:
-                        f.write(f"{tool} ({resolved_tool}): {url}\n")
-
-                    if process.returncode != 0:
-                        root.after(0, lambda: messagebox.showerror("Download Failed", f"❌ {tool} failed:\n{url}"))
-
-                except Exception as e:
-                    err = f"❌ Exception: {e}\n{url}"
-                    root.after(0, lambda: [
-                        label.config(text="❌ Exception"),
-                        messagebox.showerror("Download Error", err),
-                        log_to_console(err)
-                    ])
-
-                completed.set(completed.get() + 1)
-                root.after(0, update_progress)
-                time.sleep(5)
-
-            def on_complete():
-                bar.stop()
-                bar.config(mode="determinate", value=100)
-                stop_button.grid_forget()
-                if cancelled:
-                    label.config(text=f"⛔ Bulk job cancelled at {completed.get()}/{total}.")
-                else:
-                    label.config(text=f"✅ All {total} downloads completed.")
-                scroll_status_to_bottom()
-                if threading.current_thread() in active_threads:
-                    active_threads.remove(threading.current_thread())
-                if not any(t.is_alive() for t in active_threads):
-                    unlock_controls()
-                # if if if if if if if else else else else else  deze zijn speciaal voor Thomas <3
 
-            root.after(0, on_complete)
+def jobs_from_store(rows):
+    return [Job(r["url"], r["tool"], r["cmd"], r["resolved_tool"], job_id=r["id"], priority=r["priority"])
+            for r in rows]
 
-        bulk_thread = threading.Thread(target=bulk_worker, daemon=True)
-        active_threads.append(bulk_thread)
-        bulk_thread.start()
-        
-    else:
-        def check_unlock():
-            if not any(t.is_alive() for t in active_threads):
-                unlock_controls()
 
-        run_single_download(urls[0], tool, on_finish=check_unlock)
+def resume_unfinished(ask=True):
+    """Requeue jobs left queued/running by a previous session."""
+    client = daemon.connect()
+    if client is not None:
+        # the daemon owns the queue; it resumed leftovers when it started
+        with client:
+            if not ask:
+                log_to_console(f"🛰️ Daemon picked up {client.request('resume')['resumed']} job(s).")
+        return
+    live = scheduler.job_ids() | single_job_ids
+    rows = [r for r in job_store.unfinished() if r["id"] not in live]
+    if not rows:
+        return
+    if ask and not messagebox.askyesno(
+            "Resume Downloads",
+            f"{len(rows)} download(s) from a previous session did not finish.\n\nResume them now?"):
+        return
+    lock_controls()
+    start_bulk(jobs_from_store(rows), "Resumed")
+
+
+def open_queue_window():
+    """List the persistent job queue with retry / resume / clear actions."""
+    win = tk.Toplevel(root)
+    win.title("FeliciaDL Queue")
+    win.geometry("800x400")
+
+    summary = ttk.Label(win, anchor="w")
+    summary.pack(fill=tk.X, padx=10, pady=(10, 5))
+
+    listbox = tk.Listbox(win, selectmode=tk.EXTENDED, font=("TkFixedFont", 9))
+    listbox.pack(fill=tk.BOTH, expand=True, padx=10)
+    row_ids = []
+
+    def refresh():
+        listbox.delete(0, tk.END)
+        row_ids.clear()
+        for job in job_store.list():
+            listbox.insert(tk.END, format_job(job))
+            row_ids.append(job["id"])
+        counts = job_store.counts()
+        summary.config(text="   ".join(f"{state}: {counts.get(state, 0)}"
+                                       for state in (QUEUED, RUNNING, PAUSED, DONE, FAILED, CANCELLED)))
+
+    def retry_selected():
+        ids = [row_ids[i] for i in listbox.curselection()]
+        job_store.retry(ids or None)
+        resume_unfinished(ask=False)
+        refresh()
+
+    def resume():
+        resume_unfinished(ask=False)
+        refresh()
+
+    def clear_finished():
+        job_store.clear((DONE, CANCELLED))
+        refresh()
+
+    def pause_selected():
+        ids = [row_ids[i] for i in listbox.curselection()]
+        if not ids:
+            return
+        client = daemon.connect()
+        if client is not None:
+            with client:
+                client.request("pause", ids=ids)
+        else:
+            scheduler.pause_ids(ids)
+        refresh()
+
+    def resume_selected():
+        ids = [row_ids[i] for i in listbox.curselection()] or None
+        client = daemon.connect()
+        if client is not None:
+            with client:
+                client.request("unpause", ids=ids)
+        else:
+            scheduler.resume_ids(ids)
+        refresh()
+
+    btns = ttk.Frame(win)
+    btns.pack(fill=tk.X, padx=10, pady=10)
+    ttk.Button(btns, text="Retry Failed/Selected", command=retry_selected).pack(side=tk.LEFT)
+    ttk.Button(btns, text="Resume Queue", command=resume).pack(side=tk.LEFT, padx=5)
+    ttk.Button(btns, text="Clear Finished", command=clear_finished).pack(side=tk.LEFT)
+    ttk.Button(btns, text="Pause Selected", command=pause_selected).pack(side=tk.LEFT, padx=(5, 0))
+    ttk.Button(btns, text="Resume Paused/Selected", command=resume_selected).pack(side=tk.LEFT, padx=5)
+    ttk.Button(btns, text="Refresh", command=refresh).pack(side=tk.RIGHT)
+    refresh()
+
+
+def update_progress_views():
+    """Refresh progress bars and the throughput readout on a fixed tick."""
+    for show in list(progress_rows):
+        show()
+    job_view.refresh()
+    active = list(live_progress) + [j.progress for j in scheduler.running() if j.progress]
+    speed = sum(p.speed or 0 for p in active)
+    parts = [f"↓ {format_bytes(speed)}/s · {len(active)} active"] if active else []
+    if not scheduler.idle():
+        # queue depth of the download and post-processing stages
+        parts.append(postprocess.stage_summary(scheduler.stats(), post_pool.stats() if post_pool else None))
+    throughput_label.config(text=" · ".join(parts))
+    root.after(PROGRESS_TICK_MS, update_progress_views)
 
 
 def toggle_bulk_mode():
@@ -518,10 +827,39 @@ def toggle_bulk_mode():
         root.geometry(f"{current_width}x{max(current_height - 50, 400)}")
 
 
+def stop_processes(processes):
+    """Stop single-download process trees (on a worker thread) and log what was reclaimed."""
+    report = proctree.stop(processes, config.get("stop_grace", proctree.DEFAULT_GRACE),
+                           config.get("remove_partial", True))
+    log_stopped(report)
+
+
+def log_stopped(report):
+    if report.summary():
+        log_to_console(f"⛔ Stopped: {report.summary()}")
+
+
 def on_exit():
-    if any(t.is_alive() for t in active_threads):
+    if any(t.is_alive() for t in active_threads) or not scheduler.idle():
         if not messagebox.askyesno("Quit", "⚠️ Downloads are still running. Are you sure you want to exit?"):
             return
+    if url_ingestor is not None:
+        url_ingestor.stop()
+    # bulk jobs stay queued in jobs.db, so the next start offers to resume them
+    running, queued = scheduler.jobs()
+    scheduler.store = None
+    if job_telemetry is not None:
+        # closed first: the requeued jobs have not finished
+        job_telemetry.close()
+    scheduler.cancel()
+    for job in running + queued:
+        if job.job_id is not None:
+            job_store.mark(job.job_id, QUEUED)
+    stop_processes(list(single_processes))
+    if ytdlp_pool is not None:
+        ytdlp_pool.shutdown()
+    if post_pool is not None:
+        post_pool.shutdown()
     root.destroy()
 
 def browse_folder():
@@ -561,8 +899,77 @@ def open_link(url):
 def on_theme_change(event):
     config["theme"] = theme_selector.get()
     save_config(config)
-    root.destroy()
-    os.execl(sys.executable, sys.executable, *sys.argv)
+    root.style.theme_use(config["theme"])
+
+def load_theme_names():
+    # the theme list is only needed once the dropdown is opened
+    if len(theme_selector.cget("values")) <= 1:
+        theme_selector.config(values=root.style.theme_names())
+
+def load_logo():
+    global scaled_logo
+    try:
+        logo_img = tk.PhotoImage(file=APP_LOGO_PATH)
+        scaled_logo = logo_img.subsample(4, 4)
+        tk.Label(left_frame, image=scaled_logo).pack(anchor="n", before=links_top_sep)
+    except:
+        pass
+
+def mark_startup(name):
+    _startup_marks.append((name, time.perf_counter()))
+
+def report_startup():
+    # FELICIADL_STARTUP_TIMING=1 feliciadl  ->  per-phase startup times on stderr
+    if not os.environ.get("FELICIADL_STARTUP_TIMING"):
+        return
+    prev = start = _startup_marks[0][1]
+    for name, t in _startup_marks[1:]:
+        print(f"[startup] {name:<12} +{(t - prev) * 1000:7.1f} ms  ({(t - start) * 1000:7.1f} ms total)", file=sys.stderr)
+        prev = t
+
+def start_services():
+    """Archive, telemetry, expansion, ingestion and the worker pools; none is needed to show the window."""
+    global daemon, download_archive, ytdlp_pool, post_pool, job_telemetry, url_expander, url_ingestor
+    import daemon
+    download_archive = Archive() if config.get("archive", True) else None
+    ytdlp_pool = ytdlp_engine.from_config(config)
+    post_pool = postprocess.from_config(config)
+    job_telemetry = Telemetry.from_config(config)
+    url_expander = Expander.from_config(config)
+    url_ingestor = Ingestor.from_config(config, lambda urls: root.after(0, lambda: queue_ingested(urls)),
+                                        log=log_to_console)
+    mark_startup("services")
+
+def on_first_map(event):
+    # <Map> on the toplevel also fires for its children
+    global first_map_seen
+    if event.widget is not root or first_map_seen:
+        return
+    first_map_seen = True
+    # idle callbacks queued before this one draw the window
+    root.after_idle(after_first_paint)
+
+def after_first_paint():
+    """Deferred startup work: runs once the window is on screen."""
+    mark_startup("first paint")
+    start_services()
+    report_startup()
+    load_logo()
+    refresh_tool_statuses_once()
+    # pick up jobs a previous session left behind
+    root.after(500, resume_unfinished)
+    # a running daemon ingests for everyone
+    if url_ingestor is not None and not daemon.is_running():
+        url_ingestor.start()
+
+def on_workers_change(*_):
+    try:
+        count = max(1, int(workers_var.get()))
+    except (ValueError, tk.TclError):
+        return
+    scheduler.set_workers(count)
+    config["workers"] = count
+    save_config(config)
 
 def lock_controls():
     theme_selector.config(state="disabled")
@@ -579,25 +986,40 @@ def unlock_controls():
 # --- INIT ---
 config = load_config()
 theme = config.get("theme", DEFAULT_THEME)
-automatic_map = load_automatic_mapping()
-ensure_ytdlp_config()
+job_store = JobStore()
+console_sink = LogSink()
+bandwidth_budget = BandwidthBudget.from_config(config)
+scratch_area = Scratch.from_config(config)
+# set up by start_services() once the window is shown
+daemon = None
+download_archive = ytdlp_pool = post_pool = job_telemetry = url_expander = url_ingestor = None
+first_map_seen = False
+console_max_lines = int(config.get("console_lines", DEFAULT_CONSOLE_LINES))
+scheduler = Scheduler(
+    run_bulk_job,
+    workers=config.get("workers", DEFAULT_WORKERS),
+    backend_limits=config.get("backend_limits"),
+    domain_delay=config.get("domain_delay", DEFAULT_DOMAIN_DELAY),
+    store=job_store,
+    run_chunk=run_bulk_chunk,
+    chunk_size=config.get("chunk_size", DEFAULT_CHUNK_SIZE),
+    retry_policy=RetryPolicy.from_config(config),
+    on_retry=lambda job, delay: log_to_console(
+        f"🔁 {FAILURE_LABELS.get(job.failure, job.failure)}, retrying in {delay:.0f}s: {job.url}"),
+    budget=bandwidth_budget,
+    adjustable=lambda job: ytdlp_pool is not None and job.backend == "yt-dlp",
+    host_limit=config.get("host_connections"),
+    remove_partial=config.get("remove_partial", True),
+    stop_grace=config.get("stop_grace", proctree.DEFAULT_GRACE),
+    on_stopped=log_stopped,
+)
 
 # GUI
 root = tb.Window(themename=theme)
+mark_startup("window")
 root.title("FeliciaDL")
 root.geometry("1000x600")
 root.protocol("WM_DELETE_WINDOW", on_exit)
-resize_callbacks = []
-resize_after_id = None
-
-def debounced_resize_handler(event):
-    global resize_after_id
-    if resize_after_id:
-        root.after_cancel(resize_after_id)
-    resize_after_id = root.after(150, lambda: [cb() for cb in resize_callbacks])
-
-root.bind("<Configure>", debounced_resize_handler)
-
 try:
     root.iconphoto(False, tk.PhotoImage(file=APP_ICON_PATH))
 except: pass
@@ -611,7 +1033,7 @@ main_frame.pack(fill=tk.BOTH, expand=True)
 theme_frame = ttk.Frame(main_frame)
 theme_frame.pack(anchor="w", pady=(0, 10))
 ttk.Label(theme_frame, text="Theme:").pack(side=tk.LEFT)
-theme_selector = ttk.Combobox(theme_frame, values=tb.Style().theme_names(), state="readonly", width=20)
+theme_selector = ttk.Combobox(theme_frame, values=[theme], state="readonly", width=20, postcommand=load_theme_names)
 theme_selector.set(theme)
 theme_selector.pack(side=tk.LEFT, padx=5)
 theme_selector.bind("<<ComboboxSelected>>", on_theme_change)
@@ -628,14 +1050,7 @@ left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=10, pady=10)
 right_frame = ttk.Frame(content_frame)
 right_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-# Logo + Links
-try:
-    logo_img = tk.PhotoImage(file=APP_LOGO_PATH)
-    scaled_logo = logo_img.subsample(4, 4)
-    tk.Label(left_frame, image=scaled_logo).pack(anchor="n")
-except:
-    pass
-
+# Logo (loaded after the first paint) + Links
 # NEW: separator above the two links
 links_top_sep = ttk.Separator(left_frame)
 links_top_sep.pack(fill=tk.X, pady=(6, 6))
@@ -685,15 +1100,25 @@ def make_status_pair(parent, title):
 yt_status_label, yt_version_label = make_status_pair(left_frame, "YT-DLP")
 gallery_status_label, gallery_version_label = make_status_pair(left_frame, "Gallery-DL")
 spot_status_label, spot_version_label = make_status_pair(left_frame, "SpotDL")
+tool_status_labels = {
+    "yt-dlp": (yt_status_label, yt_version_label, "YT-DLP"),
+    "gallery-dl": (gallery_status_label, gallery_version_label, "Gallery-DL"),
+    "spotdl": (spot_status_label, spot_version_label, "SpotDL"),
+}
+ttk.Button(left_frame, text="Check now", command=lambda: refresh_tool_statuses_once(force=True)).pack(anchor="w", pady=(4, 0))
 
 
 # Controls
 ttk.Label(right_frame, text="Select Tool:").pack(anchor="w")
-tool_selector = ttk.Combobox(right_frame, values=[
-    "Automatic", "Youtube-DL-Video", "Youtube-DL-Audio", "Gallery-DL", "Spot-DL", "Other-Videos"
-], state="readonly")
+tool_row = ttk.Frame(right_frame)
+tool_row.pack(fill=tk.X)
+tool_selector = ttk.Combobox(tool_row, values=tool_names(), state="readonly")
 tool_selector.set("Automatic")
-tool_selector.pack(fill=tk.X)
+tool_selector.pack(side=tk.LEFT, fill=tk.X, expand=True)
+priority_selector = ttk.Combobox(tool_row, values=PRIORITIES, state="readonly", width=7)
+priority_selector.set(NORMAL)
+priority_selector.pack(side=tk.RIGHT, padx=(5, 0))
+ttk.Label(tool_row, text="Priority:").pack(side=tk.RIGHT, padx=(10, 0))
 
 ttk.Label(right_frame, text="Enter URL:").pack(anchor="w", pady=(10, 0))
 url_input_frame = ttk.Frame(right_frame)
@@ -703,12 +1128,22 @@ url_entry = ttk.Entry(url_input_frame)
 url_box = tk.Text(url_input_frame, height=4, wrap="word")
 url_entry.pack(fill=tk.X)  # start with single-line entry visible
 
-ttk.Checkbutton(right_frame, text="Bulk Mode", variable=bulk_mode, command=toggle_bulk_mode).pack(anchor="w", pady=(5, 5))
+bulk_frame = ttk.Frame(right_frame)
+bulk_frame.pack(anchor="w", pady=(5, 5))
+ttk.Checkbutton(bulk_frame, text="Bulk Mode", variable=bulk_mode, command=toggle_bulk_mode).pack(side=tk.LEFT)
+ttk.Label(bulk_frame, text="Workers:").pack(side=tk.LEFT, padx=(15, 5))
+workers_var = tk.StringVar(value=str(scheduler.workers))
+workers_spin = ttk.Spinbox(bulk_frame, from_=1, to=32, width=4, textvariable=workers_var, command=on_workers_change)
+workers_spin.pack(side=tk.LEFT)
+workers_spin.bind("<FocusOut>", on_workers_change)
+workers_spin.bind("<Return>", on_workers_change)
 
 url_btn_frame = ttk.Frame(right_frame)
 url_btn_frame.pack(anchor="w", pady=8)
 ttk.Button(url_btn_frame, text="Download", command=run_download).pack(side=tk.LEFT, padx=0)
 ttk.Button(url_btn_frame, text="Open Download Folder", command=lambda: open_folder(download_dir.get())).pack(side=tk.LEFT, padx=5)
+ttk.Button(url_btn_frame, text="Queue", command=open_queue_window).pack(side=tk.LEFT)
+ttk.Button(url_btn_frame, text="Failures", command=show_failure_report).pack(side=tk.LEFT, padx=5)
 folder_frame = ttk.Frame(right_frame)
 folder_frame.pack(fill=tk.X, pady=(5, 10))
 
@@ -724,24 +1159,24 @@ reset_button.pack(side=tk.LEFT)
 
 # Console output
 output_box = tk.Text(right_frame, height=10, state=tk.DISABLED)
+output_box.tag_configure("stderr", foreground="#d9534f")
+output_box.tag_configure("dropped", foreground=status_color_version)
+root.after(CONSOLE_FLUSH_MS, flush_console)
 output_box.pack(fill=tk.BOTH, expand=True)
 
+throughput_label = ttk.Label(right_frame, text="", font=status_font_version, foreground=status_color_version, anchor="e")
+throughput_label.pack(fill=tk.X, pady=(5, 0))
+root.after(PROGRESS_TICK_MS, update_progress_views)
+
 # Scrollable status frame under output_box (50% height of log)
 status_frame = ttk.Frame(right_frame)
 status_frame.pack(fill=tk.BOTH, expand=False, pady=(5, 0), ipady=5)
 
-status_canvas = tk.Canvas(status_frame, height=150)
-status_scrollbar = ttk.Scrollbar(status_frame, orient="vertical", command=status_canvas.yview)
-status_list = ttk.Frame(status_canvas)
-
-status_list.bind("<Configure>", lambda e: status_canvas.configure(scrollregion=status_canvas.bbox("all")))
-status_canvas.create_window((0, 0), window=status_list, anchor="nw")
-status_canvas.configure(yscrollcommand=status_scrollbar.set)
-
-status_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-status_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+job_view = JobView(status_frame, keep_finished=config.get("status_rows", 200), height=150)
+job_view.pack(fill=tk.BOTH, expand=True)
 
-# initial status fetch (non-blocking)
-refresh_tool_statuses_once()
+mark_startup("widgets")
+# services, logo, tool status and queue recovery wait until the window is shown
+root.bind("<Map>", on_first_map, add="+")
 
 root.mainloop()
@@ -0,0 +1,274 @@
+"""Playlist, channel and gallery expansion before anything is queued.
+
+A container URL would otherwise be one opaque job: nothing knows how many
+items it holds, and a slow extractor keeps one worker busy for the whole
+list. `Expander.expand` lists yt-dlp playlists and channels with
+`--flat-playlist -J` and, with "galleries", counts gallery files with
+`gallery-dl -g`, several URLs at a time. Playlist entries become jobs of their own, with
+their size when the extractor reports one (or, with "sizes", when a
+per-item probe finds it), so the scheduler spreads them over the workers
+and `batch_eta` can estimate the rest of a batch. Galleries stay one job,
+since gallery-dl would re-run its extractor for every single file; their
+file count only feeds the job's progress, so they are not probed unless
+"galleries" is on (the probe doubles the requests to the site). Listings are cached by URL for
+`ttl` seconds in expand_cache.json.
+"""
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from archive import CONTAINER_URL
+from core import CONFIG_DIR, TOOLS, YTDLP_CONFIG_PATH, resolve_tool
+
+CACHE_PATH = os.path.join(CONFIG_DIR, "expand_cache.json")
+DEFAULT_WORKERS = 4
+DEFAULT_TTL = 3600
+DEFAULT_TIMEOUT = 120
+MAX_DEPTH = 2   # a channel lists its tabs, a tab lists its videos
+
+_FINAL_STATES = ("done", "failed", "cancelled")
+
+
+def _backend(tool, url):
+    resolved = resolve_tool(tool, url)
+    return (TOOLS[resolved].backend, resolved) if resolved else (None, None)
+
+
+def _run_json(cmd, timeout):
+    try:
+        p = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, stdin=subprocess.DEVNULL)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if p.returncode != 0:
+        return None
+    try:
+        info = json.loads(p.stdout)
+    except ValueError:
+        return None
+    return info if isinstance(info, dict) else None
+
+
+def list_playlist(url, timeout=DEFAULT_TIMEOUT):
+    """{"items": [[url, title, size], ...]} of a yt-dlp playlist, {"items": None} for a single
+    video, None when yt-dlp failed or the entries cannot be downloaded on their own."""
+    info = _run_json(["yt-dlp", "--config-location", YTDLP_CONFIG_PATH, "--flat-playlist", "-J",
+                      "--no-warnings", url], timeout)
+    if info is None:
+        return None
+    if info.get("_type") not in ("playlist", "multi_video"):
+        return {"items": None}
+    items = []
+    for entry in info.get("entries") or []:
+        if not isinstance(entry, dict):
+            continue
+        item_url = entry.get("url") or entry.get("webpage_url")
+        if not item_url or "://" not in item_url:
+            return None
+        items.append([item_url, entry.get("title"), entry.get("filesize") or entry.get("filesize_approx")])
+    return {"items": items} if items else None
+
+
+def count_gallery(url, timeout=DEFAULT_TIMEOUT):
+    """{"count": N} files in a gallery-dl gallery, or None when gallery-dl failed."""
+    try:
+        p = subprocess.run(["gallery-dl", "-g", url], capture_output=True, text=True, timeout=timeout,
+                           stdin=subprocess.DEVNULL)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    # '| url' lines are fallbacks of the file above
+    count = sum(1 for line in p.stdout.splitlines() if line.strip() and not line.startswith("|"))
+    if p.returncode != 0 and not count:
+        return None
+    return {"count": count}
+
+
+def item_size(url, timeout=DEFAULT_TIMEOUT):
+    """Approximate size in bytes of one yt-dlp item, or None."""
+    info = _run_json(["yt-dlp", "--config-location", YTDLP_CONFIG_PATH, "-J", "--no-playlist",
+                      "--no-warnings", url], timeout)
+    if info is None:
+        return None
+    return info.get("filesize") or info.get("filesize_approx")
+
+
+class Expander:
+    """Resolves container URLs into their items, a few probes at a time, with a TTL cache."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, ttl=DEFAULT_TTL, timeout=DEFAULT_TIMEOUT, sizes=False,
+                 galleries=False, cache_path=CACHE_PATH):
+        self.workers = max(1, int(workers))
+        self.ttl = ttl
+        self.timeout = timeout
+        self.sizes = sizes
+        self.galleries = galleries
+        self.cache_path = cache_path
+        self._cache = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """None when "expand" is false; otherwise {"workers", "ttl", "timeout", "sizes", "galleries"} may tune it."""
+        settings = config.get("expand", {})
+        if settings is False:
+            return None
+        if not isinstance(settings, dict):
+            settings = {}
+        return cls(settings.get("workers", DEFAULT_WORKERS), settings.get("ttl", DEFAULT_TTL),
+                   settings.get("timeout", DEFAULT_TIMEOUT), settings.get("sizes", False),
+                   settings.get("galleries", False))
+
+    def wants(self, tool, url):
+        """Whether `url` may be a playlist, channel or gallery worth listing first."""
+        backend, _ = _backend(tool, url)
+        if backend == "gallery-dl":
+            return self.galleries
+        return backend == "yt-dlp" and bool(CONTAINER_URL.search(url))
+
+    def expand(self, tool, urls):
+        """[(url, info)] with every container in `urls` replaced by its items, in order.
+
+        info is None for URLs left as they are. Otherwise it has "tool" (the
+        tool that resolved the container, so Automatic items download with
+        it), "playlist" (the container URL, None for a gallery), "title",
+        "size" (bytes or None) and "items" (a gallery's file count or None).
+        """
+        result = [(url, None) for url in urls]
+        probed = set()
+        for _ in range(MAX_DEPTH):
+            probes = {}
+            for url, info in result:
+                if url not in probed and (info is None or info["playlist"]) and self.wants(tool, url):
+                    probes[url] = info["tool"] if info else tool
+            if not probes:
+                break
+            probed.update(probes)
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(probes))) as pool:
+                listings = dict(zip(probes, pool.map(lambda item: self._listing(*item), probes.items())))
+            expanded = []
+            for url, info in result:
+                listing = listings.get(url)
+                if listing is None:
+                    expanded.append((url, info))
+                    continue
+                resolved = listing["tool"]
+                if listing.get("count") is not None:
+                    expanded.append((url, {"tool": resolved, "playlist": None, "title": None, "size": None,
+                                           "items": listing["count"]}))
+                else:
+                    expanded.extend((item_url, {"tool": resolved, "playlist": url, "title": title,
+                                                "size": size, "items": None})
+                                    for item_url, title, size in listing["items"])
+            result = expanded
+        if self.sizes:
+            self._prefetch_sizes(result)
+        self._save()
+        return result
+
+    def _listing(self, url, tool):
+        """The cached or fresh listing of one container, None if it is not one (or probing failed)."""
+        backend, resolved = _backend(tool, url)
+        key = f"{backend}:{url.strip()}"
+        entry = self._cached(key)
+        if entry is None:
+            entry = (count_gallery if backend == "gallery-dl" else list_playlist)(url, self.timeout)
+            if entry is None:
+                return None
+            self._store(key, entry)
+        if entry.get("items") is None and entry.get("count") is None:
+            return None
+        return dict(entry, tool=resolved)
+
+    def _prefetch_sizes(self, result):
+        missing = [(url, info) for url, info in result
+                   if info and info["playlist"] and info["size"] is None]
+        if not missing:
+            return
+
+        def probe(item):
+            url, info = item
+            key = f"size:{url.strip()}"
+            entry = self._cached(key)
+            if entry is None:
+                entry = {"size": item_size(url, self.timeout)}
+                self._store(key, entry)
+            info["size"] = entry["size"]
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+            list(pool.map(probe, missing))
+
+    def _cached(self, key):
+        with self._lock:
+            if self._cache is None:
+                try:
+                    with open(self.cache_path, "r") as f:
+                        self._cache = json.load(f)
+                except (OSError, ValueError):
+                    self._cache = {}
+                if not isinstance(self._cache, dict):
+                    self._cache = {}
+            entry = self._cache.get(key)
+            if entry and time.time() - entry.get("time", 0) < self.ttl:
+                return entry
+            return None
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._cache[key] = dict(entry, time=time.time())
+
+    def _save(self):
+        with self._lock:
+            if not self._cache:
+                return
+            now = time.time()
+            self._cache = {k: v for k, v in self._cache.items() if now - v.get("time", 0) < self.ttl}
+            try:
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                tmp = self.cache_path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(self._cache, f)
+                os.replace(tmp, self.cache_path)
+            except OSError:
+                pass
+
+
+def apply(job, info):
+    """Carry what expansion learned about a URL over to its scheduler.Job."""
+    if info:
+        job.size = info["size"]
+        job.items = info["items"]
+
+
+def describe(expanded, count):
+    """Console line like '🔎 3 playlists → 57 items, 1 gallery with 340 files', or None."""
+    playlists = {info["playlist"] for _, info in expanded if info and info["playlist"]}
+    items = sum(1 for _, info in expanded if info and info["playlist"])
+    galleries = [info["items"] for _, info in expanded if info and info["items"] is not None]
+    parts = []
+    if playlists:
+        parts.append(f"{len(playlists)} playlist{'s' if len(playlists) != 1 else ''} → {items} items")
+    if galleries:
+        parts.append(f"{len(galleries)} galler{'ies' if len(galleries) != 1 else 'y'} with {sum(galleries)} files")
+    if not parts:
+        return None
+    return f"🔎 {', '.join(parts)} ({count} URLs → {len(expanded)} jobs)"
+
+
+def batch_eta(jobs, speed):
+    """Seconds until the unfinished `jobs` are downloaded at `speed` bytes/s.
+
+    None unless every unfinished job has a known size.
+    """
+    if not speed:
+        return None
+    remaining = 0
+    for job in jobs:
+        if job.state in _FINAL_STATES or job.state == "processing":
+            continue
+        if not job.size:
+            return None
+        done = job.progress.transferred() if job.progress is not None else None
+        remaining += max(0, job.size - (done or 0))
+    return remaining / speed
@@ -0,0 +1,320 @@
+"""URL ingestion from the clipboard and a watch folder.
+
+Two optional sources feed the download queue without anyone typing into
+the URL box:
+
+- the clipboard, polled through wl-paste, xclip or xsel; only URLs that
+  automatic.json routes to a backend are picked up
+- a watch folder where dropped .txt files (one URL per line, # comments)
+  and .url shortcuts are read, then moved to its imported/ folder; new
+  files are noticed through inotify, or by polling where that is missing
+
+URLs are not submitted one by one: an Ingestor collects them, drops
+duplicates (in canonical form, also against what it submitted before)
+and hands them on as one batch once no new URL arrived for `debounce`
+seconds, so pasting or dropping thousands of lines makes one submission.
+The daemon runs the sources when "ingest" is configured; without a
+daemon the GUI runs them itself.
+"""
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+
+from archive import canonical_url
+from core import AUTOMATIC, build_command, ensure_dirs, resolve_tool
+from scheduler import NORMAL, PRIORITIES
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_MAX_WAIT = 30.0     # a steady trickle is still submitted this often
+CLIPBOARD_INTERVAL = 1.0
+POLL_INTERVAL = 2.0
+IMPORTED_DIR = "imported"
+SEEN_LIMIT = 100000         # canonical URLs remembered to skip repeats
+WATCHED_SUFFIXES = (".txt", ".url")
+
+# the first one installed is used; wl-paste only on Wayland
+CLIPBOARD_COMMANDS = [
+    ["wl-paste", "--no-newline"],
+    ["xclip", "-selection", "clipboard", "-o"],
+    ["xsel", "--clipboard", "--output"],
+]
+
+_URL = re.compile(r"https?://[^\s<>\"'`]+")
+_TRAILING = ".,;:!?)]}>"
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CLOEXEC = os.O_CLOEXEC
+_EVENT = struct.Struct("iIII")
+
+
+def find_urls(text):
+    """http(s) URLs in free text, in order, without trailing punctuation."""
+    return [m.group(0).rstrip(_TRAILING) for m in _URL.finditer(text)]
+
+
+def read_url_file(path):
+    """URLs in a dropped .txt list or .url shortcut."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if path.endswith(".url"):
+        # [InternetShortcut]\nURL=https://...
+        return [line.split("=", 1)[1].strip() for line in text.splitlines()
+                if line.strip().lower().startswith("url=")]
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.extend(find_urls(line))
+    return urls
+
+
+def entries_for(urls, tool, base, archive=None):
+    """(entries, skipped): queue entries for `urls`; URLs without a backend or in `archive` are skipped."""
+    ensure_dirs(base)
+    entries = []
+    skipped = 0
+    for url in urls:
+        cmd, resolved_tool = build_command(tool, url, base, use_archive=archive is not None)
+        if cmd is None or archive is not None and archive.contains(url, resolved_tool):
+            skipped += 1
+        else:
+            entries.append((url, tool, cmd, resolved_tool, base))
+    return entries, skipped
+
+
+class Ingestor:
+    """Debounces and dedupes URLs from any thread and passes them to `submit(urls)` in batches."""
+
+    def __init__(self, submit, debounce=DEFAULT_DEBOUNCE, max_wait=DEFAULT_MAX_WAIT, log=None,
+                 tool=AUTOMATIC, priority=NORMAL):
+        self.submit = submit
+        self.tool = tool            # what submitters build the commands with
+        self.priority = priority
+        self.debounce = float(debounce)
+        self.max_wait = float(max_wait)
+        self.log = log or (lambda text: None)
+        self.sources = []
+        self._pending = OrderedDict()   # canonical -> url
+        self._seen = OrderedDict()      # canonical URLs already submitted
+        self._first = self._last = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, submit, log=None):
+        """None unless "ingest" turns on the clipboard or names a watch folder.
+
+        {"clipboard": true, "watch_dir": "~/FeliciaDL-inbox", "debounce": 2,
+         "tool": "Automatic", "priority": "normal"}
+        """
+        settings = config.get("ingest")
+        if not isinstance(settings, dict):
+            return None
+        priority = settings.get("priority", NORMAL)
+        ingestor = cls(submit, settings.get("debounce", DEFAULT_DEBOUNCE),
+                       settings.get("max_wait", DEFAULT_MAX_WAIT), log,
+                       settings.get("tool", AUTOMATIC), priority if priority in PRIORITIES else NORMAL)
+        if settings.get("clipboard"):
+            ingestor.sources.append(ClipboardMonitor(ingestor))
+        if settings.get("watch_dir"):
+            ingestor.sources.append(WatchFolder(ingestor, os.path.expanduser(settings["watch_dir"])))
+        return ingestor if ingestor.sources else None
+
+    def start(self):
+        threading.Thread(target=self._flusher, daemon=True).start()
+        for source in self.sources:
+            source.start()
+
+    def stop(self):
+        self._stop.set()
+        for source in self.sources:
+            source.stop()
+        with self._cond:
+            self._cond.notify_all()
+
+    def add(self, urls):
+        """Queue URLs for the next batch; repeats of pending or submitted ones are dropped."""
+        added = 0
+        with self._cond:
+            now = time.monotonic()
+            for url in urls:
+                key = canonical_url(url)
+                if key in self._pending or key in self._seen:
+                    continue
+                if not self._pending:
+                    self._first = now
+                self._pending[key] = url
+                added += 1
+            if added:
+                self._last = now
+                self._cond.notify_all()
+        return added
+
+    def _flusher(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                due = min(self._last + self.debounce, self._first + self.max_wait)
+                if now < due:
+                    self._cond.wait(due - now)
+                    continue
+                batch = self._pending
+                self._pending = OrderedDict()
+                for key in batch:
+                    self._seen[key] = True
+                while len(self._seen) > SEEN_LIMIT:
+                    self._seen.popitem(last=False)
+            try:
+                self.submit(list(batch.values()))
+            except Exception as e:
+                self.log(f"❌ Could not queue {len(batch)} ingested URL(s): {e}")
+
+
+class ClipboardMonitor:
+    """Polls the clipboard and passes on URLs that automatic.json can route."""
+
+    def __init__(self, ingestor, interval=CLIPBOARD_INTERVAL):
+        self.ingestor = ingestor
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self):
+        command = self._command()
+        if command is None:
+            self.ingestor.log("⚠️ Clipboard ingestion needs wl-paste, xclip or xsel; it is off.")
+            return
+        threading.Thread(target=self._poll, args=(command,), daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _command(self):
+        wayland = bool(os.environ.get("WAYLAND_DISPLAY"))
+        for command in CLIPBOARD_COMMANDS if wayland else CLIPBOARD_COMMANDS[1:]:
+            if shutil.which(command[0]):
+                return command
+        return None
+
+    def _read(self, command):
+        try:
+            p = subprocess.run(command, capture_output=True, text=True, timeout=5, stdin=subprocess.DEVNULL)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        return p.stdout if p.returncode == 0 else None
+
+    def _poll(self, command):
+        # what was copied before we started is not new
+        last = self._read(command)
+        while not self._stop.wait(self.interval):
+            text = self._read(command)
+            if text is None or text == last:
+                continue
+            last = text
+            urls = [url for url in find_urls(text) if resolve_tool(AUTOMATIC, url)]
+            added = self.ingestor.add(urls)
+            if added:
+                self.ingestor.log(f"📋 {added} URL(s) from the clipboard")
+
+
+class WatchFolder:
+    """Reads .txt/.url files dropped into `path` and moves them to path/imported/."""
+
+    def __init__(self, ingestor, path, poll_interval=POLL_INTERVAL):
+        self.ingestor = ingestor
+        self.path = path
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._fd = None
+
+    def start(self):
+        os.makedirs(os.path.join(self.path, IMPORTED_DIR), exist_ok=True)
+        self._fd = _inotify_watch(self.path)
+        target = self._watch if self._fd is not None else self._poll
+        threading.Thread(target=target, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        try:
+            # files dropped while nothing was watching
+            for name in sorted(os.listdir(self.path)):
+                self._ingest(name)
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1.0)
+                if not ready:
+                    continue
+                data = os.read(self._fd, 65536)
+                offset = 0
+                while offset + _EVENT.size <= len(data):
+                    _, _, _, length = _EVENT.unpack_from(data, offset)
+                    name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                    offset += _EVENT.size + length
+                    self._ingest(os.fsdecode(name))
+        finally:
+            os.close(self._fd)
+
+    def _poll(self):
+        sizes = {}
+        while not self._stop.is_set():
+            try:
+                names = os.listdir(self.path)
+            except OSError:
+                names = []
+            current = {}
+            for name in names:
+                try:
+                    st = os.stat(os.path.join(self.path, name))
+                except OSError:
+                    continue
+                current[name] = (st.st_size, st.st_mtime_ns)
+                # unchanged since the last scan, so the writer is done with it
+                if sizes.get(name) == current[name]:
+                    self._ingest(name)
+            sizes = current
+            self._stop.wait(self.poll_interval)
+
+    def _ingest(self, name):
+        path = os.path.join(self.path, name)
+        if not name.lower().endswith(WATCHED_SUFFIXES) or name.startswith(".") or not os.path.isfile(path):
+            return
+        try:
+            urls = read_url_file(path)
+            target = os.path.join(self.path, IMPORTED_DIR, name)
+            if os.path.exists(target):
+                stem, ext = os.path.splitext(name)
+                target = os.path.join(self.path, IMPORTED_DIR, f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}")
+            os.replace(path, target)
+        except OSError as e:
+            self.ingestor.log(f"❌ Could not read {path}: {e}")
+            return
+        added = self.ingestor.add(urls)
+        self.ingestor.log(f"📂 {added} URL(s) from {name}")
+
+
+def _inotify_watch(path):
+    """An inotify fd watching `path` for finished and moved-in files, or None where inotify is missing."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(path), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
@@ -69,7 +69,7 @@ symlink_binaries() {
 install_app_files() {
   echo -e "\n📁 Copying application files to $APP_DIR..."
   sudo mkdir -p "$APP_DIR"
-  sudo cp downloader.py downloader_gui.py "$APP_DIR/"
+  sudo cp ./*.py "$APP_DIR/"
 
   echo "📁 Copying assets..."
   if [ -d "assets" ]; then
@@ -0,0 +1,164 @@
+"""Persistent job queue stored in ~/.config/feliciadl/jobs.db.
+
+Every download (single or bulk, CLI or GUI) gets a row that moves through
+queued -> running -> done / failed (or cancelled when the user stops it);
+a paused job waits in "paused" until it is resumed. Rows left queued,
+running or paused after a crash are picked up again on the next start;
+finished rows are never re-run unless retried explicitly. Each row keeps
+the job's priority (see scheduler.py).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CONFIG_DIR = os.path.expanduser("~/.config/feliciadl")
+JOBS_DB_PATH = os.path.join(CONFIG_DIR, "jobs.db")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+PAUSED = "paused"
+UNFINISHED = (QUEUED, RUNNING, PAUSED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    resolved_tool TEXT,
+    cmd TEXT NOT NULL,
+    base TEXT,
+    state TEXT NOT NULL,
+    returncode INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    priority TEXT NOT NULL DEFAULT 'normal',
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state);
+"""
+
+
+class JobStore:
+    """Thread-safe wrapper around the jobs table."""
+
+    def __init__(self, path=JOBS_DB_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "priority" not in columns:
+            # jobs.db from before priorities
+            self._db.execute("ALTER TABLE jobs ADD COLUMN priority TEXT NOT NULL DEFAULT 'normal'")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, url, tool, cmd, resolved_tool=None, base=None, priority="normal"):
+        """Record a new queued job and return its id."""
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO jobs (url, tool, resolved_tool, cmd, base, state, priority, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, tool, resolved_tool or tool, json.dumps(cmd), base, QUEUED, priority, now, now),
+            )
+            return cur.lastrowid
+
+    def add_many(self, entries, priority="normal"):
+        """Record several (url, tool, cmd, resolved_tool, base) jobs in one transaction."""
+        now = time.time()
+        ids = []
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for url, tool, cmd, resolved_tool, base in entries:
+                    cur = self._db.execute(
+                        "INSERT INTO jobs (url, tool, resolved_tool, cmd, base, state, priority, created, updated)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (url, tool, resolved_tool or tool, json.dumps(cmd), base, QUEUED, priority, now, now),
+                    )
+                    ids.append(cur.lastrowid)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return ids
+
+    def mark(self, job_id, state, returncode=None):
+        with self._lock:
+            if state == RUNNING:
+                self._db.execute(
+                    "UPDATE jobs SET state=?, attempts=attempts+1, updated=? WHERE id=?",
+                    (state, time.time(), job_id),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET state=?, returncode=?, updated=? WHERE id=?",
+                    (state, returncode, time.time(), job_id),
+                )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return _row_dict(row) if row else None
+
+    def list(self, states=None):
+        """Return jobs (optionally only those in `states`) oldest first."""
+        query = "SELECT * FROM jobs"
+        params = ()
+        if states:
+            query += " WHERE state IN (%s)" % ",".join("?" * len(states))
+            params = tuple(states)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+        return [_row_dict(r) for r in rows]
+
+    def unfinished(self):
+        """Jobs that were queued, paused or interrupted while running."""
+        return self.list(UNFINISHED)
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: n for state, n in rows}
+
+    def retry(self, ids=None):
+        """Requeue failed/cancelled jobs (all of them, or only `ids`). Returns the number requeued."""
+        query = "UPDATE jobs SET state=?, returncode=NULL, updated=? WHERE state IN (?, ?)"
+        params = [QUEUED, time.time(), FAILED, CANCELLED]
+        if ids:
+            query += " AND id IN (%s)" % ",".join("?" * len(ids))
+            params += list(ids)
+        with self._lock:
+            return self._db.execute(query, params).rowcount
+
+    def clear(self, states=(DONE,)):
+        """Delete jobs in `states` (finished ones by default). Returns the number removed."""
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM jobs WHERE state IN (%s)" % ",".join("?" * len(states)), tuple(states)
+            ).rowcount
+
+
+def _row_dict(row):
+    d = dict(row)
+    d["cmd"] = json.loads(d["cmd"])
+    return d
+
+
+def format_job(job):
+    """One-line summary used by the CLI and the GUI queue window."""
+    stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["updated"]))
+    tool = job["tool"] if job["tool"] == job["resolved_tool"] else f"{job['tool']} ({job['resolved_tool']})"
+    priority = "" if job.get("priority", "normal") == "normal" else f"[{job['priority']}] "
+    return f"#{job['id']:<5} {job['state']:<9} {stamp}  {priority}{tool}: {job['url']}"
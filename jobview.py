@@ -0,0 +1,224 @@
+"""Virtualized job status list.
+
+Jobs are kept as small JobRow records; only as many row widgets exist as
+fit in the visible area, and they are re-filled from the records when
+scrolling or when records change. Once more than `keep_finished`
+finished rows pile up, the oldest are folded into a single summary row.
+"""
+import tkinter as tk
+from ttkbootstrap import ttk
+
+ROW_HEIGHT = 30
+
+ACTIVE = "active"
+DONE = "done"
+FAILED = "failed"
+STOPPED = "stopped"
+
+
+class JobRow:
+    """One line in the status list."""
+
+    __slots__ = ("text", "percent", "state", "on_stop")
+
+    def __init__(self, text, on_stop=None):
+        self.text = text
+        self.percent = None  # None shows an indeterminate bar
+        self.state = ACTIVE
+        self.on_stop = on_stop
+
+
+class _RowWidgets:
+    __slots__ = ("frame", "label", "button", "bar", "spinning", "row")
+
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent, height=ROW_HEIGHT)
+        self.frame.grid_propagate(False)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(1, minsize=60)  # keep bars aligned when Stop is hidden
+        self.frame.grid_rowconfigure(0, weight=1)
+        # width=1 + sticky="ew": the label takes whatever space is left and clips long URLs
+        self.label = ttk.Label(self.frame, anchor="w", width=1)
+        self.button = ttk.Button(self.frame, text="Stop", width=5)
+        self.bar = ttk.Progressbar(self.frame, mode="determinate", maximum=100)
+        self.label.grid(row=0, column=0, sticky="ew", padx=(0, 10))
+        self.button.grid(row=0, column=1, sticky="e", padx=(5, 2))
+        self.bar.grid(row=0, column=2, sticky="e", padx=(2, 5))
+        self.spinning = False
+        self.row = None
+
+
+class JobView(ttk.Frame):
+    def __init__(self, parent, keep_finished=200, **kwargs):
+        super().__init__(parent, **kwargs)
+        # keep the given height; the row pool is sized from it, not the other way round
+        self.pack_propagate(False)
+        self.keep_finished = keep_finished
+        self.rows = []
+        self.collapsed = {DONE: 0, FAILED: 0, STOPPED: 0}
+        self.offset = 0
+        self._widgets = []
+        self._render_pending = False
+
+        self.body = ttk.Frame(self)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    # --- model ---
+
+    def add(self, text, on_stop=None):
+        """Append a row and keep the view pinned to the bottom if it was there."""
+        at_bottom = self.offset + len(self._widgets) >= self._virtual_len()
+        row = JobRow(text, on_stop)
+        self.rows.append(row)
+        self._collapse()
+        if at_bottom:
+            self.scroll_to_bottom()
+        self.refresh()
+        return row
+
+    def remove(self, row):
+        if row in self.rows:
+            self.rows.remove(row)
+            self.refresh()
+
+    def finish(self, row, state, text=None):
+        row.state = state
+        row.on_stop = None
+        if text is not None:
+            row.text = text
+        if state == DONE:
+            row.percent = 100
+        elif row.percent is None:
+            row.percent = 0
+        self._collapse()
+        self.refresh()
+
+    def _collapse(self):
+        finished = [r for r in self.rows if r.state != ACTIVE]
+        excess = len(finished) - self.keep_finished
+        if excess <= 0:
+            return
+        fold = set(map(id, finished[:excess]))
+        for r in finished[:excess]:
+            self.collapsed[r.state] += 1
+        self.rows = [r for r in self.rows if id(r) not in fold]
+
+    def _summary_text(self):
+        c = self.collapsed
+        total = c[DONE] + c[FAILED] + c[STOPPED]
+        if not total:
+            return None
+        parts = [f"✅ {c[DONE]}"]
+        if c[FAILED]:
+            parts.append(f"❌ {c[FAILED]}")
+        if c[STOPPED]:
+            parts.append(f"⛔ {c[STOPPED]}")
+        return f"… {total} earlier jobs: " + "  ".join(parts)
+
+    def _virtual_len(self):
+        return len(self.rows) + (1 if self._summary_text() else 0)
+
+    # --- view ---
+
+    def refresh(self):
+        """Re-render the visible rows (coalesced to one pass per idle cycle)."""
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def scroll(self, delta):
+        self._set_offset(self.offset + delta)
+
+    def scroll_to_bottom(self):
+        self._set_offset(self._virtual_len())
+
+    def _set_offset(self, offset):
+        self.offset = max(0, min(offset, self._virtual_len() - len(self._widgets)))
+        self.refresh()
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self.scroll(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll(1))
+
+    def _on_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._set_offset(round(float(value) * self._virtual_len()))
+        elif action == "scroll":
+            step = len(self._widgets) if unit == "pages" else 1
+            self.scroll(int(value) * step)
+
+    def _on_resize(self, event):
+        # one pass for the whole view: only the number of pooled row widgets changes
+        wanted = max(1, event.height // ROW_HEIGHT)
+        while len(self._widgets) < wanted:
+            w = _RowWidgets(self.body)
+            for widget in (w.frame, w.label, w.bar):
+                self._bind_wheel(widget)
+            self._widgets.append(w)
+        while len(self._widgets) > wanted:
+            self._widgets.pop().frame.destroy()
+        self._set_offset(self.offset)
+
+    def _render(self):
+        self._render_pending = False
+        summary = self._summary_text()
+        virtual = ([None] if summary else []) + self.rows
+        self.offset = max(0, min(self.offset, len(virtual) - len(self._widgets)))
+
+        for i, w in enumerate(self._widgets):
+            idx = self.offset + i
+            row = virtual[idx] if idx < len(virtual) else None
+            if idx >= len(virtual):
+                w.frame.pack_forget()
+                self._stop_spin(w)
+                w.row = None
+                continue
+            if w.frame.winfo_manager() != "pack":
+                w.frame.pack(fill=tk.X)
+            w.row = row
+            if row is None:
+                w.label.config(text=summary)
+                w.button.grid_remove()
+                w.bar.grid_remove()
+                self._stop_spin(w)
+                continue
+
+            w.label.config(text=row.text)
+            w.bar.grid()
+            if row.on_stop is not None and row.state == ACTIVE:
+                w.button.config(command=row.on_stop)
+                w.button.grid()
+            else:
+                w.button.grid_remove()
+            if row.percent is None and row.state == ACTIVE:
+                if not w.spinning:
+                    w.bar.config(mode="indeterminate")
+                    w.bar.start()
+                    w.spinning = True
+            else:
+                self._stop_spin(w)
+                w.bar.config(value=row.percent or 0)
+
+        n = len(virtual)
+        if n:
+            first = self.offset / n
+            last = min(1.0, (self.offset + len(self._widgets)) / n)
+            self.scrollbar.set(first, last)
+        else:
+            self.scrollbar.set(0, 1)
+
+    @staticmethod
+    def _stop_spin(w):
+        if w.spinning:
+            w.bar.stop()
+            w.bar.config(mode="determinate")
+            w.spinning = False
@@ -0,0 +1,31 @@
+"""Thread-safe ring buffer for console output.
+
+Worker threads push lines as fast as children produce them; the UI pulls
+everything in one go on a fixed tick. When producers outrun the UI the
+oldest lines are overwritten and counted, so memory stays bounded.
+"""
+import threading
+from collections import deque
+
+DEFAULT_CAPACITY = 5000
+
+
+class LogSink:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+    def push(self, text, stream=None):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append((text, stream))
+
+    def drain(self):
+        """Return (lines, dropped): all buffered (text, stream) pairs and how many were overwritten."""
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self._dropped = self._dropped, 0
+        return lines, dropped
@@ -0,0 +1,396 @@
+"""Post-processing as a pipeline stage of its own.
+
+yt-dlp normally merges bestvideo+bestaudio and converts audio (-x) with
+ffmpeg inside the download process, so a download slot sits idle while
+the CPU works. `plan` rewrites such a command to only download: the
+formats are fetched separately ("bestvideo,bestaudio") into a staging
+directory next to the final folder, and every file is listed in a
+manifest. A PostTask then merges or converts them with ffmpeg on a
+PostPool, a CPU pool sized to the core count, and moves the result into
+the final folder. Meanwhile the download slot is already free for the
+next job, so network and CPU work overlap.
+
+Commands without a merge or conversion (gallery-dl, spotdl, plain
+yt-dlp formats) run unchanged.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future
+
+import proctree
+import scratch as _scratch
+
+STAGING_NAME = ".staging"
+
+# formats are downloaded one per file; the merge puts them back together
+_MERGE_FORMAT = re.compile(r"^(?P<video>[^+,/]+)\+(?P<audio>[^+,/]+)(?:/(?P<fallback>[^+,]+))?$")
+_PATH_TYPE = re.compile(r"^\w+:")  # -P temp:DIR and friends
+_FORMAT_SUFFIX = re.compile(r"\.f[^./]+\.[^./]+$")
+
+# --audio-format -> ffmpeg encoder, as yt-dlp's FFmpegExtractAudio picks them
+AUDIO_CODECS = {
+    "mp3": "libmp3lame", "aac": "aac", "m4a": "aac", "opus": "libopus",
+    "vorbis": "libvorbis", "ogg": "libvorbis", "flac": "flac", "wav": "pcm_s16le",
+}
+_AUDIO_EXT = {"vorbis": "ogg", "aac": "m4a"}
+
+
+def _option(cmd, *names):
+    for i, arg in enumerate(cmd[:-1]):
+        if arg in names:
+            return i
+    return None
+
+
+def _pop_option(args, name):
+    i = _option(args, name)
+    if i is None:
+        return None
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+def plan(cmd, staging_key, staging_root=None):
+    """Split a yt-dlp command into (download command, PostTask), or (cmd, None) if nothing to split.
+
+    `staging_key` names the job's staging directory, so a retried job
+    continues from the files its earlier attempts left there. It lives in
+    `staging_root`, or next to the final folder.
+    """
+    if not cmd or cmd[0] != "yt-dlp":
+        return cmd, None
+    out = _option(cmd, "-o", "--output")
+    path = _option(cmd, "-P", "--paths")
+    if out is None or path is None or not cmd[out + 1].endswith(".%(ext)s") or _PATH_TYPE.match(cmd[path + 1]):
+        return cmd, None
+    final_dir = cmd[path + 1]
+
+    args = list(cmd)
+    fmt = _option(args, "-f", "--format")
+    if "-x" in args or "--extract-audio" in args:
+        kind = "audio"
+        audio_format = _pop_option(args, "--audio-format") or "best"
+        quality = _pop_option(args, "--audio-quality") or "5"
+        if audio_format not in AUDIO_CODECS:
+            return cmd, None
+        args = [a for a in args if a not in ("-x", "--extract-audio")]
+        if fmt is None:
+            args[1:1] = ["-f", "bestaudio/best"]
+    else:
+        match = _MERGE_FORMAT.match(args[fmt + 1]) if fmt is not None else None
+        if not match:
+            return cmd, None
+        kind = "merge"
+        audio_format = quality = None
+        video = match["video"] + (f"/{match['fallback']}" if match["fallback"] else "")
+        # sites with only combined formats select the same file twice, which yt-dlp fetches once
+        args[fmt + 1] = f"{video},{match['audio']}/bestaudio/best"
+
+    # indexes may have moved while options were dropped
+    out, path = _option(args, "-o", "--output"), _option(args, "-P", "--paths")
+    staging_root = staging_root or os.path.join(os.path.dirname(os.path.normpath(final_dir)), STAGING_NAME)
+    staging_dir = os.path.join(staging_root, staging_key)
+    manifest = os.path.join(staging_dir, "manifest.jsonl")
+    os.makedirs(staging_dir, exist_ok=True)
+    args[path + 1] = staging_dir
+    args[out + 1] = args[out + 1][:-len(".%(ext)s")] + ".f%(format_id)s.%(ext)s"
+    # before the URL (or batch options), which stay last
+    args[1:1] = ["--print-to-file", "after_move:%(.{original_url,id,filepath})j", manifest]
+    return args, PostTask(kind, staging_dir, manifest, final_dir, audio_format, quality)
+
+
+class PostTask:
+    """Merge or convert the files a download stage left in staging_dir, then move them to final_dir."""
+
+    def __init__(self, kind, staging_dir, manifest, final_dir, audio_format=None, quality=None, url=None):
+        self.kind = kind
+        self.staging_dir = staging_dir
+        self.manifest = manifest
+        self.final_dir = final_dir
+        self.audio_format = audio_format
+        self.quality = quality
+        self.url = url  # only items downloaded for this URL (jobs of one chunk share a manifest)
+
+    def for_url(self, url):
+        return PostTask(self.kind, self.staging_dir, self.manifest, self.final_dir,
+                        self.audio_format, self.quality, url)
+
+    def items(self):
+        """[(id, [staged files in download order])] from the manifest."""
+        groups = {}
+        if self.manifest is None:
+            return []
+        try:
+            with open(self.manifest) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if self.url is not None and (entry.get("original_url") or "").strip() != self.url.strip():
+                        continue
+                    files = groups.setdefault(entry.get("id"), [])
+                    if entry.get("filepath") and entry["filepath"] not in files:
+                        files.append(entry["filepath"])
+        except OSError:
+            pass
+        return list(groups.items())
+
+    def commands(self):
+        """[(ffmpeg argv or None for a plain move, staged output, final path, inputs)]."""
+        if self.kind == "move":
+            return self._moves()
+        steps = []
+        for _, files in self.items():
+            files = [f for f in files if os.path.exists(f)]
+            if not files:
+                continue
+            stem = _FORMAT_SUFFIX.sub("", os.path.basename(files[0]))
+            if self.kind == "audio":
+                ext = _AUDIO_EXT.get(self.audio_format, self.audio_format)
+                staged = os.path.join(self.staging_dir, f"{stem}.pp.{ext}")
+                argv = ["ffmpeg", "-y", "-loglevel", "error", "-i", files[0], "-vn",
+                        "-c:a", AUDIO_CODECS[self.audio_format]]
+                if self.audio_format in ("mp3", "vorbis", "ogg"):
+                    argv += ["-q:a", self.quality]
+                steps.append((argv + [staged], staged, os.path.join(self.final_dir, f"{stem}.{ext}"), files))
+            elif len(files) == 1:
+                ext = files[0].rsplit(".", 1)[-1]
+                steps.append((None, files[0], os.path.join(self.final_dir, f"{stem}.{ext}"), files))
+            else:
+                ext = files[0].rsplit(".", 1)[-1]
+                staged = os.path.join(self.staging_dir, f"{stem}.pp.{ext}")
+                argv = ["ffmpeg", "-y", "-loglevel", "error", "-i", files[0], "-i", files[1],
+                        "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", staged]
+                steps.append((argv, staged, os.path.join(self.final_dir, f"{stem}.{ext}"), files))
+        return steps
+
+    def _moves(self):
+        # everything the backend finished, keeping its subfolders; partial files stay for a retry
+        steps = []
+        for folder, _, names in os.walk(self.staging_dir):
+            for name in names:
+                path = os.path.join(folder, name)
+                if not proctree.is_partial(path):
+                    final = os.path.join(self.final_dir, os.path.relpath(path, self.staging_dir))
+                    steps.append((None, path, final, [path]))
+        return steps
+
+    def run(self, on_start=None, on_line=None):
+        """Run the ffmpeg steps and move the results into final_dir; returns an exit code."""
+        code = 0
+        for argv, staged, final, inputs in self.commands():
+            if argv is not None:
+                process = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                           stderr=subprocess.PIPE, text=True, **proctree.SESSION)
+                if on_start:
+                    on_start(process)
+                _, err = process.communicate()
+                if on_line:
+                    for line in err.splitlines():
+                        on_line("stderr", line)
+                if process.returncode != 0:
+                    code = process.returncode or 1
+                    continue
+            _scratch.move_file(staged, final)
+            for path in inputs:
+                if os.path.exists(path):
+                    os.remove(path)
+        self.cleanup()
+        return code
+
+    def cleanup(self):
+        # jobs of a chunk share the directory; it goes once nothing but the manifest is left
+        manifest = os.path.basename(self.manifest) if self.manifest else None
+        left = [name for _, _, names in os.walk(self.staging_dir) for name in names if name != manifest]
+        if not left:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+class PostPool:
+    """Runs PostTasks on a fixed number of threads (default: one per CPU core)."""
+
+    def __init__(self, workers=None):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self._cond = threading.Condition()
+        self._queue = []
+        self._running = 0
+        self._closed = False
+        for _ in range(self.workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, task, on_start=None, on_line=None):
+        """Queue a task; the Future resolves to its exit code."""
+        future = Future()
+        with self._cond:
+            self._queue.append((future, task, on_start, on_line))
+            self._cond.notify()
+        return future
+
+    def stats(self):
+        with self._cond:
+            return {"queued": len(self._queue), "running": self._running}
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            for future, *_ in self._queue:
+                future.cancel()
+            self._queue = []
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                future, task, on_start, on_line = self._queue.pop(0)
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+            try:
+                future.set_result(task.run(on_start, on_line))
+            except Exception as e:
+                if on_line:
+                    on_line("stderr", f"ERROR: post-processing failed: {e}")
+                future.set_result(1)
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+
+def split(pool, cmd, jobs, scratch=None):
+    """What runners start for `jobs`: (download command, PostTask or None).
+
+    Merges and conversions are split off when a pool is running. With a
+    scratch.Scratch, the job writes into its scratch work dir (a "move"
+    task brings the files home) and disk space is reserved for each job;
+    scratch.NoSpace is raised when there is not enough.
+    """
+    first = jobs[0]
+    key = f"job-{first.job_id}" if first.job_id is not None else f"run-{os.getpid()}-{id(first)}"
+    root = scratch.root if scratch is not None else None
+    task = None
+    if pool is not None:
+        cmd, task = plan(cmd, key, root)
+    if task is None and root is not None:
+        cmd, final_dir = scratch.redirect(cmd, key)
+        if final_dir is not None:
+            task = PostTask("move", scratch.work_dir(key), None, final_dir)
+    if scratch is not None:
+        dirs = [task.staging_dir, task.final_dir] if task is not None else []
+        i = _scratch.output_dir(cmd)
+        if i is not None:
+            dirs.append(cmd[i])
+        _reserve(scratch, jobs, dirs)
+    return cmd, task
+
+
+def _reserve(scratch, jobs, dirs):
+    tokens = []
+    for _ in jobs:
+        token = scratch.reserve(dirs)
+        if token is None:
+            for held in tokens:
+                scratch.release(held)
+            raise _scratch.NoSpace(_scratch.NO_SPACE_MESSAGE)
+        tokens.append(token)
+    for job, token in zip(jobs, tokens):
+        job.reservation = (scratch, token)
+
+
+def _release(job):
+    if job.reservation is not None:
+        scratch, token = job.reservation
+        job.reservation = None
+        scratch.release(token)
+
+
+def follow(pool, code, task, job):
+    """What a runner returns for `job`: the download's exit code, or a Future of its post-processing.
+
+    Without a pool, a task (moving files out of scratch) runs right here.
+    """
+    if code != 0 or task is None:
+        _release(job)
+        return code
+    on_start = lambda process: setattr(job, "process", process)
+    if pool is None:
+        try:
+            return task.run(on_start, job.note_line)
+        finally:
+            _release(job)
+    future = pool.submit(task, on_start=on_start, on_line=job.note_line)
+    future.add_done_callback(lambda _: _release(job))
+    return future
+
+
+def follow_chunk(pool, codes, task, jobs):
+    """follow() for the jobs of one chunk, which share the task's directory.
+
+    Merges and conversions are split per URL. A plain move takes everything
+    out of the directory, so it runs once for the whole chunk and its result
+    is shared by the jobs that downloaded fine.
+    """
+    if task is None or task.kind != "move":
+        return [follow(pool, code, task and task.for_url(job.url), job) for job, code in zip(jobs, codes)]
+    moved = [job for job, code in zip(jobs, codes) if code == 0]
+    for job, code in zip(jobs, codes):
+        if code != 0:
+            _release(job)
+    if not moved:
+        return codes
+
+    def on_start(process):
+        for job in moved:
+            job.process = process
+
+    def on_line(stream, text):
+        for job in moved:
+            job.note_line(stream, text)
+
+    if pool is None:
+        try:
+            result = task.run(on_start, on_line)
+        finally:
+            for job in moved:
+                _release(job)
+    else:
+        result = pool.submit(task, on_start=on_start, on_line=on_line)
+        result.add_done_callback(lambda _: [_release(job) for job in moved])
+    return [result if code == 0 else code for code in codes]
+
+
+def finish(pool, code, task, job):
+    """follow() for single downloads, which wait for their post-processing."""
+    result = follow(pool, code, task, job)
+    return result.result() if isinstance(result, Future) else result
+
+
+def from_config(config):
+    """A PostPool when "postprocess_workers" is set (a count, or true for one per core).
+
+    Off by default: the split download picks formats separately, so it does
+    not follow the original selector's fallback and container choice.
+    """
+    workers = config.get("postprocess_workers", 0)
+    if not workers or shutil.which("ffmpeg") is None:
+        return None
+    return PostPool(None if workers is True else workers)
+
+
+def stage_summary(scheduler_stats, pool_stats=None):
+    """Queue depth per stage, e.g. "⬇ 4 running, 12 queued · ⚙ 2 converting, 3 waiting"."""
+    text = f"⬇ {scheduler_stats['running']} running, {scheduler_stats['queued']} queued"
+    if scheduler_stats.get("paused"):
+        text += f", {scheduler_stats['paused']} paused"
+    if pool_stats is not None:
+        text += f" · ⚙ {pool_stats['running']} converting, {pool_stats['queued']} waiting"
+    return text
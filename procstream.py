@@ -0,0 +1,66 @@
+"""Merged, non-blocking reading of a child's stdout and stderr.
+
+Both pipes are watched with a selector and drained as soon as data is
+available, so a chatty stream can never fill its pipe buffer and stall
+the child while we are busy with the other one. Lines come back in the
+order they were read, tagged with the stream and a timestamp.
+
+The process must be started with binary pipes, e.g.::
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    for line in iter_output(process):
+        print(line.stream, line.text)
+"""
+import os
+import re
+import selectors
+import time
+from collections import namedtuple
+
+OutputLine = namedtuple("OutputLine", "time stream text")
+
+READ_SIZE = 65536
+
+# yt-dlp and friends redraw progress with bare '\r', treat it as a line break too
+_LINE_SPLIT = re.compile(rb"\r\n|\r|\n")
+
+
+def iter_output(process, encoding="utf-8"):
+    """Yield OutputLine tuples from the process's stdout and stderr until both close.
+
+    The pipes are closed when they reach EOF, or when the caller stops early.
+    """
+    sel = selectors.DefaultSelector()
+    buffers = {}
+    pipes = {}
+    for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+        if pipe is not None:
+            sel.register(pipe.fileno(), selectors.EVENT_READ, name)
+            buffers[name] = b""
+            pipes[name] = pipe
+
+    try:
+        while sel.get_map():
+            for key, _ in sel.select():
+                name = key.data
+                data = os.read(key.fd, READ_SIZE)
+                now = time.time()
+                if not data:
+                    sel.unregister(key.fd)
+                    # finished Popen objects outlive the run; their pipes should not
+                    pipes.pop(name).close()
+                    rest = buffers.pop(name)
+                    if rest:
+                        yield OutputLine(now, name, rest.decode(encoding, "replace"))
+                    continue
+
+                parts = _LINE_SPLIT.split(buffers[name] + data)
+                buffers[name] = parts.pop()
+                # blank lines (including the empty piece left by a '\r\n' split across reads) are dropped
+                for part in parts:
+                    if part:
+                        yield OutputLine(now, name, part.decode(encoding, "replace"))
+    finally:
+        sel.close()
+        for pipe in pipes.values():
+            pipe.close()
@@ -0,0 +1,190 @@
+"""Stop a job together with every process it started.
+
+Backends are started in a session of their own (pass `SESSION` to Popen),
+so yt-dlp's ffmpeg merges and transcodes, spotdl's workers and any other
+grandchildren can be found again by session id. `stop` sends SIGTERM to
+all of them, waits `grace` seconds and SIGKILLs whatever is left, instead
+of killing only the direct child and leaving orphans that burn CPU.
+
+Before signalling, /proc is read for the processes' names, memory and
+open files. Partial downloads among those files (.part, .part-FragN,
+.ytdl, .temp.*, unmerged .fNNN formats) are removed afterwards when
+asked to, and the returned StopReport says what was reclaimed.
+"""
+import glob
+import os
+import re
+import signal
+import subprocess
+import time
+from collections import Counter
+
+SESSION = {"start_new_session": True}
+DEFAULT_GRACE = 5.0
+
+_PARTIAL = re.compile(r"(?:\.part(?:-Frag\d+)?|\.ytdl|\.temp\.\w+|\.f\d+(?:-\d+)?\.\w+)$")
+_FRAGMENT = re.compile(r"\.part-Frag\d+$")
+
+
+class StopReport:
+    """What stopping one or more jobs reclaimed."""
+
+    def __init__(self):
+        self.processes = []     # names of the stopped processes
+        self.memory = 0         # resident memory they held, bytes
+        self.killed = 0         # how many needed SIGKILL
+        self.files = []         # removed partial files
+        self.file_bytes = 0
+
+    def merge(self, other):
+        self.processes += other.processes
+        self.memory += other.memory
+        self.killed += other.killed
+        self.files += other.files
+        self.file_bytes += other.file_bytes
+        return self
+
+    def summary(self):
+        """One line like "stopped 3 processes (yt-dlp, ffmpeg ×2), freed 180 MB memory"; "" if nothing."""
+        if not self.processes and not self.files:
+            return ""
+        parts = []
+        if self.processes:
+            names = ", ".join(name if n == 1 else f"{name} ×{n}" for name, n in Counter(self.processes).most_common())
+            parts.append(f"stopped {len(self.processes)} process{'es' if len(self.processes) != 1 else ''} ({names})")
+            if self.memory:
+                parts.append(f"freed {_mb(self.memory)} memory")
+            if self.killed:
+                parts.append(f"{self.killed} needed SIGKILL")
+        if self.files:
+            parts.append(f"removed {len(self.files)} partial file{'s' if len(self.files) != 1 else ''} ({_mb(self.file_bytes)})")
+        return ", ".join(parts)
+
+
+def _mb(size):
+    return f"{size / 1024 / 1024:.0f} MB"
+
+
+def _stat(pid):
+    """(name, state, session id, rss bytes) from /proc/<pid>/stat, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # the name is in parentheses and may itself contain spaces or parentheses
+    name = stat[stat.index("(") + 1:stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2:].split()
+    return name, fields[0], int(fields[3]), int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _session(sid):
+    """pid -> (name, rss) of the live processes in session `sid`."""
+    members = {}
+    try:
+        pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return members
+    for pid in pids:
+        stat = _stat(pid)
+        if stat and stat[2] == sid and stat[1] != "Z":
+            members[pid] = (stat[0], stat[3])
+    return members
+
+
+def _open_files(pid):
+    files = set()
+    try:
+        fds = os.listdir(f"/proc/{pid}/fd")
+    except OSError:
+        return files
+    for fd in fds:
+        try:
+            path = os.readlink(f"/proc/{pid}/fd/{fd}")
+        except OSError:
+            continue
+        if path.startswith("/") and is_partial(path):
+            files.add(path)
+    return files
+
+
+def is_partial(path):
+    """Whether path looks like an unfinished download or an intermediate file."""
+    return bool(_PARTIAL.search(path))
+
+
+def _alive(pid):
+    stat = _stat(pid)
+    return stat is not None and stat[1] != "Z"
+
+
+def _signal(pids, sig):
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except OSError:
+            pass
+
+
+def _related(path):
+    """A partial file plus its siblings: other fragments, the .ytdl resume file, the .part."""
+    base = _FRAGMENT.sub("", path)
+    if base.endswith(".part"):
+        base = base[:-len(".part")]
+    return {path} | set(glob.glob(glob.escape(base) + ".part-Frag*")) | {
+        p for p in (base + ".part", base + ".ytdl") if os.path.exists(p)}
+
+
+def stop(processes, grace=DEFAULT_GRACE, remove_partial=True):
+    """SIGTERM the process trees of `processes` (Popen objects), SIGKILL them after `grace` seconds.
+
+    Returns a StopReport. Processes started without SESSION are stopped on
+    their own, as their children cannot be told apart from ours.
+    """
+    report = StopReport()
+    leaders = [p for p in processes if p is not None and p.poll() is None]
+    members = {}
+    for process in leaders:
+        # with SESSION the leader's pid is the session id of the whole tree
+        members.update(_session(process.pid) or {process.pid: (os.path.basename(str(process.args[0])), 0)})
+    files = set()
+    for pid in members:
+        files |= _open_files(pid)
+
+    def survivors():
+        # rescanned, so children spawned after the snapshot are caught too
+        alive = {pid: info for pid, info in members.items() if _alive(pid)}
+        for process in leaders:
+            alive.update(_session(process.pid))
+        return alive
+
+    _signal(members, signal.SIGTERM)
+    deadline = time.monotonic() + grace
+    left = members
+    while left and time.monotonic() < deadline:
+        time.sleep(0.1)
+        for process in leaders:
+            process.poll()
+        left = survivors()
+    if left:
+        _signal(left, signal.SIGKILL)
+        for process in leaders:
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        report.killed = len(left)
+        members = {**left, **members}
+
+    report.processes = [name for name, _ in members.values()]
+    report.memory = sum(rss for _, rss in members.values())
+    if remove_partial:
+        for path in sorted(set().union(*(_related(f) for f in files)) if files else ()):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            report.files.append(path)
+            report.file_bytes += size
+    return report
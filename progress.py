@@ -0,0 +1,205 @@
+"""Progress parsing for yt-dlp, gallery-dl and spotdl output.
+
+yt-dlp is asked for a machine-readable progress line (see YTDLP_PROGRESS_ARGS);
+the other tools only print human-readable lines, which are parsed for
+item counts. Each job gets a parser from `parser_for(backend)`; feed it
+every output line and read `parser.progress`.
+"""
+import re
+
+# yt-dlp: one parseable line per progress update instead of '\r' redraws
+PROGRESS_PREFIX = "[feliciadl-progress]"
+PROGRESS_TEMPLATE = (
+    "download:" + PROGRESS_PREFIX +
+    " %(progress.downloaded_bytes)s %(progress.total_bytes)s %(progress.total_bytes_estimate)s"
+    " %(progress.speed)s %(progress.eta)s"
+)
+YTDLP_PROGRESS_ARGS = ["--newline", "--progress-template", PROGRESS_TEMPLATE]
+
+_UNITS = {"B": 1, "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3, "TIB": 1024 ** 4,
+          "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+
+
+class Progress:
+    """Latest known progress of one job. Unknown values are None."""
+
+    __slots__ = ("percent", "speed", "eta", "downloaded", "total", "items_done", "items_total", "finished_bytes")
+
+    def __init__(self):
+        self.percent = None
+        self.speed = None       # bytes per second
+        self.eta = None         # seconds
+        self.downloaded = None  # bytes of the current item
+        self.total = None       # bytes of the current item
+        self.items_done = 0
+        self.items_total = None
+        self.finished_bytes = 0  # bytes of items (and formats) already completed
+
+    def overall_percent(self):
+        """Percent of the whole job, counting finished playlist/album items."""
+        if self.items_total:
+            current = (self.percent or 0) / 100 if self.percent is not None and self.items_done < self.items_total else 0
+            return min(100.0, (self.items_done + current) * 100.0 / self.items_total)
+        return self.percent
+
+    def transferred(self):
+        """Bytes downloaded so far over all items, or None if the backend does not report sizes."""
+        if self.downloaded is None and not self.finished_bytes:
+            return None
+        return self.finished_bytes + (self.downloaded or 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, values):
+        p = cls()
+        for name in cls.__slots__:
+            if name in values:
+                setattr(p, name, values[name])
+        return p
+
+    def summary(self):
+        """Short text like '45% · 1.2 MiB/s · ETA 0:05 · 3/10'."""
+        parts = []
+        percent = self.overall_percent()
+        if percent is not None:
+            parts.append(f"{percent:.0f}%")
+        if self.speed:
+            parts.append(f"{format_bytes(self.speed)}/s")
+        if self.eta is not None:
+            parts.append(f"ETA {format_eta(self.eta)}")
+        if self.items_total:
+            parts.append(f"{self.items_done}/{self.items_total}")
+        elif self.items_done:
+            parts.append(f"{self.items_done} files")
+        return " · ".join(parts)
+
+
+def format_bytes(n):
+    n = float(n)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n:.0f} B"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+def _num(token):
+    try:
+        return float(token)
+    except (TypeError, ValueError):
+        return None
+
+
+def _size(value, unit):
+    return float(value) * _UNITS.get(unit.upper(), 1)
+
+
+class YtDlpParser:
+    # fallback for yt-dlp runs without our template (e.g. options overridden in yt-dlp.conf)
+    _DEFAULT_LINE = re.compile(
+        r"\[download\]\s+([\d.]+)% of\s+~?\s*([\d.]+)(\w+)"
+        r"(?:\s+at\s+([\d.]+)(\w+)/s)?(?:\s+ETA\s+([\d:]+))?"
+    )
+    _ITEM = re.compile(r"\[download\] Downloading (?:item|video) (\d+) of (\d+)")
+
+    def __init__(self):
+        self.progress = Progress()
+
+    def feed(self, line):
+        """Update progress from one output line. Returns True if the line was a progress line."""
+        p = self.progress
+        if line.startswith(PROGRESS_PREFIX):
+            fields = line[len(PROGRESS_PREFIX):].split()
+            if len(fields) != 5:
+                return True
+            done, total, estimate, speed, eta = (_num(f) for f in fields)
+            total = total or estimate
+            if done is not None and p.downloaded is not None and done < p.downloaded:
+                # the next format or playlist item started
+                p.finished_bytes += p.downloaded
+            p.downloaded = done
+            p.total = total
+            p.speed = speed
+            p.eta = eta
+            if done is not None and total:
+                p.percent = min(100.0, done * 100.0 / total)
+            return True
+
+        m = self._DEFAULT_LINE.search(line)
+        if m:
+            p.percent = float(m.group(1))
+            total = _size(m.group(2), m.group(3))
+            done = total * p.percent / 100
+            if p.downloaded is not None and done < p.downloaded:
+                p.finished_bytes += p.downloaded
+            p.total, p.downloaded = total, done
+            p.speed = _size(m.group(4), m.group(5)) if m.group(4) else None
+            if m.group(6):
+                secs = 0
+                for part in m.group(6).split(":"):
+                    secs = secs * 60 + int(part)
+                p.eta = secs
+            return True
+
+        m = self._ITEM.search(line)
+        if m:
+            p.items_done = int(m.group(1)) - 1
+            p.items_total = int(m.group(2))
+        return False
+
+
+class GalleryDlParser:
+    """gallery-dl prints one path per downloaded file ('# path' when skipped)."""
+
+    def __init__(self):
+        self.progress = Progress()
+
+    def feed(self, line):
+        text = line.strip()
+        if text.startswith("/") or text.startswith("# /"):
+            self.progress.items_done += 1
+        return False
+
+
+class SpotDlParser:
+    _FOUND = re.compile(r"Found (\d+) songs?")
+    _DONE = re.compile(r'^(Downloaded|Skipping) "')
+
+    def __init__(self):
+        self.progress = Progress()
+
+    def feed(self, line):
+        p = self.progress
+        m = self._FOUND.search(line)
+        if m:
+            p.items_total = int(m.group(1))
+        elif self._DONE.search(line.strip()):
+            p.items_done += 1
+        return False
+
+
+_PARSERS = {
+    "yt-dlp": YtDlpParser,
+    "gallery-dl": GalleryDlParser,
+    "spotdl": SpotDlParser,
+}
+
+
+def parser_for(backend, items=None):
+    """Return a fresh parser for the backend executable name (cmd[0]).
+
+    Unknown tools fall back to counting printed file paths. `items` is the
+    number of items when it is known up front (see expand.py).
+    """
+    parser = _PARSERS.get(backend, GalleryDlParser)()
+    parser.progress.items_total = items
+    return parser
@@ -0,0 +1,94 @@
+"""Failure classification and retry policy.
+
+A failed job is sorted into one of four classes from its exit code and
+the last lines it wrote to stderr:
+
+    transient     network hiccups, timeouts, 5xx -> retried with backoff
+    rate_limited  HTTP 429 / "too many requests" -> retried after a longer
+                  delay, and the whole host is cooled down meanwhile
+    auth          login, cookies, private/members-only -> not retried
+    permanent     404, unsupported URL, removed video, unknown -> not retried
+
+Delays grow exponentially per attempt and are jittered so jobs that
+failed together do not come back in lockstep.
+"""
+import random
+import re
+
+TRANSIENT = "transient"
+RATE_LIMITED = "rate_limited"
+AUTH_REQUIRED = "auth"
+PERMANENT = "permanent"
+
+FAILURE_LABELS = {
+    TRANSIENT: "temporary error",
+    RATE_LIMITED: "rate limited",
+    AUTH_REQUIRED: "login required",
+    PERMANENT: "permanent error",
+}
+
+# checked in this order; the first class with a matching line wins
+_PATTERNS = [
+    (RATE_LIMITED, re.compile(
+        r"HTTP Error 429|\b429\b.*Too Many Requests|too many requests|rate.?limit", re.I)),
+    (AUTH_REQUIRED, re.compile(
+        r"HTTP Error 401|sign in to confirm|login required|log in|requires? (?:authentication|login)"
+        r"|use --cookies|cookies.*(?:needed|required)|private video|members[- ]only|confirm your age"
+        r"|age.restricted|AuthenticationError|AuthorizationError|premium", re.I)),
+    (PERMANENT, re.compile(
+        r"HTTP Error 404|HTTP Error 410|Unsupported URL|No suitable extractor|NoExtractorError"
+        r"|video unavailable|has been (?:removed|deleted|terminated)|does not exist|not found"
+        r"|No video formats found|Requested format is not available|is not a valid URL", re.I)),
+    (TRANSIENT, re.compile(
+        r"HTTP Error 5\d\d|HTTP Error 408|timed? ?out|connection (?:reset|refused|aborted)"
+        r"|temporary failure in name resolution|name or service not known|network is unreachable"
+        r"|remote end closed|IncompleteRead|EOF occurred|SSL|Unable to download (?:webpage|JSON)"
+        r"|Got error|giving up after|not enough free disk space|No space left on device", re.I)),
+]
+
+# gallery-dl exit codes are OR-ed exception codes
+_GALLERYDL_CODES = [
+    (16, AUTH_REQUIRED),
+    (8, PERMANENT),
+    (64, PERMANENT),
+    (32, PERMANENT),
+    (4, TRANSIENT),
+]
+
+
+def classify(backend, returncode, lines):
+    """Failure class of a job that exited with `returncode` after printing `lines` (stderr tail)."""
+    for failure, pattern in _PATTERNS:
+        if any(pattern.search(line) for line in lines):
+            return failure
+    if backend == "gallery-dl" and returncode and returncode > 0:
+        for bit, failure in _GALLERYDL_CODES:
+            if returncode & bit:
+                return failure
+    return PERMANENT
+
+
+class RetryPolicy:
+    """How often and after how long each failure class is retried."""
+
+    def __init__(self, max_attempts=3, base_delay=5.0, max_delay=300.0, rate_limit_delay=60.0, jitter=0.5):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.rate_limit_delay = float(rate_limit_delay)
+        self.jitter = float(jitter)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**(config.get("retry") or {}))
+
+    def delay(self, failure, attempts):
+        """Seconds to wait before the next attempt, or None if the job should fail now.
+
+        `attempts` is the number of attempts already made (1 after the first failure).
+        """
+        if attempts >= self.max_attempts or failure not in (TRANSIENT, RATE_LIMITED):
+            return None
+        base = self.rate_limit_delay if failure == RATE_LIMITED else self.base_delay
+        delay = min(self.max_delay, base * 2 ** (attempts - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
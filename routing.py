@@ -0,0 +1,73 @@
+"""Automatic backend routing based on automatic.json.
+
+The domain lists are compiled once into a dict keyed by domain. A URL's
+host is then matched by looking up the host itself and each parent domain
+(``a.b.example.com`` -> ``b.example.com`` -> ``example.com``), so routing
+costs one hash lookup per host label regardless of how many domains are
+configured. A pattern only matches its own host or a subdomain of it:
+``x.com`` matches ``x.com`` and ``www.x.com`` but not ``box.com``.
+"""
+from urllib.parse import urlsplit
+
+# automatic.json backend key -> tool name used by build_command
+BACKEND_TOOLS = {
+    "yt-dlp": "Youtube-DL-Video",
+    "gallery-dl": "Gallery-DL",
+    "spotdl": "Spot-DL",
+}
+
+
+def url_host(url):
+    """Return the lower-cased host of a URL, or '' if it has none."""
+    try:
+        return (urlsplit(url.strip()).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def normalize_domain(pattern):
+    """Reduce an automatic.json entry to a bare domain ('https://www.X.com/a' -> 'x.com')."""
+    d = pattern.strip().lower()
+    if "://" in d:
+        d = d.split("://", 1)[1]
+    d = d.split("/", 1)[0].split(":", 1)[0].strip(".")
+    for prefix in ("*.", "www."):
+        if d.startswith(prefix):
+            d = d[len(prefix):]
+    return d
+
+
+class DomainIndex:
+    """Host -> backend lookup compiled from an automatic.json mapping."""
+
+    def __init__(self, mapping=None):
+        self._domains = {}
+        for backend, domains in (mapping or {}).items():
+            for pattern in domains:
+                d = normalize_domain(pattern)
+                # first backend listing a domain wins, like the old linear scan
+                if d and d not in self._domains:
+                    self._domains[d] = backend
+
+    def __len__(self):
+        return len(self._domains)
+
+    def match_host(self, host):
+        """Return the backend for `host` (most specific domain wins), or None."""
+        host = host.lower().strip(".")
+        while host:
+            backend = self._domains.get(host)
+            if backend is not None:
+                return backend
+            _, _, host = host.partition(".")
+        return None
+
+    def match(self, url):
+        return self.match_host(url_host(url))
+
+    def resolve_tool(self, url):
+        """Return the build_command tool name for `url`, or None if no backend matches."""
+        backend = self.match(url)
+        if backend is None:
+            return None
+        return BACKEND_TOOLS.get(backend, "Other-Videos")
@@ -0,0 +1,676 @@
+"""Job scheduler used for bulk downloads.
+
+Jobs run on a pool of worker threads. Each backend (yt-dlp, gallery-dl,
+spotdl) has its own concurrency limit, and jobs hitting the same host are
+spaced out by a politeness delay that does not hold back other hosts.
+Failed jobs are classified (see retry.py) and transient failures are put
+back in the queue with a backoff delay instead of failing the batch.
+An optional bandwidth budget (see bandwidth.py) is shared by running jobs
+and a per-host cap bounds how many of them talk to one host at a time.
+Cancelling stops a job's whole process tree (see proctree.py).
+A runner may hand a job on to a later stage (see postprocess.py) by
+returning a Future of its exit code; the download slot is freed at once.
+
+Queued jobs wait in a heap ordered by priority (high, normal, low) and,
+within a priority, by a fair-queuing turn: every batch starts at the
+turn currently being served, so a batch submitted later interleaves with
+a long one instead of waiting behind it. A high-priority job that cannot
+start pauses a running low-priority one, which is stopped without
+removing its partial files and requeued; the backend continues from
+them (yt-dlp .part files, files gallery-dl and spotdl already have)
+when it runs again. Jobs can also be paused and resumed explicitly.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from bandwidth import with_rate_limit
+from batching import chunk_key, DEFAULT_CHUNK_SIZE
+import proctree
+from retry import classify, RATE_LIMITED
+from routing import url_host
+
+DEFAULT_WORKERS = 4
+DEFAULT_BACKEND_LIMITS = {"yt-dlp": 4, "gallery-dl": 2, "spotdl": 1}
+DEFAULT_DOMAIN_DELAY = 5.0
+
+HIGH = "high"
+NORMAL = "normal"
+LOW = "low"
+PRIORITIES = (HIGH, NORMAL, LOW)
+_RANK = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+
+
+class Batch:
+    """A group of jobs submitted together (one bulk run)."""
+
+    def __init__(self, total, on_progress=None):
+        self.total = total
+        self.finished = 0
+        self.failed = 0
+        self.skipped = 0
+        self.cancelled = False
+        self.on_progress = on_progress
+        self.turn = 0       # next fair-queuing turn of this batch (see Scheduler.submit)
+
+    @property
+    def complete(self):
+        return self.finished >= self.total
+
+
+class Job:
+    """A single URL to download with an already built command."""
+
+    def __init__(self, url, tool, cmd, resolved_tool=None, batch=None, job_id=None, priority=NORMAL):
+        self.job_id = job_id
+        self.url = url
+        self.tool = tool
+        self.cmd = cmd
+        self.resolved_tool = resolved_tool or tool
+        self.backend = cmd[0] if cmd else None
+        self.host = url_host(url)
+        self.chunk_key = chunk_key(self)
+        self.batch = batch
+        self.priority = priority if priority in _RANK else NORMAL
+        self.turn = 0           # fair-queuing position among jobs of the same priority
+        self.state = "queued"
+        self.returncode = None
+        self.process = None     # the running attempt's child; dropped once the job settles
+        self.progress = None
+        self.error = None
+        self.attempts = 0
+        self.not_before = 0     # monotonic time before which a retry may not start
+        self.failure = None     # retry.py failure class of the last failed attempt
+        self.stderr_tail = deque(maxlen=20)
+        self.rate_limit = None  # bytes/s share of the bandwidth budget, None for unlimited
+        self.live_rate = False  # whether rate_limit can still change while the job runs
+        self.future = None      # post-processing result while the job is "processing"
+        self.reservation = None  # disk space held for the job (see postprocess.split)
+        self.started_at = None  # wall-clock time the first attempt started (telemetry)
+        self.size = None        # expected bytes, when expand.py learned them before the download
+        self.items = None       # files in a gallery, when expand.py counted them
+
+    def command(self):
+        """cmd with the bandwidth share the scheduler assigned to this job."""
+        return with_rate_limit(self.cmd, self.rate_limit)
+
+    def note_line(self, stream, text):
+        """Runners pass output here so failures can be classified."""
+        if stream == "stderr":
+            self.stderr_tail.append(text)
+
+    def last_error(self):
+        return self.stderr_tail[-1] if self.stderr_tail else ""
+
+
+class Scheduler:
+    """Dispatch jobs to worker threads while honouring per-backend and per-host limits.
+
+    `run_job(job)` is called on a worker thread and must return the exit code.
+    It should store the child process on `job.process` so `cancel()` can stop
+    it; children started with proctree.SESSION are stopped with all their
+    descendants, SIGTERM first and SIGKILL after `stop_grace` seconds. Partial
+    files are removed if `remove_partial`, and `on_stopped(report)` receives
+    the proctree.StopReport.
+    When a `store` (jobstore.JobStore) is given, state changes of jobs that have
+    a `job_id` are written to it.
+
+    With `chunk_size` > 1 and a `run_chunk(jobs)` callback, a worker claims up to
+    `chunk_size` queued jobs sharing a chunk_key and runs them as one process;
+    `run_chunk` returns one exit code per job.
+
+    Instead of an exit code, `run_job`/`run_chunk` may return a Future that
+    resolves to one (post-processing). The job is then "processing": its
+    worker and backend slot move on, and it finishes when the Future does.
+
+    Jobs start by priority and, within a priority, take turns across
+    batches. A waiting high-priority job preempts a running low-priority
+    one when no worker or backend slot is free; `pause_ids` and
+    `resume_ids` pause and resume jobs explicitly. Paused jobs are stopped
+    without removing partial files and are not counted as attempts.
+
+    With a `retry_policy` (retry.RetryPolicy), failed jobs that the policy
+    allows are requeued after its delay; `on_retry(job, delay)` is called
+    for each. A rate-limited job also holds back its whole host that long.
+
+    With a `budget` (bandwidth.BandwidthBudget), each starting job (or chunk)
+    gets a share on `job.rate_limit`; runners start `job.command()`, which
+    carries it. `adjustable(job)` tells which jobs pick up changes of
+    `rate_limit` while running (see ytdlp_engine.EnginePool.run); their
+    shares are rebalanced whenever jobs start or finish. Jobs run outside
+    the scheduler (single downloads) take their share through
+    `hold_bandwidth` / `release_bandwidth`. `host_limit` caps the jobs
+    running against one host.
+    """
+
+    def __init__(self, run_job, workers=DEFAULT_WORKERS, backend_limits=None,
+                 domain_delay=DEFAULT_DOMAIN_DELAY, store=None,
+                 run_chunk=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 retry_policy=None, on_retry=None,
+                 budget=None, adjustable=None, host_limit=None,
+                 remove_partial=True, stop_grace=proctree.DEFAULT_GRACE, on_stopped=None):
+        self.run_job = run_job
+        self.store = store
+        self.retry_policy = retry_policy
+        self.on_retry = on_retry
+        self.run_chunk = run_chunk
+        self.chunk_size = max(1, int(chunk_size))
+        self.workers = max(1, int(workers))
+        self.backend_limits = dict(DEFAULT_BACKEND_LIMITS)
+        self.backend_limits.update(backend_limits or {})
+        self.domain_delay = float(domain_delay)
+        self.budget = budget
+        self.adjustable = adjustable
+        self.host_limit = int(host_limit) if host_limit else None
+        self.remove_partial = remove_partial
+        self.stop_grace = float(stop_grace)
+        self.on_stopped = on_stopped
+
+        self._cond = threading.Condition()
+        self._pending = []      # heap of (priority rank, turn, seq, job)
+        self._seq = itertools.count()
+        self._turn = 0          # turn of the job dispatched last
+        self._paused = []
+        self._preempted = set()  # paused jobs that go back to the queue once stopped
+        self._running = []
+        self._processing = []
+        self._units = []        # running jobs grouped by process
+        self._outside = []      # units run outside the scheduler that share the budget
+        self._backend_active = {}
+        self._host_active = {}
+        self._host_ready = {}
+        self._budget_limit = None
+        self._threads = []
+
+    # --- public API ---
+
+    def submit(self, jobs):
+        with self._cond:
+            for job in jobs:
+                job.state = "queued"
+                # a batch joins at the turn being served, then takes every turn after it
+                batch_turn = job.batch.turn if job.batch is not None else 0
+                job.turn = max(self._turn, batch_turn)
+                if job.batch is not None:
+                    job.batch.turn = job.turn + 1
+                self._push(job)
+            self._spawn_workers()
+            victims = self._preempt()
+            self._cond.notify_all()
+        self._pause_units(victims)
+
+    def pause_ids(self, job_ids):
+        """Pause the queued or running jobs with the given store ids. Returns how many were found.
+
+        Running jobs are stopped in the background and keep their partial
+        files; a job that shares a process with others (a chunk) pauses them too.
+        """
+        job_ids = set(job_ids)
+        with self._cond:
+            queued = [entry[-1] for entry in self._pending if entry[-1].job_id in job_ids]
+            if queued:
+                self._pending = [entry for entry in self._pending if entry[-1].job_id not in job_ids]
+                heapq.heapify(self._pending)
+            for job in queued:
+                job.state = "paused"
+                self._paused.append(job)
+            units = [unit for unit in self._units if any(job.job_id in job_ids for job in unit)]
+            for unit in units:
+                for job in unit:
+                    job.state = "paused"
+                    self._preempted.discard(job)
+            self._cond.notify_all()
+        if self.store is not None:
+            for job in queued:
+                if job.job_id is not None:
+                    self.store.mark(job.job_id, "paused")
+        self._pause_units(units)
+        return len(queued) + sum(len(unit) for unit in units)
+
+    def resume_ids(self, job_ids=None):
+        """Queue paused jobs again (all, or those with the given store ids). Returns how many."""
+        with self._cond:
+            resumed = [job for job in self._paused if job_ids is None or job.job_id in job_ids]
+            self._paused = [job for job in self._paused if job not in resumed]
+            for job in resumed:
+                job.state = "queued"
+                self._push(job)
+            victims = self._preempt()
+            self._cond.notify_all()
+        if self.store is not None:
+            for job in resumed:
+                if job.job_id is not None:
+                    self.store.mark(job.job_id, "queued")
+        self._pause_units(victims)
+        return len(resumed)
+
+    def set_workers(self, count):
+        with self._cond:
+            self.workers = max(1, int(count))
+            self._spawn_workers()
+            self._cond.notify_all()
+
+    def cancel(self, batch=None, remove_partial=None):
+        """Drop queued jobs and stop running ones (all jobs, or only those of `batch`).
+
+        Blocks until the running jobs' processes are gone (up to stop_grace
+        plus a second). `remove_partial` overrides the scheduler's setting.
+        """
+        with self._cond:
+            if batch is not None:
+                batch.cancelled = True
+        return self._cancel(lambda job: batch is None or job.batch is batch, remove_partial)
+
+    def cancel_ids(self, job_ids):
+        """Like cancel(), for the jobs with the given store ids. Returns how many were found."""
+        job_ids = set(job_ids)
+        return self._cancel(lambda job: job.job_id in job_ids)
+
+    def _cancel(self, match, remove_partial=None):
+        dropped = []
+        with self._cond:
+            keep = []
+            for entry in self._pending:
+                if match(entry[-1]):
+                    entry[-1].state = "cancelled"
+                    dropped.append(entry[-1])
+                else:
+                    keep.append(entry)
+            self._pending = keep
+            heapq.heapify(self._pending)
+            paused = [job for job in self._paused if match(job)]
+            self._paused = [job for job in self._paused if job not in paused]
+            for job in paused:
+                job.state = "cancelled"
+            dropped += paused
+            running = [j for j in self._running + self._processing if match(j)]
+            self._cond.notify_all()
+
+        processes = []
+        for job in running:
+            job.state = "cancelled"
+            if job.future is not None:
+                job.future.cancel()
+            # jobs of a chunk share one process
+            if job.process is not None and job.process not in processes:
+                processes.append(job.process)
+        if processes:
+            report = proctree.stop(processes, self.stop_grace,
+                                   self.remove_partial if remove_partial is None else remove_partial)
+            if self.on_stopped and report.summary():
+                self.on_stopped(report)
+        for job in dropped:
+            self._finish(job)
+        return len(dropped) + len(running)
+
+    def hold_bandwidth(self, jobs):
+        """Give jobs run outside the scheduler their share of the budget on `rate_limit`.
+
+        The share counts against the budget like a running unit's until
+        `release_bandwidth(jobs)`.
+        """
+        if self.budget is None:
+            return
+        with self._cond:
+            for job in jobs:
+                job.live_rate = False
+            # as many shares as _claim expects, counting this one
+            expected = min(self.workers, len(self._units) + len(self._pending)) + len(self._outside) + 1
+            self.budget.assign(jobs, self._budget_units(), expected)
+            self._outside.append(jobs)
+            self.budget.rebalance(self._budget_units())
+
+    def release_bandwidth(self, jobs):
+        if self.budget is None:
+            return
+        with self._cond:
+            if jobs in self._outside:
+                self._outside.remove(jobs)
+                self.budget.rebalance(self._budget_units())
+                self._cond.notify_all()
+
+    def idle(self):
+        with self._cond:
+            return not self._pending and not self._running and not self._processing and not self._paused
+
+    def running(self, batch=None):
+        """Jobs currently running (all, or only those of `batch`)."""
+        with self._cond:
+            return [j for j in self._running if batch is None or j.batch is batch]
+
+    def processing(self, batch=None):
+        """Jobs whose download finished and that wait for post-processing."""
+        with self._cond:
+            return [j for j in self._processing if batch is None or j.batch is batch]
+
+    def jobs(self):
+        """Snapshot of (running, queued) jobs; running includes processing ones, queued
+        lists the queue in start order followed by paused jobs."""
+        with self._cond:
+            return self._running + self._processing, [entry[-1] for entry in sorted(self._pending)] + self._paused
+
+    def job_ids(self):
+        """Store ids of jobs that are queued, paused, running or processing in this scheduler."""
+        with self._cond:
+            jobs = [entry[-1] for entry in self._pending] + self._paused + self._running + self._processing
+            return {j.job_id for j in jobs if j.job_id is not None}
+
+    def stats(self):
+        with self._cond:
+            return {"queued": len(self._pending), "running": len(self._running),
+                    "processing": len(self._processing), "paused": len(self._paused)}
+
+    # --- internals ---
+
+    def _push(self, job):
+        # called with the lock held; seq keeps equal turns in submission order
+        heapq.heappush(self._pending, (_RANK[job.priority], job.turn, next(self._seq), job))
+
+    def _spawn_workers(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _eligible(self, job, now):
+        limit = self.backend_limits.get(job.backend)
+        if limit is not None and self._backend_active.get(job.backend, 0) >= limit:
+            return False
+        if not self._host_free(job.host):
+            return False
+        return job.not_before <= now and self._host_ready.get(job.host, 0) <= now
+
+    def _host_free(self, host):
+        return self.host_limit is None or not host or self._host_active.get(host, 0) < self.host_limit
+
+    def _take_next(self):
+        """Block until a job may start, then claim it (and chunk mates).
+
+        Returns a list of jobs, or None when the worker should exit.
+        """
+        with self._cond:
+            while True:
+                if len([t for t in self._threads if t.is_alive()]) > self.workers:
+                    self._threads.remove(threading.current_thread())
+                    return None
+
+                now = time.monotonic()
+                wait = None
+                if self.budget is not None:
+                    self._follow_schedule()
+                    # re-check at least once a minute so schedule changes are picked up
+                    wait = 60.0
+                    if not self.budget.can_start(self._budget_units()):
+                        self._cond.wait(wait)
+                        continue
+                skipped = []
+                found = None
+                while self._pending:
+                    entry = heapq.heappop(self._pending)
+                    job = entry[-1]
+                    if self._eligible(job, now):
+                        found = job
+                        break
+                    skipped.append(entry)
+                    ready = max(job.not_before, self._host_ready.get(job.host, 0))
+                    if ready > now:
+                        wait = ready - now if wait is None else min(wait, ready - now)
+                for entry in skipped:
+                    heapq.heappush(self._pending, entry)
+                if found is not None:
+                    self._turn = max(self._turn, found.turn)
+                    jobs = [found] + self._take_chunk_mates(found, now)
+                    self._claim(jobs, now)
+                    return jobs
+                self._cond.wait(wait)
+
+    def _take_chunk_mates(self, first, now):
+        if self.run_chunk is None or self.chunk_size < 2 or first.chunk_key is None:
+            return []
+        hosts = {first.host}
+        mates = []
+        keep = []
+        for entry in sorted(self._pending):
+            job = entry[-1]
+            if (len(mates) < self.chunk_size - 1 and job.chunk_key == first.chunk_key
+                    and job.priority == first.priority and job.not_before <= now
+                    and (job.host in hosts or (self._host_ready.get(job.host, 0) <= now and self._host_free(job.host)))):
+                mates.append(job)
+                hosts.add(job.host)
+            else:
+                keep.append(entry)
+        # still sorted, so still a heap
+        self._pending = keep
+        return mates
+
+    def _claim(self, jobs, now):
+        # a chunk runs as one process, so it takes one backend slot
+        backend = jobs[0].backend
+        self._backend_active[backend] = self._backend_active.get(backend, 0) + 1
+        for job in jobs:
+            job.state = "running"
+            job.attempts += 1
+            if job.started_at is None:
+                job.started_at = time.time()
+            job.stderr_tail.clear()
+            self._running.append(job)
+            if job.host:
+                self._host_ready[job.host] = now + self.domain_delay
+        for host in {job.host for job in jobs if job.host}:
+            self._host_active[host] = self._host_active.get(host, 0) + 1
+        if self.budget is not None:
+            live = bool(self.adjustable and self.adjustable(jobs[0]))
+            for job in jobs:
+                job.live_rate = live
+            expected = min(self.workers, len(self._units) + 1 + len(self._pending)) + len(self._outside)
+            self.budget.assign(jobs, self._budget_units(), expected)
+            self._units.append(jobs)
+            self.budget.rebalance(self._budget_units())
+        else:
+            self._units.append(jobs)
+
+    def _release(self, jobs):
+        # called with the lock held
+        self._backend_active[jobs[0].backend] -= 1
+        for host in {job.host for job in jobs if job.host}:
+            self._host_active[host] -= 1
+        self._units.remove(jobs)
+        if self.budget is not None:
+            self.budget.rebalance(self._budget_units())
+
+    def _follow_schedule(self):
+        # called with the lock held; a scheduled budget change re-divides the live shares
+        limit = self.budget.limit_now()
+        if limit != self._budget_limit:
+            self._budget_limit = limit
+            self.budget.rebalance(self._budget_units())
+
+    def _budget_units(self):
+        # called with the lock held
+        return self._units + self._outside
+
+    def _worker(self):
+        while True:
+            jobs = self._take_next()
+            if jobs is None:
+                return
+            if self.store is not None:
+                for job in jobs:
+                    if job.job_id is not None:
+                        self.store.mark(job.job_id, "running")
+            try:
+                if len(jobs) == 1:
+                    codes = [self.run_job(jobs[0])]
+                else:
+                    codes = self.run_chunk(jobs)
+            except Exception as e:
+                for job in jobs:
+                    job.error = e
+                    # lets the failure be classified, e.g. a full disk as temporary
+                    job.note_line("stderr", str(e))
+                codes = [-1] * len(jobs)
+
+            results = []
+            with self._cond:
+                self._release(jobs)
+                for job, code in zip(jobs, codes):
+                    self._running.remove(job)
+                    if job.state == "paused":
+                        if code != 0 and not isinstance(code, Future):
+                            self._hold(job)
+                            continue
+                        # it finished before the stop reached it
+                        job.state = "running"
+                        self._preempted.discard(job)
+                    if not isinstance(code, Future):
+                        results.append((job, code))
+                    elif job.state == "cancelled":
+                        code.cancel()
+                        results.append((job, -1))
+                    else:
+                        job.state = "processing"
+                        job.future = code
+                        self._processing.append(job)
+                self._cond.notify_all()
+            if self.store is not None:
+                for job in jobs:
+                    if job.job_id is not None and job.state in ("queued", "paused"):
+                        self.store.mark(job.job_id, job.state)
+            for job in jobs:
+                if job.future is not None:
+                    job.future.add_done_callback(lambda future, job=job: self._processed(job, future))
+            self._complete(results)
+
+    def _hold(self, job):
+        """Park a job whose run was paused: back in the queue if preempted, else with the paused ones."""
+        # called with the lock held
+        job.attempts -= 1
+        job.process = None
+        if job in self._preempted:
+            self._preempted.discard(job)
+            job.state = "queued"
+            self._push(job)
+        else:
+            self._paused.append(job)
+
+    def _preempt(self):
+        """Running low-priority units to pause so waiting high-priority jobs can start.
+
+        Called with the lock held; the returned units are already marked paused.
+        """
+        now = time.monotonic()
+        waiting = [entry[-1] for entry in sorted(self._pending)
+                   if entry[0] == _RANK[HIGH] and entry[-1].not_before <= now]
+        if not waiting:
+            return []
+        # the latest started ones lose the least work
+        candidates = [unit for unit in reversed(self._units)
+                      if all(job.priority == LOW and job.state == "running" for job in unit)]
+        free = self.workers - len(self._units)
+        victims = []
+        for job in waiting:
+            if not candidates:
+                break
+            if not self._host_free(job.host) or self._host_ready.get(job.host, 0) > now:
+                continue
+            limit = self.backend_limits.get(job.backend)
+            backend_full = limit is not None and self._backend_active.get(job.backend, 0) >= limit
+            if free > 0 and not backend_full:
+                free -= 1
+                continue
+            unit = next((u for u in candidates if not backend_full or u[0].backend == job.backend), None)
+            if unit is None:
+                continue
+            candidates.remove(unit)
+            victims.append(unit)
+            for low in unit:
+                low.state = "paused"
+                self._preempted.add(low)
+        return victims
+
+    def _pause_units(self, units):
+        """Stop the processes of paused units in the background, keeping their partial files."""
+        processes = []
+        for unit in units:
+            for job in unit:
+                if job.process is not None and job.process not in processes:
+                    processes.append(job.process)
+        if processes:
+            threading.Thread(target=proctree.stop, args=(processes, self.stop_grace, False), daemon=True).start()
+
+    def _processed(self, job, future):
+        if future.cancelled():
+            code = -1
+        elif future.exception() is not None:
+            # a post-processing step that raised fails its job instead of leaving it processing
+            job.error = future.exception()
+            job.note_line("stderr", f"ERROR: post-processing failed: {job.error}")
+            code = 1
+        else:
+            code = future.result()
+        with self._cond:
+            self._processing.remove(job)
+            job.future = None
+        self._complete([(job, code)])
+
+    def _complete(self, results):
+        """Settle (job, exit code) pairs: done, failed, cancelled or requeued for a retry."""
+        retries = []
+        with self._cond:
+            now = time.monotonic()
+            for job, code in results:
+                job.returncode = code
+                if job.state == "cancelled":
+                    continue
+                if code == 0:
+                    job.state = "done"
+                    continue
+                delay = self._retry_delay(job, code, now)
+                if delay is None:
+                    job.state = "failed"
+                else:
+                    job.state = "queued"
+                    job.process = None
+                    job.not_before = now + delay
+                    self._push(job)
+                    retries.append((job, delay))
+            self._cond.notify_all()
+        for job, delay in retries:
+            if self.store is not None and job.job_id is not None:
+                self.store.mark(job.job_id, "queued", job.returncode)
+            if self.on_retry:
+                self.on_retry(job, delay)
+        for job, _ in results:
+            if job.state != "queued":
+                self._finish(job)
+
+    def _retry_delay(self, job, code, now):
+        # called with the lock held
+        job.failure = classify(job.backend, code, job.stderr_tail)
+        if self.retry_policy is None or (job.batch is not None and job.batch.cancelled):
+            return None
+        delay = self.retry_policy.delay(job.failure, job.attempts)
+        if delay is not None and job.failure == RATE_LIMITED and job.host:
+            self._host_ready[job.host] = max(self._host_ready.get(job.host, 0), now + delay)
+        return delay
+
+    def _finish(self, job):
+        # batches keep their jobs until the end, but not the finished processes and their pipes
+        job.process = None
+        if self.store is not None and job.job_id is not None:
+            self.store.mark(job.job_id, job.state, job.returncode)
+        batch = job.batch
+        if batch is None:
+            return
+        with self._cond:
+            batch.finished += 1
+            if job.state == "failed":
+                batch.failed += 1
+            elif job.state == "cancelled":
+                batch.skipped += 1
+        if batch.on_progress:
+            batch.on_progress(batch, job)
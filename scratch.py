@@ -0,0 +1,138 @@
+"""Scratch directory for jobs in progress, and the disk-space preflight.
+
+With "scratch_dir" set (local SSD or tmpfs), jobs write fragments, ffmpeg
+temp files and their output there instead of into the library, which may
+be a slow network mount. Finished files are moved into the library with
+`move_file`: os.replace on the same filesystem, otherwise a streamed copy
+that is fsync'ed and then renamed into place, so the library never holds
+half a file.
+
+Before a job starts, `Scratch.reserve` checks that the filesystems it
+writes to have "disk_reserve" bytes free on top of what running jobs
+have already reserved. If not, the job fails with a message that
+retry.py classifies as temporary, so it is tried again later.
+"""
+import errno
+import os
+import shutil
+import threading
+
+from bandwidth import parse_rate
+
+DEFAULT_RESERVE = 1024 ** 3
+NO_SPACE_MESSAGE = "ERROR: not enough free disk space"
+COPY_BUFFER = 1024 * 1024
+
+
+class NoSpace(Exception):
+    """Raised instead of starting a job when its disk space cannot be reserved."""
+
+
+# output directory option of each backend
+_DIR_OPTIONS = {"yt-dlp": ("-P", "--paths"), "gallery-dl": ("-d", "--destination"), "spotdl": ("--output",)}
+
+
+def move_file(src, dst):
+    """Move src to dst atomically; across filesystems via copy + fsync + rename."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    tmp = f"{dst}.feliciadl-tmp"
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout, COPY_BUFFER)
+            fout.flush()
+            os.fsync(fout.fileno())
+        shutil.copystat(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(os.path.dirname(dst))
+    os.remove(src)
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _existing(path):
+    # disk_usage needs a path that exists; the job's folder may not yet
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path or "/"
+
+
+def output_dir(cmd):
+    """Index of the backend's output directory argument in cmd, or None."""
+    for i, arg in enumerate(cmd[1:-1], 1):
+        if arg in _DIR_OPTIONS.get(cmd[0], ()):
+            return i + 1
+    return None
+
+
+class Scratch:
+    """Scratch root plus the space reservations of running jobs."""
+
+    def __init__(self, root=None, reserve=DEFAULT_RESERVE):
+        self.root = os.path.expanduser(root) if root else None
+        self.reserve_bytes = reserve
+        self._lock = threading.Lock()
+        self._reserved = {}     # filesystem device -> bytes reserved by running jobs
+
+    @classmethod
+    def from_config(cls, config):
+        reserve = config.get("disk_reserve", DEFAULT_RESERVE)
+        return cls(config.get("scratch_dir"), parse_rate(reserve) or 0)
+
+    def work_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def redirect(self, cmd, key):
+        """cmd writing into the scratch work dir for `key`, and the library folder it belonged in."""
+        i = output_dir(cmd)
+        if self.root is None or i is None:
+            return cmd, None
+        work = self.work_dir(key)
+        os.makedirs(work, exist_ok=True)
+        cmd = list(cmd)
+        final_dir, cmd[i] = cmd[i], work
+        return cmd, final_dir
+
+    def reserve(self, paths):
+        """Reserve disk_reserve bytes on the filesystems of `paths`; a token for release(), or None if full."""
+        if not self.reserve_bytes:
+            return ()
+        devices = {}
+        for path in paths:
+            path = _existing(path)
+            devices.setdefault(os.stat(path).st_dev, path)
+        with self._lock:
+            for device, path in devices.items():
+                if shutil.disk_usage(path).free - self._reserved.get(device, 0) < self.reserve_bytes:
+                    return None
+            for device in devices:
+                self._reserved[device] = self._reserved.get(device, 0) + self.reserve_bytes
+        return tuple(devices)
+
+    def release(self, token):
+        with self._lock:
+            for device in token or ():
+                self._reserved[device] -= self.reserve_bytes
@@ -0,0 +1,199 @@
+"""Structured job telemetry in <download folder>/log/events.jsonl.
+
+Every finished job (done, failed or cancelled) becomes one JSON line with
+its id, tool and resolved tool, domain, start and end time, exit code,
+bytes transferred, average throughput, retries and failure class. Lines
+are written by one writer thread that keeps the file open and flushes
+after each burst, instead of every job reopening a log file. The file is
+rotated by size (events.jsonl.1, .2, ...), and `summarize` /
+`format_stats` turn the events into the per-backend and per-domain table
+printed by `feliciadl --stats`.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from bandwidth import parse_rate
+from progress import format_bytes
+
+EVENTS_NAME = "events.jsonl"
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+
+def events_path(base):
+    return os.path.join(base, "log", EVENTS_NAME)
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds).isoformat(timespec="seconds") if seconds else None
+
+
+def job_event(job):
+    """The telemetry record of a finished scheduler.Job."""
+    ended = time.time()
+    started = job.started_at or ended
+    duration = max(0.0, ended - started)
+    transferred = job.progress.transferred() if job.progress is not None else None
+    return {
+        "event": "job",
+        "id": job.job_id,
+        "url": job.url,
+        "tool": job.tool,
+        "resolved_tool": job.resolved_tool,
+        "backend": job.backend,
+        "domain": job.host,
+        "state": job.state,
+        "started": _timestamp(started),
+        "ended": _timestamp(ended),
+        "duration": round(duration, 3),
+        "returncode": job.returncode,
+        "bytes": int(transferred) if transferred is not None else None,
+        "throughput": round(transferred / duration) if transferred and duration else None,
+        "retries": max(0, job.attempts - 1),
+        "failure": job.failure if job.state == "failed" else None,
+    }
+
+
+class Telemetry:
+    """Appends job events from any thread; a single writer thread does the I/O."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        self.max_bytes = max_bytes
+        self.backups = max(0, int(backups))
+        self._queue = queue.Queue()
+        self._files = {}        # path -> open file
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config):
+        """None when "telemetry" is false; otherwise {"max_bytes": "10M", "backups": 3} may tune it."""
+        settings = config.get("telemetry", {})
+        if settings is False:
+            return None
+        if not isinstance(settings, dict):
+            settings = {}
+        return cls(parse_rate(settings.get("max_bytes", DEFAULT_MAX_BYTES)) or DEFAULT_MAX_BYTES,
+                   settings.get("backups", DEFAULT_BACKUPS))
+
+    def record(self, job, base):
+        """Queue the event of a finished job for the log folder under `base`."""
+        self._queue.put((events_path(base), job_event(job)))
+
+    def close(self, timeout=5):
+        """Write what is queued and stop the writer."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _writer(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in items:
+                if item is None:
+                    self._close_files()
+                    return
+                try:
+                    self._write(*item)
+                except OSError:
+                    pass
+            for f in self._files.values():
+                try:
+                    f.flush()
+                except OSError:
+                    pass
+
+    def _write(self, path, event):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        f = self._files.get(path)
+        if f is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = self._files[path] = open(path, "a", encoding="utf-8")
+        if f.tell() and f.tell() + len(line) > self.max_bytes:
+            f.close()
+            _rotate(path, self.backups)
+            f = self._files[path] = open(path, "a", encoding="utf-8")
+        f.write(line)
+
+    def _close_files(self):
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._files.clear()
+
+
+def _rotate(path, backups):
+    if not backups:
+        os.remove(path)
+        return
+    for n in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{n}"):
+            os.replace(f"{path}.{n}", f"{path}.{n + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def read_events(path):
+    """Events from the rotated files and the current one, oldest first; broken lines are skipped."""
+    rotated = 0
+    while os.path.exists(f"{path}.{rotated + 1}"):
+        rotated += 1
+    for name in [f"{path}.{n}" for n in range(rotated, 0, -1)] + [path]:
+        try:
+            with open(name, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(event, dict) and event.get("event") == "job":
+                        yield event
+        except OSError:
+            continue
+
+
+def summarize(events):
+    """{"backend": {name: totals}, "domain": {name: totals}} over job events."""
+    groups = {"backend": {}, "domain": {}}
+    for event in events:
+        for key in groups:
+            name = event.get(key) or "?"
+            totals = groups[key].setdefault(name, {"jobs": 0, "done": 0, "failed": 0, "retries": 0,
+                                                   "bytes": 0, "seconds": 0.0})
+            totals["jobs"] += 1
+            totals["done"] += event.get("state") == "done"
+            totals["failed"] += event.get("state") == "failed"
+            totals["retries"] += event.get("retries") or 0
+            # throughput only over jobs that report their size
+            if event.get("bytes"):
+                totals["bytes"] += event["bytes"]
+                totals["seconds"] += event.get("duration") or 0
+    return groups
+
+
+def format_stats(groups, limit=20):
+    """Table lines of summarize() output; domains are cut to the `limit` busiest."""
+    lines = []
+    for key, title in (("backend", "Backend"), ("domain", "Domain")):
+        rows = sorted(groups[key].items(), key=lambda item: (-item[1]["jobs"], item[0]))
+        if not rows:
+            continue
+        if lines:
+            lines.append("")
+        lines.append(f"{title:<28}{'jobs':>6}{'done':>6}{'failed':>7}{'retries':>8}{'data':>12}{'avg speed':>13}")
+        for name, t in rows[:limit]:
+            speed = f"{format_bytes(t['bytes'] / t['seconds'])}/s" if t["bytes"] and t["seconds"] else "-"
+            data = format_bytes(t["bytes"]) if t["bytes"] else "-"
+            lines.append(f"{name[:27]:<28}{t['jobs']:>6}{t['done']:>6}{t['failed']:>7}{t['retries']:>8}{data:>12}{speed:>13}")
+        if len(rows) > limit:
+            lines.append(f"… and {len(rows) - limit} more")
+    return lines
@@ -0,0 +1,43 @@
+import sqlite3
+
+import archive
+from archive import Archive
+
+VIDEO = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def test_lookups_are_per_tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    store = Archive(str(tmp_path / "archive.db"))
+    store.add(VIDEO, "Youtube-DL-Video")
+    assert store.contains("https://youtu.be/dQw4w9WgXcQ", "Youtube-DL-Video")
+    assert not store.contains(VIDEO, "Youtube-DL-Audio")
+    fresh, duplicates, archived = store.filter([VIDEO, VIDEO, VIDEO],
+                                               ["Youtube-DL-Audio", "Youtube-DL-Audio", "Youtube-DL-Video"])
+    assert (fresh, duplicates, archived) == ([VIDEO], [VIDEO], [VIDEO])
+
+
+def test_ytdlp_archive_files_are_per_tool(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    assert archive.archive_args("yt-dlp", "Youtube-DL-Video") != archive.archive_args("yt-dlp", "Youtube-DL-Audio")
+    with open(archive.ytdlp_archive_path("Youtube-DL-Audio"), "w") as f:
+        f.write("youtube dQw4w9WgXcQ\n")
+    store = Archive(str(tmp_path / "archive.db"))
+    assert store.contains(VIDEO, "Youtube-DL-Audio")
+    assert not store.contains(VIDEO, "Youtube-DL-Video")
+
+
+def test_old_archives_keep_their_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    path = str(tmp_path / "archive.db")
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE items (canonical TEXT PRIMARY KEY, extractor_key TEXT, url TEXT NOT NULL,
+                            tool TEXT, created REAL NOT NULL);
+        INSERT INTO items VALUES ('https://youtube.com/watch?v=dQw4w9WgXcQ', 'youtube dQw4w9WgXcQ',
+                                  'https://youtu.be/dQw4w9WgXcQ', 'Youtube-DL-Video', 0);
+    """)
+    db.close()
+    store = Archive(path)
+    assert store.contains(VIDEO, "Youtube-DL-Video")
+    assert not store.contains(VIDEO, "Youtube-DL-Audio")
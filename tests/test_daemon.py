@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import daemon
+from jobstore import JobStore
+
+
+def entry(code, url, base):
+    return (url, "Other-Videos", [sys.executable, "-c", code], "Other-Videos", base)
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    path = str(tmp_path / "daemon.sock")
+    config = {"download_dir": str(tmp_path / "dl"), "archive": False, "telemetry": False,
+              "expand": False, "workers": 2, "domain_delay": 0, "stop_grace": 1}
+    thread = threading.Thread(target=daemon.serve, args=(config, path, JobStore(str(tmp_path / "jobs.db"))),
+                              daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not daemon.is_running(path):
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+    yield path, str(tmp_path / "dl")
+    if daemon.is_running(path):
+        with daemon.connect(path) as client:
+            client.request("shutdown")
+    thread.join(10)
+
+
+def test_submit_and_watch_events(running_daemon):
+    path, base = running_daemon
+    with daemon.connect(path) as client:
+        [job_id] = client.submit([entry("print('hello from the job')", "https://a.example/1", base)], watch=True)
+        events = []
+        for event in client.events():
+            events.append(event)
+            if event["event"] == "state" and event["state"] in daemon.FINAL_STATES:
+                break
+    assert {"event": "line", "id": job_id, "stream": "stdout", "text": "hello from the job"} in events
+    assert events[-1]["state"] == "done" and events[-1]["returncode"] == 0
+
+
+def test_status_cancel_and_shutdown(running_daemon):
+    path, base = running_daemon
+    with daemon.connect(path) as client:
+        [job_id] = client.submit([entry("import time; time.sleep(60)", "https://b.example/1", base)])
+        deadline = time.monotonic() + 10
+        while not client.request("status")["running"]:
+            assert time.monotonic() < deadline, "job did not start"
+            time.sleep(0.05)
+        status = client.request("status")
+        assert [job["id"] for job in status["running"]] == [job_id]
+        assert status["stats"]["running"] == 1
+
+    assert daemon.cancel([job_id], path) == 1
+
+    with daemon.connect(path) as client:
+        client.request("watch", ids=[job_id])
+        # the stored state may still say running until the worker settles the job
+        state = next(event for event in client.events()
+                     if event["event"] == "state" and event["state"] in daemon.FINAL_STATES)
+    assert state["state"] == "cancelled"
+
+    with daemon.connect(path) as client:
+        assert client.request("status")["running"] == []
+        client.request("shutdown")
+    deadline = time.monotonic() + 10
+    while os.path.exists(path):
+        assert time.monotonic() < deadline, "daemon did not shut down"
+        time.sleep(0.05)
+    assert daemon.connect(path) is None
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from procstream import iter_output
+
+FD_DIR = "/proc/self/fd"
+
+
+def open_fds():
+    return len(os.listdir(FD_DIR))
+
+
+def start(code):
+    return subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+@pytest.mark.skipif(not os.path.isdir(FD_DIR), reason="needs /proc")
+def test_finished_processes_do_not_keep_pipes_open():
+    before = open_fds()
+    processes = []
+    for _ in range(50):
+        process = start("import sys; print('out'); print('err', file=sys.stderr)")
+        lines = [(line.stream, line.text) for line in iter_output(process)]
+        process.wait()
+        assert sorted(lines) == [("stderr", "err"), ("stdout", "out")]
+        # kept alive like the jobs of a running batch
+        processes.append(process)
+    assert open_fds() <= before + 2
+
+
+@pytest.mark.skipif(not os.path.isdir(FD_DIR), reason="needs /proc")
+def test_pipes_are_closed_when_reading_stops_early():
+    process = start("import time; print('first', flush=True); time.sleep(5)")
+    output = iter_output(process)
+    assert next(output).text == "first"
+    output.close()
+    assert process.stdout.closed and process.stderr.closed
+    process.kill()
+    process.wait()
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import time
+from concurrent.futures import Future
+
+from scheduler import Batch, Job, Scheduler
+
+
+def wait_for(batch, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not batch.complete:
+        assert time.monotonic() < deadline, "batch did not complete"
+        time.sleep(0.01)
+
+
+def make_jobs(batch, count):
+    return [Job(f"https://host{i}.example/item", "Other-Videos", ["yt-dlp", f"https://host{i}.example/item"],
+                "Other-Videos", batch=batch) for i in range(count)]
+
+
+def test_settled_jobs_drop_their_process():
+    def run(job):
+        job.process = subprocess.Popen([sys.executable, "-c", "pass"])
+        return job.process.wait()
+
+    scheduler = Scheduler(run, workers=2, domain_delay=0)
+    batch = Batch(4)
+    jobs = make_jobs(batch, 4)
+    scheduler.submit(jobs)
+    wait_for(batch)
+    assert [job.state for job in jobs] == ["done"] * 4
+    assert all(job.process is None for job in jobs)
+
+
+def test_raising_post_processing_fails_the_job():
+    def run(job):
+        future = Future()
+        future.set_exception(RuntimeError("ffmpeg vanished"))
+        return future
+
+    scheduler = Scheduler(run, workers=1, domain_delay=0)
+    batch = Batch(1)
+    [job] = make_jobs(batch, 1)
+    scheduler.submit([job])
+    wait_for(batch)
+    assert job.state == "failed"
+    assert "ffmpeg vanished" in job.last_error()
+    assert scheduler.idle()
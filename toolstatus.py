@@ -0,0 +1,136 @@
+"""Installed/latest version checks for yt-dlp, gallery-dl and spotdl.
+
+Installed versions come from package metadata when the tool lives in our
+interpreter, otherwise from `<tool> --version`; they are cached per
+executable path + mtime so an unchanged binary is never run twice. Latest
+versions come from the PyPI JSON API (never `--update`, which would
+replace the binary) and are cached for CACHE_TTL seconds. All three tools
+are checked in parallel.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import urllib.request
+from importlib import metadata
+
+CONFIG_DIR = os.path.expanduser("~/.config/feliciadl")
+CACHE_PATH = os.path.join(CONFIG_DIR, "tool_status.json")
+CACHE_TTL = 24 * 3600
+
+# executable -> PyPI / distribution name
+TOOLS = {
+    "yt-dlp": "yt-dlp",
+    "gallery-dl": "gallery-dl",
+    "spotdl": "spotdl",
+}
+
+_cache_lock = threading.Lock()
+
+
+def _norm_ver(s):
+    """Normalize a version token like 'stable@2025.10.22.' -> '2025.10.22'"""
+    s = s.strip().strip(".").strip(",")
+    if "@" in s:
+        s = s.split("@", 1)[-1]
+    return s.lstrip("v")
+
+
+def _ver_key(v):
+    return tuple(int(p) for p in re.findall(r"\d+", v))
+
+
+def _exe_signature(tool):
+    path = shutil.which(tool)
+    if not path:
+        return None
+    try:
+        return f"{os.path.realpath(path)}:{os.stat(path).st_mtime_ns}"
+    except OSError:
+        return None
+
+
+def local_version(tool):
+    """Installed version of `tool`, or None if it is not installed."""
+    try:
+        return metadata.version(TOOLS[tool])
+    except metadata.PackageNotFoundError:
+        pass
+    try:
+        p = subprocess.run([tool, "--version"], capture_output=True, text=True, timeout=20)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    first = ((p.stdout or "") + (p.stderr or "")).strip().splitlines()
+    if not first:
+        return None
+    # spotdl prints e.g. "spotdl version 4.2.11"
+    return _norm_ver(first[0].split()[-1])
+
+
+def latest_version(tool, timeout=10):
+    """Latest release on PyPI, or None when offline."""
+    url = f"https://pypi.org/pypi/{TOOLS[tool]}/json"
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
+            return _norm_ver(json.load(r)["info"]["version"])
+    except Exception:
+        return None
+
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    tmp = CACHE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_PATH)
+
+
+def check_tool(tool, force=False):
+    """Return {"version", "latest", "up_to_date"} for `tool`, using the cache unless `force`."""
+    now = time.time()
+    with _cache_lock:
+        entry = dict(_load_cache().get(tool, {}))
+
+    signature = _exe_signature(tool)
+    if force or not entry.get("version") or entry.get("signature") != signature:
+        entry["version"] = local_version(tool)
+        entry["signature"] = signature
+    if force or now - entry.get("latest_checked", 0) > CACHE_TTL:
+        latest = latest_version(tool)
+        if latest:
+            entry["latest"] = latest
+            entry["latest_checked"] = now
+
+    with _cache_lock:
+        cache = _load_cache()
+        cache[tool] = entry
+        _save_cache(cache)
+
+    version = entry.get("version")
+    latest = entry.get("latest")
+    up_to_date = True
+    if version and latest and version != latest:
+        up_to_date = _ver_key(version) >= _ver_key(latest)
+    return {"version": version or "unknown", "latest": latest, "up_to_date": up_to_date}
+
+
+def check_all(on_result, force=False):
+    """Check every tool on its own thread; calls on_result(tool, status) as each finishes."""
+    def run(tool):
+        on_result(tool, check_tool(tool, force))
+
+    threads = [threading.Thread(target=run, args=(tool,), daemon=True) for tool in TOOLS]
+    for t in threads:
+        t.start()
+    return threads
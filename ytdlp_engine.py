@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Optional in-process yt-dlp engine.
+
+Instead of starting a fresh `yt-dlp` for every URL, a few long-lived
+worker processes import yt_dlp once and drive `yt_dlp.YoutubeDL` for job
+after job, so interpreter startup, extractor imports and config parsing
+are paid once per worker instead of once per URL.
+
+The same argv that build_command produces for the subprocess path is fed
+through `yt_dlp.parse_options`, so format, output and yt-dlp.conf options
+behave exactly as on the command line. Workers talk JSON lines over their
+stdin/stdout; progress hooks and log messages come back as events. While
+a job runs, the parent can send {"ratelimit": bytes_per_second} to change
+its download rate (used to rebalance the bandwidth budget).
+
+Enable with `"ytdlp_engine": "inprocess"` in config.json. When yt_dlp is
+not importable the subprocess path is used.
+"""
+import importlib.util
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+import proctree
+
+ENGINE_SUBPROCESS = "subprocess"
+ENGINE_INPROCESS = "inprocess"
+
+
+def available():
+    return importlib.util.find_spec("yt_dlp") is not None
+
+
+# --- worker side -----------------------------------------------------------
+
+def _worker_main():
+    import yt_dlp
+
+    # yt-dlp may print to stdout; keep the real stdout for our protocol only
+    proto = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    def emit(**event):
+        proto.write(json.dumps(event) + "\n")
+
+    class Logger:
+        def debug(self, msg):
+            # yt-dlp routes regular screen output through debug() as well
+            if not msg.startswith("[debug] "):
+                emit(event="log", stream="stdout", text=msg)
+
+        def info(self, msg):
+            emit(event="log", stream="stdout", text=msg)
+
+        def warning(self, msg):
+            emit(event="log", stream="stderr", text=msg)
+
+        def error(self, msg):
+            emit(event="log", stream="stderr", text=msg)
+
+    def hook(d):
+        info = d.get("info_dict") or {}
+        emit(
+            event="progress",
+            status=d.get("status"),
+            downloaded=d.get("downloaded_bytes"),
+            total=d.get("total_bytes") or d.get("total_bytes_estimate"),
+            speed=d.get("speed"),
+            eta=d.get("eta"),
+            index=info.get("playlist_index"),
+            count=info.get("n_entries") or info.get("playlist_count"),
+        )
+
+    # stdin is read on its own thread so rate changes arrive while a job runs
+    tasks = queue.Queue()
+    current = {"params": None}
+
+    def read_stdin():
+        for line in sys.stdin:
+            message = json.loads(line)
+            if "ratelimit" in message:
+                params = current["params"]
+                if params is not None:
+                    # the downloaders share this dict and read it for every block
+                    params["ratelimit"] = message["ratelimit"]
+            else:
+                tasks.put(message)
+        tasks.put(None)
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        try:
+            parsed = yt_dlp.parse_options(task["args"])
+            opts = dict(parsed.ydl_opts)
+            opts["logger"] = Logger()
+            opts["progress_hooks"] = [hook]
+            opts["noprogress"] = True
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                current["params"] = ydl.params
+                try:
+                    code = ydl.download(parsed.urls)
+                finally:
+                    current["params"] = None
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            emit(event="log", stream="stderr", text=f"ERROR: {e}")
+            code = 1
+        emit(event="done", code=code)
+
+
+# --- parent side -----------------------------------------------------------
+
+class EnginePool:
+    """Hands yt-dlp commands to a bounded set of reusable worker processes."""
+
+    def __init__(self, size=4):
+        self.size = max(1, int(size))
+        self._cond = threading.Condition()
+        self._idle = []
+        self._count = 0
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.poll() is None:
+                        return worker
+                    self._count -= 1
+                if self._count < self.size:
+                    break
+                self._cond.wait()
+            self._count += 1
+        try:
+            return subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--worker"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1, **proctree.SESSION,
+            )
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker, alive):
+        with self._cond:
+            if alive:
+                self._idle.append(worker)
+            else:
+                self._count -= 1
+            self._cond.notify()
+
+    def run(self, cmd, progress=None, on_line=None, on_start=None, rate=None):
+        """Run a yt-dlp argv (cmd[0] is ignored) on a worker and return its exit code.
+
+        `on_start(worker)` receives the worker process; killing it cancels the job.
+        `rate()`, if given, is polled on every event and changes of its value
+        (bytes/s or None) are passed on to the running download.
+        """
+        worker = self._acquire()
+        if on_start:
+            on_start(worker)
+        alive = False
+        code = None
+        try:
+            worker.stdin.write(json.dumps({"args": list(cmd[1:])}) + "\n")
+            worker.stdin.flush()
+            current_rate = object()  # send the first value; it may have changed since cmd was built
+            for line in worker.stdout:
+                if rate and rate() != current_rate:
+                    current_rate = rate()
+                    worker.stdin.write(json.dumps({"ratelimit": current_rate}) + "\n")
+                    worker.stdin.flush()
+                event = json.loads(line)
+                kind = event["event"]
+                if kind == "done":
+                    code = event["code"]
+                    alive = True
+                    break
+                if kind == "log" and on_line:
+                    on_line(event["stream"], event["text"])
+                elif kind == "progress" and progress is not None:
+                    _apply_progress(progress, event)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if not alive:
+                # takes ffmpeg children of the worker along
+                proctree.stop([worker], grace=0, remove_partial=False)
+                code = worker.wait()
+            self._release(worker, alive)
+        return code
+
+    def shutdown(self):
+        with self._cond:
+            workers, self._idle = self._idle, []
+            self._count -= len(workers)
+        for worker in workers:
+            worker.stdin.close()
+            worker.wait()
+
+
+def _apply_progress(p, event):
+    if event.get("count"):
+        p.items_total = event["count"]
+        p.items_done = max(0, (event.get("index") or 1) - 1)
+    if event.get("status") == "finished":
+        p.percent = 100.0
+        p.eta = 0
+        return
+    p.downloaded = event.get("downloaded")
+    p.total = event.get("total")
+    p.speed = event.get("speed")
+    p.eta = event.get("eta")
+    if p.downloaded is not None and p.total:
+        p.percent = min(100.0, p.downloaded * 100.0 / p.total)
+
+
+def from_config(config):
+    """Return an EnginePool if the in-process engine is enabled and usable, else None."""
+    if config.get("ytdlp_engine", ENGINE_SUBPROCESS) != ENGINE_INPROCESS or not available():
+        return None
+    limits = config.get("backend_limits") or {}
+    return EnginePool(config.get("engine_workers", limits.get("yt-dlp", 4)))
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["--worker"]:
+    _worker_main()